@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Manage MongoDB indexes declared in server.INDEX_REGISTRY.
+
+Usage:
+    python manage_indexes.py diff      # compare declared indexes with the live database
+    python manage_indexes.py apply     # create any missing indexes
+    python manage_indexes.py explain   # fail if any route query shape uses a COLLSCAN
+
+Exits with status 1 when drift or collection scans are found.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from server import INDEX_REGISTRY, check_query_plans, db, diff_indexes, ensure_indexes
+
+
+async def run(command: str) -> int:
+    if command == "diff":
+        report = await diff_indexes(db)
+        if not report:
+            print(f"✓ Indexes match registry ({len(INDEX_REGISTRY)} collections)")
+            return 0
+        print(json.dumps(report, indent=2))
+        return 1
+
+    if command == "apply":
+        created = await ensure_indexes(db)
+        for collection_name, names in created.items():
+            print(f"{collection_name}: {', '.join(names) or '-'}")
+        return 0
+
+    if command == "explain":
+        await ensure_indexes(db)
+        violations = await check_query_plans(db)
+        if not violations:
+            print("✓ No collection scans in route query shapes")
+            return 0
+        for violation in violations:
+            print(f"✗ {violation['route']} ({violation['collection']}): {' -> '.join(violation['stages'])}")
+        return 1
+
+    return 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage RallyCommand MongoDB indexes")
+    parser.add_argument("command", choices=["diff", "apply", "explain"])
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.command)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Maintain usage event storage (monthly per-item buckets).
+
+Usage:
+    python manage_usage.py migrate                 # move legacy usage_logs into buckets
+    python manage_usage.py archive                 # archive buckets older than USAGE_ARCHIVE_AFTER_MONTHS
+    python manage_usage.py archive --months 6      # archive buckets older than 6 months
+
+Both commands are safe to re-run after an interruption and to run while the
+API is serving.
+"""
+import argparse
+import asyncio
+import sys
+
+from server import (
+    db, USAGE_ARCHIVE_AFTER_MONTHS, MaintenanceLeaseLost, archive_usage_buckets, backfill_analytics_rollups,
+    claim_maintenance_lease, migrate_usage_logs, release_maintenance_lease
+)
+
+
+async def run(command: str, months: int) -> int:
+    if command == "archive":
+        archived = await archive_usage_buckets(db, older_than_months=months)
+        print(f"Archived {archived} buckets older than {months} months")
+        return 0
+    lease = await claim_maintenance_lease(db, "startup-backfills")
+    if not lease:
+        print("Another process is running the migration; try again later")
+        return 1
+    try:
+        # Legacy logs must be rolled up for analytics before they leave usage_logs
+        await backfill_analytics_rollups(db, lease=lease)
+        moved = await migrate_usage_logs(db, lease=lease)
+    except MaintenanceLeaseLost as e:
+        print(f"Stopped: {e}")
+        return 1
+    finally:
+        await release_maintenance_lease(db, lease)
+    print(f"Moved {moved} usage logs into buckets")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("migrate", "archive"))
+    parser.add_argument("--months", type=int, default=USAGE_ARCHIVE_AFTER_MONTHS,
+                        help="archive buckets for months older than this many months")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.command, args.months)))
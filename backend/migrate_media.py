@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Move base64 photos embedded in inventory and vehicle documents into the
+media store (see MEDIA_STORE), leaving /api/media/<sha256> references behind.
+
+Usage:
+    python migrate_media.py
+
+Safe to re-run: only documents that still hold data URLs are touched, and
+identical images are stored once. Photos that cannot be decoded are logged
+and left in place.
+"""
+import asyncio
+
+from server import db, migrate_inline_media
+
+
+async def run():
+    migrated = await migrate_inline_media(db)
+    print(f"✓ Migrated photos on {migrated['inventory']} inventory items and {migrated['vehicles']} vehicles")
+    if migrated["skipped"]:
+        print(f"⚠ Skipped {migrated['skipped']} photos that could not be stored (see the log)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
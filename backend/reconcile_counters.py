@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Recompute the per-user inventory counters (item count, low-stock count and
+stock value per category) from the inventory and repair any drift.
+
+Usage:
+    python reconcile_counters.py           # repair drift
+    python reconcile_counters.py --check   # report drift only, exit 1 if any
+
+Corrections are applied as $inc deltas from a snapshot taken while none of
+the user's inventory writes was in flight. Users whose writes kept them busy
+for every attempt are skipped and listed; run again to retry them.
+"""
+import argparse
+import asyncio
+import sys
+
+from server import db, reconcile_inventory_counters
+
+
+async def run(repair: bool) -> int:
+    report = await reconcile_inventory_counters(db, repair=repair)
+    for user_id, corrections in report["drifted"].items():
+        for category, correction in corrections.items():
+            mark = "✓" if repair else "✗"
+            print(f"{mark} {user_id} {category}: {'applied' if repair else 'off by'} {correction}")
+    for user_id in report["busy"]:
+        print(f"- {user_id}: skipped, inventory writes in flight")
+    action = "repaired" if repair else "drifted"
+    print(f"Checked {report['users_checked']} users, {len(report['drifted'])} {action}, {len(report['busy'])} skipped")
+    return 1 if report["drifted"] and not repair else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="report drift without repairing it")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(repair=not args.check)))
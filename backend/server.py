@@ -1,8 +1,14 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ASCENDING, DESCENDING, IndexModel, InsertOne, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, PyMongoError
+from gridfs.errors import FileExists, NoFile
+from pymongo import monitoring
+from contextlib import asynccontextmanager, nullcontext
 import os
 import logging
 import asyncio
@@ -10,25 +16,237 @@ import httpx
 import re
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
+from collections import OrderedDict
+from itertools import chain
+import time
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date, timedelta
 import hashlib
+import io
+import codecs
+import zipfile
+import zlib
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, UnidentifiedImageError
+import numpy as np
+import base64
+import json
 import jwt
 import re
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# ============== MONGODB CONNECTION ==============
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out connections for the readiness endpoint."""
+
+    def __init__(self):
+        self.open_connections = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.open_connections = max(self.open_connections - 1, 0)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out = max(self.checked_out - 1, 0)
+
+class MongoConnection:
+    """Lazily created Motor client. Opened and warmed by the app lifespan.
+
+    ``warm`` turns True once the startup work (ping, indexes, backfills) has
+    completed; the readiness probe reports 503 until then.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.database = None
+        self.pool_monitor = PoolMonitor()
+        self.max_pool_size = 0
+        self.warm = False
+
+    @staticmethod
+    def settings() -> dict:
+        def optional_int(name: str):
+            value = os.environ.get(name)
+            return int(value) if value else None
+
+        return {
+            "url": os.environ['MONGO_URL'],
+            "db_name": os.environ['DB_NAME'],
+            "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '5')),
+            "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+            "maxIdleTimeMS": optional_int('MONGO_MAX_IDLE_TIME_MS'),
+            "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '10000')),
+            "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+            "socketTimeoutMS": optional_int('MONGO_SOCKET_TIMEOUT_MS'),
+            "waitQueueTimeoutMS": optional_int('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+        }
+
+    def connect(self):
+        if self.client is not None:
+            return
+        settings = self.settings()
+        url = settings.pop("url")
+        db_name = settings.pop("db_name")
+        options = {k: v for k, v in settings.items() if v is not None}
+        self.max_pool_size = options["maxPoolSize"]
+        self.client = AsyncIOMotorClient(url, event_listeners=[self.pool_monitor], **options)
+        self.database = self.client[db_name]
+
+    def get_database(self):
+        if self.database is None:
+            self.connect()
+        return self.database
+
+    async def ping(self) -> float:
+        """Round-trip a ping to the server and return the latency in milliseconds."""
+        started = time.perf_counter()
+        await self.get_database().command("ping")
+        return (time.perf_counter() - started) * 1000
+
+    async def warm_up(self):
+        latency_ms = await self.ping()
+        logging.info(f"MongoDB ready (ping {latency_ms:.1f} ms)")
+
+    def pool_stats(self) -> dict:
+        monitor = self.pool_monitor
+        return {
+            "open_connections": monitor.open_connections,
+            "checked_out": monitor.checked_out,
+            "max_pool_size": self.max_pool_size,
+            "utilisation": round(monitor.checked_out / self.max_pool_size, 4) if self.max_pool_size else 0.0,
+            "checkout_failures": monitor.checkout_failures,
+            "pool_clears": monitor.pool_clears
+        }
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = None
+        self.database = None
+        self.warm = False
+
+class _LazyDatabase:
+    """Module-level ``db`` handle that resolves the database on first use."""
+
+    def __getattr__(self, name):
+        return getattr(_mongo.get_database(), name)
+
+    def __getitem__(self, name):
+        return _mongo.get_database()[name]
+
+_mongo = MongoConnection()
+db = _LazyDatabase()
+
+# Inventory list pagination
+INVENTORY_PAGE_SIZE_DEFAULT = 1000
+INVENTORY_PAGE_SIZE_MAX = 1000
+
+# Operations accepted by one POST /inventory/bulk request
+INVENTORY_BULK_MAX_OPERATIONS = 500
+
+# Stock movements kept in each item's embedded ledger
+STOCK_LEDGER_LENGTH = 50
+
+# Inventory search: prefixes kept per token
+SEARCH_PREFIX_MAX_LENGTH = 20
+
+# Media store for item and vehicle photos: "gridfs" (default) or "local"
+MEDIA_STORE = os.environ.get('MEDIA_STORE', 'gridfs').lower()
+MEDIA_DIR = Path(os.environ.get('MEDIA_DIR', str(ROOT_DIR / 'media')))
+MEDIA_MAX_BYTES = int(os.environ.get('MEDIA_MAX_BYTES', str(10 * 1024 * 1024)))
+
+# Uploaded photos are re-encoded into these sizes (longest side, px) off the event loop
+IMAGE_VARIANTS = {"thumbnail": 160, "card": 480, "full": 1600}
+IMAGE_FORMAT = "WEBP"
+IMAGE_CONTENT_TYPE = "image/webp"
+IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', '80'))
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+IMAGE_MAX_PIXELS = 50_000_000
+
+# Create declared indexes on startup (disable for read-only replicas / tests)
+ENSURE_INDEXES_ON_STARTUP = os.environ.get('ENSURE_INDEXES_ON_STARTUP', 'true').lower() != 'false'
+
+# Run the data backfills, counter reconcile and usage migration in the
+# background once the app is serving (disable to run them from the CLIs:
+# reconcile_counters.py, manage_usage.py migrate)
+STARTUP_MAINTENANCE = os.environ.get('STARTUP_MAINTENANCE', 'true').lower() != 'false'
+
+# If MongoDB is unreachable at startup, the warm-up and index creation are
+# retried in the background with exponential backoff (seconds)
+STARTUP_RETRY_INITIAL_DELAY = float(os.environ.get('STARTUP_RETRY_INITIAL_DELAY', '1'))
+STARTUP_RETRY_MAX_DELAY = float(os.environ.get('STARTUP_RETRY_MAX_DELAY', '60'))
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'rallycommand-secret-key-2024')
 JWT_ALGORITHM = "HS256"
 
+# Principal cache configuration (authenticated users held in-process)
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '1024'))
+PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', '60'))
+# Seconds between checks for accounts deleted by other processes, whose cached
+# principals must be dropped
+PRINCIPAL_REVOCATION_INTERVAL = float(os.environ.get('PRINCIPAL_REVOCATION_INTERVAL', '5'))
+
+# Expose in-process cache statistics at /api/metrics (authenticated users only)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Per-user cache of /dashboard/stats, valid while the user's collection
+# versions are unchanged (every write bumps them, in any worker process).
+# With DASHBOARD_CACHE_REFRESH the payload is recomputed in the background
+# right after a write instead of on the next dashboard visit.
+DASHBOARD_CACHE_SIZE = int(os.environ.get('DASHBOARD_CACHE_SIZE', '1024'))
+DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', '300'))
+DASHBOARD_CACHE_REFRESH = os.environ.get('DASHBOARD_CACHE_REFRESH', 'false').lower() in ('1', 'true', 'yes')
+
+# Usage events live in one usage_buckets document per item per month; buckets
+# older than this many months are moved to usage_buckets_archive by
+# manage_usage.py archive
+USAGE_ARCHIVE_AFTER_MONTHS = int(os.environ.get('USAGE_ARCHIVE_AFTER_MONTHS', '12'))
+
+# Seconds between background reconciliations of inventory_counters (0 = off)
+INVENTORY_COUNTERS_RECONCILE_INTERVAL = float(os.environ.get('INVENTORY_COUNTERS_RECONCILE_INTERVAL', '0'))
+
+# Account and item deletes leave their dependent records to a background
+# worker, which deletes them DELETION_BATCH_SIZE at a time as soon as a job is
+# enqueued and polls every DELETION_WORKER_INTERVAL seconds for retries and
+# jobs enqueued by other processes (0 = no polling)
+DELETION_BATCH_SIZE = int(os.environ.get('DELETION_BATCH_SIZE', '500'))
+DELETION_WORKER_INTERVAL = float(os.environ.get('DELETION_WORKER_INTERVAL', '5'))
+
 # Resend Configuration (using HTTP API)
 # Check multiple possible env var names for flexibility
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY') or os.environ.get('resend_api_key') or os.environ.get('RESEND_KEY') or ''
@@ -41,9 +259,76 @@ if RESEND_API_KEY:
 else:
     print("⚠ WARNING: RESEND_API_KEY not found in environment variables!")
 
+async def prepare_database():
+    """Warm up MongoDB and create indexes, then mark the app ready."""
+    await _mongo.warm_up()
+    if ENSURE_INDEXES_ON_STARTUP:
+        await ensure_indexes(db)
+    _mongo.warm = True
+
+async def run_startup_maintenance():
+    """Bring data written by older versions up to date; runs while the app serves."""
+    try:
+        # Left to expire, so workers starting (or restarting) together run it once
+        if not await claim_maintenance_lease(db, "startup-maintenance"):
+            return
+        await backfill_search_tokens(db)
+        await backfill_low_stock_flags(db)
+        report = await reconcile_inventory_counters(db)
+        if report["drifted"]:
+            logging.info(f"Reconciled inventory counters for {len(report['drifted'])} users")
+        lease = await claim_maintenance_lease(db, "startup-backfills")
+        if lease:
+            # Not idempotent: run in one process only, and roll up legacy
+            # usage_logs before they are moved into buckets
+            try:
+                await backfill_analytics_rollups(db, lease=lease)
+                await migrate_usage_logs(db, lease=lease)
+            except MaintenanceLeaseLost as e:
+                logging.warning(f"Startup backfills stopped: {e}")
+            finally:
+                await release_maintenance_lease(db, lease)
+    except PyMongoError as e:
+        logging.error(f"Startup maintenance failed: {e}")
+
+async def prepare_database_with_retry(delay: float = STARTUP_RETRY_INITIAL_DELAY):
+    while True:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, STARTUP_RETRY_MAX_DELAY)
+        try:
+            await prepare_database()
+            break
+        except PyMongoError as e:
+            logging.error(f"MongoDB startup failed, retrying in {delay:.0f}s: {e}")
+    if STARTUP_MAINTENANCE:
+        await run_startup_maintenance()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _mongo.connect()
+    startup = None
+    try:
+        await prepare_database()
+        if STARTUP_MAINTENANCE:
+            startup = asyncio.create_task(run_startup_maintenance())
+    except PyMongoError as e:
+        # Serve (and report not ready) while retrying in the background
+        logging.error(f"MongoDB startup failed, retrying in {STARTUP_RETRY_INITIAL_DELAY:.0f}s: {e}")
+        startup = asyncio.create_task(prepare_database_with_retry())
+    reconciler = None
+    if INVENTORY_COUNTERS_RECONCILE_INTERVAL > 0:
+        reconciler = asyncio.create_task(reconcile_counters_periodically(INVENTORY_COUNTERS_RECONCILE_INTERVAL))
+    deletion_worker = asyncio.create_task(run_deletion_worker(DELETION_WORKER_INTERVAL))
+    yield
+    for task in (startup, reconciler, deletion_worker):
+        if task:
+            task.cancel()
+    shutdown_image_pool()
+    _mongo.close()
+
 # Create the main app
 # Disable redirect_slashes to prevent 405 errors on POST requests in production
-app = FastAPI(redirect_slashes=False)
+app = FastAPI(redirect_slashes=False, lifespan=lifespan)
 
 # CORS middleware - must be added before routes
 # Using allow_origin_regex to allow all origins while supporting credentials
@@ -53,6 +338,7 @@ app.add_middleware(
     allow_origin_regex=".*",
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 # Create a router with the /api prefix
@@ -144,6 +430,64 @@ class InventoryItem(BaseModel):
     created_at: str
     updated_at: str
 
+class InventoryItemSummary(BaseModel):
+    """Lightweight list view (view=summary): no photos or notes."""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    name: str
+    category: str
+    subcategory: str = ""
+    condition: str = ""
+    quantity: int
+    location: str
+    part_number: str
+    supplier: str
+    price: float
+    min_stock: int
+    vehicle_ids: List[str] = []
+    created_at: str
+    updated_at: str
+
+class InventoryBulkOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None  # required for update and delete
+    item: Optional[InventoryItemCreate] = None  # required for create
+    changes: Optional[InventoryItemUpdate] = None  # required for update
+
+class InventoryBulkRequest(BaseModel):
+    operations: List[InventoryBulkOperation]
+
+class InventoryBulkResult(BaseModel):
+    index: int
+    op: str
+    id: Optional[str] = None
+    status: str = "ok"  # ok, error
+    error: Optional[str] = None
+    item: Optional[InventoryItem] = None
+
+class InventoryBulkResponse(BaseModel):
+    created: int
+    updated: int
+    deleted: int
+    failed: int
+    results: List[InventoryBulkResult]
+    deletion_id: Optional[str] = None  # cascade job for the deleted items' usage history
+
+class StockMovementCreate(BaseModel):
+    delta: int  # positive to add stock, negative to remove it
+    kind: Literal["restock", "adjustment"] = "restock"
+    reason: str = ""
+
+class StockMovement(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    kind: str  # usage, restock, repair, stocktake, adjustment
+    delta: int
+    quantity_after: int
+    reason: str = ""
+    ref_id: Optional[str] = None
+    created_at: str
+
 class UsageLogCreate(BaseModel):
     item_id: str
     quantity_used: int
@@ -186,6 +530,16 @@ class Vehicle(BaseModel):
     created_at: str
     updated_at: str
 
+class VehicleSummary(BaseModel):
+    """Lightweight list view (view=summary): no photo."""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    make: str
+    model: str
+    registration: str
+    created_at: str
+    updated_at: str
+
 class CornerValues(BaseModel):
     front_left: float = 0
     front_right: float = 0
@@ -300,6 +654,20 @@ class Setup(BaseModel):
     created_at: str = ""
     updated_at: str = ""
 
+class SetupSummary(BaseModel):
+    """Lightweight list view (view=summary): no setup values or notes."""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    name: str
+    vehicle_id: str
+    group_id: Optional[str] = None
+    conditions: str = ""
+    event_name: str = ""
+    event_date: str = ""
+    rating: int = 0
+    created_at: str = ""
+    updated_at: str = ""
+
 # Setup Group Models
 class SetupGroupCreate(BaseModel):
     name: str
@@ -334,6 +702,16 @@ class DashboardStats(BaseModel):
 
 # ============== HELPER FUNCTIONS ==============
 
+LIST_VIEWS = ("full", "summary")
+
+def view_projection(view: str, summary_model) -> dict:
+    """Mongo projection for a list ``view``: every field, or only those of ``summary_model``."""
+    if view not in LIST_VIEWS:
+        raise HTTPException(status_code=400, detail=f"Unknown view '{view}'. Use one of: {', '.join(LIST_VIEWS)}")
+    if view == "full":
+        return {"_id": 0}
+    return {"_id": 0, **{field: 1 for field in summary_model.model_fields}}
+
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
@@ -354,14 +732,669 @@ def verify_token(token: str) -> dict:
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+class PrincipalCache:
+    """Bounded LRU cache of authenticated user documents, keyed by (user_id, token).
+
+    Entries expire after ``ttl`` seconds (or when the token itself expires,
+    whichever comes first). Writes to a user document must call
+    ``invalidate_user`` so stale principals are never served.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str, token: str) -> Optional[dict]:
+        key = (user_id, token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(user)
+
+    def put(self, user_id: str, token: str, user: dict, token_exp: Optional[float] = None):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - datetime.now(timezone.utc).timestamp())
+            if ttl <= 0:
+                return
+        key = (user_id, token)
+        self._entries[key] = (time.monotonic() + ttl, dict(user))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: str):
+        for key in [k for k in self._entries if k[0] == user_id]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+# Account deletion jobs are written before the user record is removed, so they
+# double as the revocation list other processes read; account updates stamp
+# principal_updated_at on the user for the same purpose. Look back a little
+# further than the last check so a write made while it ran is not missed.
+PRINCIPAL_REVOCATION_OVERLAP = 60
+_revocations_checked_at = time.time()
+
+async def sync_principal_revocations():
+    """Drop cached principals of accounts deleted or updated (by any process) since the last check."""
+    global _revocations_checked_at
+    now = time.time()
+    if now - _revocations_checked_at < PRINCIPAL_REVOCATION_INTERVAL:
+        return
+    since = datetime.fromtimestamp(_revocations_checked_at - PRINCIPAL_REVOCATION_OVERLAP, timezone.utc)
+    _revocations_checked_at = now
+    async for job in db.deletion_jobs.find(
+        {"kind": "account", "created_at": {"$gte": since.isoformat()}}, {"_id": 0, "user_id": 1}
+    ):
+        principal_cache.invalidate_user(job["user_id"])
+    async for user in db.users.find({"principal_updated_at": {"$gte": since.isoformat()}}, {"_id": 0, "id": 1}):
+        principal_cache.invalidate_user(user["id"])
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     payload = verify_token(token)
-    user = await db.users.find_one({"id": payload["user_id"]}, {"_id": 0})
+    user_id = payload["user_id"]
+    
+    await sync_principal_revocations()
+    user = principal_cache.get(user_id, token)
+    if user is not None:
+        return user
+    
+    user = await db.users.find_one({"id": user_id}, {"_id": 0})
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    principal_cache.put(user_id, token, user, payload.get("exp"))
     return user
 
+# ============== DATABASE INDEXES ==============
+
+# Declarative index registry: every query issued by a route must be served by
+# one of these. Apply with ensure_indexes() (run on startup) and compare with
+# the live database using `python manage_indexes.py diff`.
+# Lookups of existing records by a merge-mode import (see ACCOUNT ROUTES)
+IMPORT_MATCH_INDEXES = [
+    IndexModel([("user_id", ASCENDING), ("import_source", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("content_hash", ASCENDING)]),
+]
+
+INDEX_REGISTRY = {
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("principal_updated_at", ASCENDING)], sparse=True),
+    ],
+    "inventory": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("category", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("category", ASCENDING), ("subcategory", ASCENDING),
+                    ("created_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("vehicle_ids", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("search_tokens", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("is_low_stock", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)]),
+        *IMPORT_MATCH_INDEXES,
+    ],
+    "usage_logs": [
+        IndexModel([("item_id", ASCENDING), ("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "usage_buckets": [
+        IndexModel([("user_id", ASCENDING), ("item_id", ASCENDING), ("month", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("last_at", DESCENDING)]),
+    ],
+    "usage_buckets_archive": [
+        IndexModel([("user_id", ASCENDING), ("item_id", ASCENDING), ("month", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("last_at", DESCENDING)]),
+    ],
+    "vehicles": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)]),
+        *IMPORT_MATCH_INDEXES,
+    ],
+    "setups": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("vehicle_id", ASCENDING), ("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("group_id", ASCENDING), ("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        *IMPORT_MATCH_INDEXES,
+    ],
+    "setup_groups": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("vehicle_id", ASCENDING), ("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "repairs": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("vehicle_id", ASCENDING), ("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        *IMPORT_MATCH_INDEXES,
+    ],
+    "stocktakes": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "stocktake_records": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)]),
+        *IMPORT_MATCH_INDEXES,
+    ],
+    "feedback": [
+        IndexModel([("user_id", ASCENDING)]),
+    ],
+    "collection_versions": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+    ],
+    "inventory_counters": [
+        IndexModel([("user_id", ASCENDING), ("category", ASCENDING)], unique=True),
+    ],
+    "usage_rollups": [
+        IndexModel([("user_id", ASCENDING), ("period", ASCENDING), ("bucket", ASCENDING), ("item_id", ASCENDING)], unique=True),
+    ],
+    "repair_rollups": [
+        IndexModel([("user_id", ASCENDING), ("period", ASCENDING), ("bucket", ASCENDING),
+                    ("vehicle_id", ASCENDING), ("affected_area", ASCENDING)], unique=True),
+    ],
+    "import_jobs": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "deletion_jobs": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+        IndexModel([("kind", ASCENDING), ("created_at", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "media": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("source_id", ASCENDING)], sparse=True),
+    ],
+}
+
+# Stable keyset order for inventory listings (created_at ties broken by id)
+INVENTORY_SORT = [("created_at", ASCENDING), ("id", ASCENDING)]
+
+# Representative query shape for each route, used by the explain() check to
+# make sure none of them falls back to a collection scan.
+QUERY_SHAPES = [
+    {"route": "POST /auth/login", "collection": "users", "filter": {"email": "x@example.com"}},
+    {"route": "get_current_user", "collection": "users", "filter": {"id": "u"}},
+    {"route": "GET /inventory", "collection": "inventory",
+     "filter": {"user_id": "u"}, "sort": INVENTORY_SORT},
+    {"route": "GET /inventory?cursor", "collection": "inventory",
+     "filter": {"user_id": "u", "$or": [{"created_at": {"$gt": "t"}}, {"created_at": "t", "id": {"$gt": "i"}}]},
+     "sort": INVENTORY_SORT},
+    {"route": "GET /inventory?category", "collection": "inventory",
+     "filter": {"user_id": "u", "category": "parts"}, "sort": INVENTORY_SORT},
+    {"route": "GET /inventory?subcategory", "collection": "inventory",
+     "filter": {"user_id": "u", "category": "parts", "subcategory": "panel"}, "sort": INVENTORY_SORT},
+    {"route": "GET /inventory?vehicle_id", "collection": "inventory",
+     "filter": {"user_id": "u", "vehicle_ids": "v"}, "sort": INVENTORY_SORT},
+    {"route": "GET /inventory?low_stock", "collection": "inventory",
+     "filter": {"user_id": "u", "is_low_stock": True}, "sort": INVENTORY_SORT},
+    {"route": "GET /inventory?search", "collection": "inventory",
+     "filter": {"user_id": "u", "search_tokens": {"$all": ["brake", "pad"]}}},
+    {"route": "GET /inventory/{id}", "collection": "inventory", "filter": {"id": "i", "user_id": "u"}},
+    {"route": "POST /inventory/bulk", "collection": "inventory",
+     "filter": {"user_id": "u", "id": {"$in": ["i", "j"]}}},
+    {"route": "GET /dashboard/stats (counters)", "collection": "inventory_counters", "filter": {"user_id": "u"}},
+    {"route": "GET /analytics/usage", "collection": "usage_rollups",
+     "filter": {"user_id": "u", "period": "day", "bucket": {"$gte": "2026-01-01", "$lte": "2026-01-31"}}},
+    {"route": "GET /analytics/repairs", "collection": "repair_rollups",
+     "filter": {"user_id": "u", "period": "week", "bucket": {"$gte": "2026-01-05", "$lte": "2026-03-30"}}},
+    {"route": "GET /forecast/restock", "collection": "usage_rollups",
+     "filter": {"user_id": "u", "period": "day", "bucket": {"$gte": "2026-01-01", "$lte": "2026-03-31"}}},
+    {"route": "GET /usage/{item_id}", "collection": "usage_buckets",
+     "filter": {"user_id": "u", "item_id": "i"}, "sort": [("last_at", DESCENDING)]},
+    {"route": "GET /dashboard/stats (activity)", "collection": "usage_buckets",
+     "filter": {"user_id": "u"}, "sort": [("last_at", DESCENDING)]},
+    {"route": "GET /vehicles", "collection": "vehicles", "filter": {"user_id": "u", "deletion_id": {"$exists": False}}},
+    {"route": "POST /account/import?mode=merge", "collection": "inventory",
+     "filter": {"user_id": "u", "import_source": {"$in": ["s", "t"]}}},
+    {"route": "GET /vehicles/{id}", "collection": "vehicles",
+     "filter": {"id": "v", "user_id": "u", "deletion_id": {"$exists": False}}},
+    {"route": "GET /setups/vehicle/{id}", "collection": "setups",
+     "filter": {"vehicle_id": "v", "user_id": "u"}, "sort": [("created_at", DESCENDING)]},
+    {"route": "GET /dashboard/stats (setups)", "collection": "setups",
+     "filter": {"user_id": "u"}, "sort": [("created_at", DESCENDING)]},
+    {"route": "GET /setup-groups/{id}/setups", "collection": "setups",
+     "filter": {"group_id": "g", "user_id": "u"}, "sort": [("created_at", DESCENDING)]},
+    {"route": "GET /setup-groups/vehicle/{id}", "collection": "setup_groups",
+     "filter": {"vehicle_id": "v", "user_id": "u"}, "sort": [("created_at", DESCENDING)]},
+    {"route": "GET /setup-groups/{id}", "collection": "setup_groups", "filter": {"id": "g", "user_id": "u"}},
+    {"route": "GET /repairs", "collection": "repairs",
+     "filter": {"user_id": "u"}, "sort": [("created_at", DESCENDING)]},
+    {"route": "GET /repairs/vehicle/{id}", "collection": "repairs",
+     "filter": {"vehicle_id": "v", "user_id": "u"}, "sort": [("created_at", DESCENDING)]},
+    {"route": "GET /stocktakes", "collection": "stocktakes",
+     "filter": {"user_id": "u"}, "sort": [("created_at", DESCENDING)]},
+    {"route": "GET /account/export (stocktakes)", "collection": "stocktake_records", "filter": {"user_id": "u"}},
+    {"route": "GET /account/export (feedback)", "collection": "feedback", "filter": {"user_id": "u"}},
+]
+
+def _index_signature(keys) -> tuple:
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                 for field, direction in keys)
+
+async def ensure_indexes(database) -> dict:
+    """Create every index in INDEX_REGISTRY. Failures are logged, not raised."""
+    created = {}
+    for collection_name, models in INDEX_REGISTRY.items():
+        created[collection_name] = []
+        for model in models:
+            try:
+                names = await database[collection_name].create_indexes([model])
+                created[collection_name].extend(names)
+            except OperationFailure as e:
+                logging.error(f"Failed to create index {model.document['name']} on {collection_name}: {e}")
+    return created
+
+async def diff_indexes(database) -> dict:
+    """Compare declared indexes with the live database.
+
+    Returns, per collection, the declared indexes that are missing, live
+    indexes that are not declared, and indexes whose options differ.
+    """
+    report = {}
+    for collection_name, models in INDEX_REGISTRY.items():
+        try:
+            live = await database[collection_name].index_information()
+        except OperationFailure:
+            live = {}
+        live.pop("_id_", None)
+        live_by_keys = {_index_signature(info["key"]): (name, info) for name, info in live.items()}
+        
+        missing, changed, matched = [], [], set()
+        for model in models:
+            doc = model.document
+            signature = _index_signature(doc["key"].items())
+            if signature not in live_by_keys:
+                missing.append(doc["name"])
+                continue
+            live_name, info = live_by_keys[signature]
+            matched.add(live_name)
+            if bool(info.get("unique", False)) != bool(doc.get("unique", False)):
+                changed.append(doc["name"])
+        extra = sorted(name for name in live if name not in matched)
+        
+        if missing or extra or changed:
+            report[collection_name] = {"missing": missing, "extra": extra, "changed": changed}
+    return report
+
+def _plan_stages(plan) -> list:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+async def check_query_plans(database) -> List[dict]:
+    """Run explain() on every QUERY_SHAPES entry and report collection scans."""
+    violations = []
+    for shape in QUERY_SHAPES:
+        command = {"find": shape["collection"], "filter": shape["filter"]}
+        if shape.get("sort"):
+            command["sort"] = dict(shape["sort"])
+        explained = await database.command("explain", command, verbosity="queryPlanner")
+        stages = _plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {}))
+        if "COLLSCAN" in stages:
+            violations.append({"route": shape["route"], "collection": shape["collection"], "stages": stages})
+    return violations
+
+# ============== MEDIA STORE ==============
+
+# Photos are stored once per distinct content (sha256) and documents keep a
+# reference of the form /api/media/<sha256> instead of the image itself.
+MEDIA_REF_PREFIX = "/api/media/"
+MEDIA_REF_PATTERN = re.compile(r"^/api/media/([0-9a-f]{64})$")
+DATA_URL_PREFIX = r"^data:(image/[a-z0-9.+-]+);base64,"
+DATA_URL_PATTERN = re.compile(DATA_URL_PREFIX + r"(.*)$", re.IGNORECASE | re.DOTALL)
+MEDIA_CHUNK_SIZE = 255 * 1024
+
+class GridFSMediaStore:
+    """Blobs in a GridFS bucket, with the content hash as file id."""
+
+    def bucket(self):
+        return AsyncIOMotorGridFSBucket(_mongo.get_database(), bucket_name="media")
+
+    async def put(self, media_id: str, data: bytes, content_type: str):
+        try:
+            await self.bucket().upload_from_stream_with_id(
+                media_id, media_id, data, metadata={"contentType": content_type}
+            )
+        except FileExists:
+            pass
+
+    async def stream(self, media_id: str):
+        try:
+            grid_out = await self.bucket().open_download_stream(media_id)
+        except NoFile:
+            raise HTTPException(status_code=404, detail="Media not found")
+
+        async def chunks():
+            while True:
+                chunk = await grid_out.readchunk()
+                if not chunk:
+                    break
+                yield chunk
+        return chunks()
+
+    async def delete(self, media_id: str):
+        try:
+            await self.bucket().delete(media_id)
+        except NoFile:
+            pass
+
+class LocalMediaStore:
+    """Blobs on the local filesystem (single-host deployments and development)."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path(self, media_id: str) -> Path:
+        return self.root / media_id[:2] / media_id
+
+    async def put(self, media_id: str, data: bytes, content_type: str):
+        path = self.path(media_id)
+        if path.exists():
+            return
+        def write():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        await asyncio.to_thread(write)
+
+    async def stream(self, media_id: str):
+        path = self.path(media_id)
+        if not path.exists():
+            raise HTTPException(status_code=404, detail="Media not found")
+
+        async def chunks():
+            with path.open("rb") as f:
+                while True:
+                    chunk = await asyncio.to_thread(f.read, MEDIA_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        return chunks()
+
+    async def delete(self, media_id: str):
+        self.path(media_id).unlink(missing_ok=True)
+
+media_store = LocalMediaStore(MEDIA_DIR) if MEDIA_STORE == "local" else GridFSMediaStore()
+
+def media_ref(media_id: str) -> str:
+    return f"{MEDIA_REF_PREFIX}{media_id}"
+
+def render_image_variants(data: bytes) -> dict:
+    """Decode, orient, downscale and re-encode an upload into IMAGE_VARIANTS.
+
+    Runs in a worker process. Only pixel data is re-encoded, so EXIF (GPS,
+    camera serials, ...) and other metadata are dropped.
+    """
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        variants = {}
+        for name, max_side in IMAGE_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, format=IMAGE_FORMAT, quality=IMAGE_QUALITY)
+            variants[name] = (buffer.getvalue(), resized.width, resized.height)
+    return variants
+
+_image_pool = None
+
+def image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _image_pool
+
+def shutdown_image_pool():
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
+
+async def store_blob(data: bytes, content_type: str, metadata: Optional[dict] = None) -> str:
+    """Store ``data`` (idempotently, by content hash) and return its media id."""
+    media_id = hashlib.sha256(data).hexdigest()
+    if not await db.media.find_one({"id": media_id}, {"_id": 1}):
+        await media_store.put(media_id, data, content_type)
+        try:
+            await db.media.insert_one({
+                "id": media_id,
+                "content_type": content_type,
+                "size": len(data),
+                **(metadata or {}),
+                "created_at": datetime.now(timezone.utc).isoformat()
+            })
+        except DuplicateKeyError:
+            pass
+    return media_id
+
+async def store_media(data: bytes, content_type: str) -> str:
+    """Store an uploaded photo as resized variants and return the reference to its full size.
+
+    Uploads are keyed by the hash of the original bytes, so re-uploading the
+    same photo reuses the existing variants without re-encoding.
+    """
+    if len(data) > MEDIA_MAX_BYTES:
+        raise HTTPException(status_code=400, detail=f"Photo exceeds {MEDIA_MAX_BYTES // (1024 * 1024)}MB limit")
+    source_id = hashlib.sha256(data).hexdigest()
+    # A stored image uploaded again (e.g. restored from an export) is reused as-is
+    existing = await db.media.find_one({"$or": [{"source_id": source_id}, {"id": source_id}]}, {"_id": 0, "id": 1})
+    if existing:
+        return media_ref(existing["id"])
+    
+    loop = asyncio.get_running_loop()
+    try:
+        rendered = await loop.run_in_executor(image_pool(), render_image_variants, data)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        raise HTTPException(status_code=400, detail="Unsupported or corrupt image")
+    
+    variant_ids = {}
+    for name, (blob, width, height) in rendered.items():
+        variant_ids[name] = await store_blob(blob, IMAGE_CONTENT_TYPE, {"width": width, "height": height})
+    await db.media.update_one(
+        {"id": variant_ids["full"]},
+        {"$set": {"source_id": source_id, "variants": variant_ids}}
+    )
+    return media_ref(variant_ids["full"])
+
+async def ingest_photo(photo: str) -> str:
+    """Move an inline data URL into the media store; other values pass through."""
+    match = DATA_URL_PATTERN.match(photo or "")
+    if not match:
+        return photo
+    try:
+        data = base64.b64decode(match.group(2), validate=False)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid photo data")
+    return await store_media(data, match.group(1).lower())
+
+async def ingest_photos(photos: List[str]) -> List[str]:
+    return [await ingest_photo(photo) for photo in photos]
+
+async def migrate_inline_media(database, batch_size: int = 100) -> dict:
+    """Extract base64 photos embedded in inventory and vehicle documents.
+
+    Documents are visited once each in _id order. A photo that cannot be
+    stored (corrupt or oversized image) is logged, left in place and counted
+    in ``skipped``.
+    """
+    migrated = {"inventory": 0, "vehicles": 0, "skipped": 0}
+    
+    async def migrate_photo(photo: str, collection: str, doc_id: str) -> str:
+        try:
+            return await ingest_photo(photo)
+        except HTTPException as e:
+            logging.warning(f"Skipping photo on {collection} {doc_id}: {e.detail}")
+            migrated["skipped"] += 1
+            return photo
+    
+    for collection, field in (("inventory", "photos"), ("vehicles", "photo")):
+        last_id = None
+        while True:
+            query = {field: {"$regex": DATA_URL_PREFIX, "$options": "i"}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            docs = await database[collection].find(
+                query, {"_id": 1, "id": 1, field: 1}
+            ).sort("_id", ASCENDING).to_list(batch_size)
+            if not docs:
+                break
+            for doc in docs:
+                if field == "photos":
+                    value = [await migrate_photo(photo, collection, doc["id"]) for photo in doc["photos"]]
+                else:
+                    value = await migrate_photo(doc["photo"], collection, doc["id"])
+                await database[collection].update_one({"_id": doc["_id"]}, {"$set": {field: value}})
+            migrated[collection] += len(docs)
+            last_id = docs[-1]["_id"]
+    if migrated["inventory"] or migrated["vehicles"]:
+        await database.collection_versions.update_many({}, {"$inc": {"inventory": 1, "vehicles": 1}})
+    return migrated
+
+# ============== CONDITIONAL REQUESTS ==============
+
+# Each user has one collection_versions document holding a counter per
+# collection. Every write bumps the counters of the collections it touches;
+# list endpoints derive a weak ETag from them and answer If-None-Match with a
+# 304 before running their query. Single-document GETs and PUTs instead use a
+# strong ETag holding the document's updated_at, which If-Match accepts.
+VERSIONED_COLLECTIONS = ("inventory", "vehicles", "setups", "setup_groups", "repairs")
+ETAG_SCHEMA = "1"  # bump when response shapes change
+
+async def bump_versions(user_id: str, *collections: str):
+    """Record a write to ``collections``; call after the write has completed."""
+    await db.collection_versions.update_one(
+        {"user_id": user_id},
+        {"$inc": {collection: 1 for collection in collections}},
+        upsert=True
+    )
+    invalidate_dashboard(user_id)
+
+def compute_etag(request: Request, user_id: str, versions: dict, collections: tuple) -> str:
+    parts = [ETAG_SCHEMA, user_id, request.url.path, str(sorted(request.query_params.multi_items()))]
+    parts.extend(f"{collection}:{versions.get(collection, 0)}" for collection in collections)
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: ignore the W/ prefix on either side
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+async def conditional_get(request: Request, response: Response, user_id: str, *collections: str) -> Optional[Response]:
+    """Return a 304 response if the client's copy is current, else set the ETag and return None."""
+    versions = await db.collection_versions.find_one({"user_id": user_id}, {"_id": 0}) or {}
+    etag = compute_etag(request, user_id, versions, collections)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def document_etag(doc: dict) -> Optional[str]:
+    """Strong ETag for one document: its updated_at, quoted."""
+    return f'"{doc["updated_at"]}"' if doc.get("updated_at") else None
+
+def conditional_document(request: Request, response: Response, doc: dict) -> Optional[Response]:
+    """Return a 304 response if the client holds ``doc``'s version, else set its ETag and return None."""
+    etag = document_etag(doc)
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+# PUT endpoints accept an optional If-Match header carrying the ETag of the
+# version the client edited (from a detail GET or a previous PUT); the update
+# only applies if it is unchanged.
+def version_filter(if_match: Optional[str]) -> dict:
+    if not if_match or if_match.strip() == "*":
+        return {}
+    tags = [tag.strip() for tag in if_match.split(",")]
+    # Strong comparison: weak or malformed tags never match
+    versions = [tag[1:-1] for tag in tags if len(tag) > 2 and tag[0] == tag[-1] == '"']
+    return {"updated_at": {"$in": versions}}
+
+async def update_and_fetch(
+    collection,
+    query: dict,
+    update,
+    response: Response,
+    if_match: Optional[str],
+    not_found: str,
+    projection: Optional[dict] = None,
+    return_document: ReturnDocument = ReturnDocument.AFTER
+) -> dict:
+    """Apply ``update`` and return the new document in one round trip.
+
+    A miss costs one extra count to tell 404 from 412 (If-Match mismatch).
+    The response carries the new version as its ETag; callers asking for
+    the document as it was BEFORE the update set the ETag themselves.
+    """
+    doc = await collection.find_one_and_update(
+        {**query, **version_filter(if_match)},
+        update,
+        projection=projection or {"_id": 0},
+        return_document=return_document
+    )
+    if doc is None:
+        if if_match and await collection.count_documents(query, limit=1):
+            raise HTTPException(status_code=412, detail="Modified since If-Match version")
+        raise HTTPException(status_code=404, detail=not_found)
+    if return_document == ReturnDocument.AFTER:
+        response.headers["ETag"] = document_etag(doc)
+    return doc
+
 # ============== AUTH ROUTES ==============
 
 @api_router.post("/auth/register", response_model=TokenResponse)
@@ -464,64 +1497,192 @@ async def update_account(update_data: AccountUpdate, current_user: dict = Depend
     if not updates:
         raise HTTPException(status_code=400, detail="No updates provided")
     
+    # principal_updated_at is what other processes' revocation sync picks up
+    updates["principal_updated_at"] = datetime.now(timezone.utc).isoformat()
     await db.users.update_one(
         {"id": current_user["id"]},
         {"$set": updates}
     )
+    principal_cache.invalidate_user(current_user["id"])
     
     # Get updated user
-    updated_user = await db.users.find_one({"id": current_user["id"]}, {"_id": 0, "password": 0})
+    updated_user = await db.users.find_one(
+        {"id": current_user["id"]}, {"_id": 0, "password": 0, "principal_updated_at": 0}
+    )
     return updated_user
 
+# Exports are streamed section by section from cursors read in batches, so
+# memory stays flat however much history an account has, and the download
+# starts as soon as the first batch is read. Photos are held in the media
+# store, so by default each one is written into the export as a data URL
+# (read one at a time) and a restore on any instance gets them back;
+# media=refs keeps the /api/media/ references instead, which only resolve
+# on an instance that still holds the media.
+EXPORT_SECTIONS = ("vehicles", "inventory", "repairs", "setups", "stocktakes", "feedback")
+EXPORT_BATCH_SIZE = 200
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson", "zip": "application/zip"}
+
+def export_json(record) -> str:
+    return json.dumps(record, default=str, ensure_ascii=False)
+
+async def inline_media(photo: str) -> str:
+    """The image behind a media reference as a data URL; anything else (or missing media) as-is."""
+    match = MEDIA_REF_PATTERN.match(photo or "")
+    if not match:
+        return photo
+    media = await db.media.find_one({"id": match.group(1)}, {"_id": 0, "content_type": 1})
+    if not media:
+        return photo
+    try:
+        chunks = await media_store.stream(match.group(1))
+    except HTTPException:
+        return photo
+    data = b"".join([chunk async for chunk in chunks])
+    return f"data:{media['content_type']};base64,{base64.b64encode(data).decode()}"
+
+async def export_sections(user_id: str, media: str = "inline"):
+    """(section, async iterable of records) for each of EXPORT_SECTIONS, in order."""
+    vehicle_ids = []
+    
+    async def vehicles():
+        async for vehicle in db.vehicles.find(
+            {"user_id": user_id, **NOT_PENDING_DELETION}, {"_id": 0, "deletion_id": 0}
+        ).batch_size(EXPORT_BATCH_SIZE):
+            vehicle_ids.append(vehicle["id"])
+            if media == "inline":
+                vehicle["photo"] = await inline_media(vehicle.get("photo", ""))
+            yield vehicle
+    
+    async def inventory():
+        async for item in db.inventory.find(
+            {"user_id": user_id}, {**ITEM_PROJECTION, "is_low_stock": 0}
+        ).batch_size(EXPORT_BATCH_SIZE):
+            if media == "inline":
+                item["photos"] = [await inline_media(photo) for photo in item.get("photos", [])]
+            yield item
+    
+    yield "vehicles", vehicles()
+    yield "inventory", inventory()
+    yield "repairs", db.repairs.find({"user_id": user_id}, {"_id": 0}).batch_size(EXPORT_BATCH_SIZE)
+    # Resumed only after vehicles() is exhausted, so vehicle_ids is complete
+    yield "setups", db.setups.find({"vehicle_id": {"$in": vehicle_ids}}, {"_id": 0}).batch_size(EXPORT_BATCH_SIZE)
+    yield "stocktakes", db.stocktake_records.find({"user_id": user_id}, {"_id": 0}).batch_size(EXPORT_BATCH_SIZE)
+    yield "feedback", db.feedback.find({"user_id": user_id}, {"_id": 0}).batch_size(EXPORT_BATCH_SIZE)
+
+async def export_json_text(user_id: str, header: dict):
+    """The export as one JSON document: header fields, then an array per section."""
+    yield export_json(header)[:-1]
+    async for section, records in export_sections(user_id, header["media"]):
+        yield f', "{section}": ['
+        separator = ""
+        async for record in records:
+            yield separator + export_json(record)
+            separator = ", "
+        yield "]"
+    yield "}\n"
+
+async def export_ndjson_text(user_id: str, header: dict):
+    """One JSON object per line: the header, then {"section", "record"} per record."""
+    yield export_json({"section": "export", "record": header}) + "\n"
+    async for section, records in export_sections(user_id, header["media"]):
+        async for record in records:
+            yield export_json({"section": section, "record": record}) + "\n"
+
+async def export_chunks(pieces, compress: bool):
+    """Join text pieces into ~EXPORT_CHUNK_BYTES chunks, gzip-compressed if asked."""
+    encoder = zlib.compressobj(wbits=31) if compress else None
+    buffer, size = [], 0
+    async for piece in pieces:
+        data = piece.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            chunk = b"".join(buffer)
+            buffer, size = [], 0
+            chunk = encoder.compress(chunk) if encoder else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(buffer)
+    yield encoder.compress(chunk) + encoder.flush() if encoder else chunk
+
+class ExportSink:
+    """Write-only file object for zipfile whose output is drained as it is produced."""
+    def __init__(self):
+        self.buffer = []
+        self.size = 0
+    
+    def write(self, data) -> int:
+        self.buffer.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.buffer)
+        self.buffer, self.size = [], 0
+        return data
+
+async def export_zip_chunks(user_id: str, header: dict):
+    """A zip archive of manifest.json plus one <section>.ndjson entry per section."""
+    sink = ExportSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("manifest.json", json.dumps({**header, "sections": list(EXPORT_SECTIONS)}, indent=2))
+        async for section, records in export_sections(user_id, header["media"]):
+            with archive.open(f"{section}.ndjson", "w") as entry:
+                async for record in records:
+                    entry.write((export_json(record) + "\n").encode())
+                    if sink.size >= EXPORT_CHUNK_BYTES:
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
 @api_router.get("/account/export")
-async def export_account_data(current_user: dict = Depends(get_current_user)):
-    """Export all user data as JSON."""
+async def export_account_data(
+    format: Literal["json", "ndjson", "zip"] = "json",
+    media: Literal["inline", "refs"] = "inline",
+    accept_encoding: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Export all user data as a streamed JSON document, NDJSON or zip archive.
+
+    JSON and NDJSON bodies are gzip-encoded when the client accepts it.
+    ``media=inline`` (the default) embeds photos as data URLs so the export
+    is a complete backup; ``media=refs`` keeps /api/media/ references only.
+    """
     user_id = current_user["id"]
-    
-    # Gather all user data
-    export_data = {
+    header = {
         "exported_at": datetime.now(timezone.utc).isoformat(),
+        "media": media,
         "user": {
             "id": current_user["id"],
             "email": current_user["email"],
             "name": current_user["name"],
             "created_at": current_user.get("created_at")
-        },
-        "vehicles": [],
-        "inventory": [],
-        "repairs": [],
-        "setups": [],
-        "stocktakes": [],
-        "feedback": []
+        }
     }
+    filename = f"rallycommand-data-{header['exported_at'][:10]}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    if format == "zip":
+        return StreamingResponse(export_zip_chunks(user_id, header), media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
     
-    # Get vehicles
-    vehicles = await db.vehicles.find({"user_id": user_id}, {"_id": 0}).to_list(None)
-    export_data["vehicles"] = vehicles
-    
-    # Get inventory
-    inventory = await db.inventory.find({"user_id": user_id}, {"_id": 0}).to_list(None)
-    export_data["inventory"] = inventory
-    
-    # Get repairs
-    repairs = await db.repairs.find({"user_id": user_id}, {"_id": 0}).to_list(None)
-    export_data["repairs"] = repairs
-    
-    # Get setups for user's vehicles
-    vehicle_ids = [v["id"] for v in vehicles]
-    if vehicle_ids:
-        setups = await db.setups.find({"vehicle_id": {"$in": vehicle_ids}}, {"_id": 0}).to_list(None)
-        export_data["setups"] = setups
-    
-    # Get stocktakes
-    stocktakes = await db.stocktake_records.find({"user_id": user_id}, {"_id": 0}).to_list(None)
-    export_data["stocktakes"] = stocktakes
-    
-    # Get feedback
-    feedback = await db.feedback.find({"user_id": user_id}, {"_id": 0}).to_list(None)
-    export_data["feedback"] = feedback
-    
-    return export_data
+    text = export_json_text(user_id, header) if format == "json" else export_ndjson_text(user_id, header)
+    compress = "gzip" in (accept_encoding or "").lower()
+    headers["Vary"] = "Accept-Encoding"
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(export_chunks(text, compress), media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+# Imports remap every exported ID in memory (vehicles first, since the other
+# sections reference them) and write each collection with unordered
+# insert_many batches rather than one round trip per record. A record that
+# fails to build or insert is reported in stats["errors"] and skipped.
+IMPORT_BATCH_SIZE = 1000
+
+class ImportSkipped(Exception):
+    """A record that cannot be imported; the message is reported as-is."""
 
 class ImportData(BaseModel):
     vehicles: List[dict] = []
@@ -530,174 +1691,315 @@ class ImportData(BaseModel):
     setups: List[dict] = []
     stocktakes: List[dict] = []
 
-@api_router.post("/account/import")
-async def import_account_data(import_data: ImportData, current_user: dict = Depends(get_current_user)):
-    """Import user data from a JSON file. Creates new records with new IDs."""
-    user_id = current_user["id"]
-    now = datetime.now(timezone.utc).isoformat()
-    
-    stats = {
-        "vehicles_imported": 0,
-        "inventory_imported": 0,
-        "repairs_imported": 0,
-        "setups_imported": 0,
-        "stocktakes_imported": 0,
-        "errors": []
+def new_import_id(context: dict) -> str:
+    """A fresh record ID; deterministic within an import job (see IMPORT JOBS)."""
+    if "job_id" not in context:
+        return str(uuid.uuid4())
+    context["ordinal"] += 1
+    return str(uuid.uuid5(IMPORT_ID_NAMESPACE, f"{context['job_id']}:{context['ordinal']}"))
+
+def imported_vehicle_id(record: dict, context: dict, label: str) -> str:
+    new_vehicle_id = context["vehicle_ids"].get(record.get("vehicle_id"))
+    if not new_vehicle_id:
+        raise ImportSkipped(f"{label} skipped: vehicle not found")
+    return new_vehicle_id
+
+async def import_photo(photo: str, context: dict, label: str) -> str:
+    """Store an imported photo; a media reference this instance cannot serve is dropped and reported."""
+    match = MEDIA_REF_PATTERN.match(photo or "")
+    if match and not await db.media.find_one({"id": match.group(1)}, {"_id": 1}):
+        context.setdefault("media_errors", []).append(
+            f"{label} photo {photo} is not on this server (export with media=inline to include photos); imported without it"
+        )
+        return ""
+    return await ingest_photo(photo)
+
+async def import_vehicle_doc(vehicle: dict, context: dict) -> dict:
+    return {
+        "id": new_import_id(context),
+        "make": vehicle.get("make", "Unknown"),
+        "model": vehicle.get("model", "Unknown"),
+        "registration": vehicle.get("registration", ""),
+        "vin": vehicle.get("vin", ""),
+        "photo": await import_photo(vehicle.get("photo", ""), context, "Vehicle"),
+        "user_id": context["user_id"],
+        "created_at": context["now"],
+        "updated_at": context["now"]
     }
+
+async def import_item_doc(item: dict, context: dict) -> dict:
+    vehicle_ids = context["vehicle_ids"]
+    new_item = {
+        "id": new_import_id(context),
+        "name": item.get("name", "Unknown"),
+        "part_number": item.get("part_number", ""),
+        "category": item.get("category", "parts"),
+        "subcategory": item.get("subcategory", ""),
+        "quantity": item.get("quantity", 0),
+        "min_stock": item.get("min_stock", 1),
+        "price": item.get("price", 0),
+        "supplier": item.get("supplier", ""),
+        "location": item.get("location", ""),
+        "notes": item.get("notes", ""),
+        "photos": [photo for photo in [
+            await import_photo(photo, context, "Inventory item") for photo in item.get("photos", [])[:3]
+        ] if photo],
+        "vehicle_ids": [vehicle_ids[vid] for vid in item.get("vehicle_ids", []) if vid in vehicle_ids],
+        "condition": item.get("condition", ""),
+        "user_id": context["user_id"],
+        "created_at": context["now"],
+        "updated_at": context["now"]
+    }
+    new_item.update(build_search_fields(new_item))
+    new_item["is_low_stock"] = is_low_stock(new_item)
+    return new_item
+
+async def import_repair_doc(repair: dict, context: dict) -> dict:
+    return {
+        "id": new_import_id(context),
+        "vehicle_id": imported_vehicle_id(repair, context, "Repair"),
+        "cause_of_damage": repair.get("cause_of_damage", ""),
+        "affected_area": repair.get("affected_area", ""),
+        "parts_used": repair.get("parts_used", []),
+        "total_parts_cost": repair.get("total_parts_cost", 0),
+        "repair_details": repair.get("repair_details", ""),
+        "technicians": repair.get("technicians", []),
+        "user_id": context["user_id"],
+        "created_at": context["now"],
+        "updated_at": context["now"]
+    }
+
+async def import_setup_doc(setup: dict, context: dict) -> dict:
+    return {
+        "id": new_import_id(context),
+        "name": setup.get("name", "Imported Setup"),
+        "vehicle_id": imported_vehicle_id(setup, context, "Setup"),
+        "user_id": context["user_id"],
+        "conditions": setup.get("conditions", ""),
+        "tyre_compound": setup.get("tyre_compound", ""),
+        "tyre_type": setup.get("tyre_type", ""),
+        "tyre_size": setup.get("tyre_size", ""),
+        "tyre_condition": setup.get("tyre_condition", ""),
+        "tyre_pressure_fl": setup.get("tyre_pressure_fl", 0),
+        "tyre_pressure_fr": setup.get("tyre_pressure_fr", 0),
+        "tyre_pressure_rl": setup.get("tyre_pressure_rl", 0),
+        "tyre_pressure_rr": setup.get("tyre_pressure_rr", 0),
+        "ride_height_fl": setup.get("ride_height_fl", 0),
+        "ride_height_fr": setup.get("ride_height_fr", 0),
+        "ride_height_rl": setup.get("ride_height_rl", 0),
+        "ride_height_rr": setup.get("ride_height_rr", 0),
+        "camber_front": setup.get("camber_front", 0),
+        "camber_rear": setup.get("camber_rear", 0),
+        "toe_front": setup.get("toe_front", 0),
+        "toe_rear": setup.get("toe_rear", 0),
+        "spring_rate_front": setup.get("spring_rate_front", 0),
+        "spring_rate_rear": setup.get("spring_rate_rear", 0),
+        "damper_front": setup.get("damper_front", 0),
+        "damper_rear": setup.get("damper_rear", 0),
+        "arb_front": setup.get("arb_front", 0),
+        "arb_rear": setup.get("arb_rear", 0),
+        "aero_front": setup.get("aero_front", ""),
+        "aero_rear": setup.get("aero_rear", ""),
+        "event_name": setup.get("event_name", ""),
+        "event_date": setup.get("event_date", ""),
+        "rating": setup.get("rating", 0),
+        "notes": setup.get("notes", ""),
+        "created_at": context["now"],
+        "updated_at": context["now"]
+    }
+
+async def import_stocktake_doc(stocktake: dict, context: dict) -> dict:
+    return {
+        "id": new_import_id(context),
+        "user_id": context["user_id"],
+        "items": stocktake.get("items", []),
+        "notes": stocktake.get("notes", ""),
+        "status": stocktake.get("status", "completed"),
+        "created_at": context["now"],
+        "applied_at": stocktake.get("applied_at")
+    }
+
+# section -> (collection, label used in error messages, document builder)
+IMPORT_SECTIONS = {
+    "vehicles": ("vehicles", "Vehicle", import_vehicle_doc),
+    "inventory": ("inventory", "Inventory", import_item_doc),
+    "repairs": ("repairs", "Repair", import_repair_doc),
+    "setups": ("setups", "Setup", import_setup_doc),
+    "stocktakes": ("stocktake_records", "Stocktake", import_stocktake_doc),
+}
+
+def new_import_stats() -> dict:
+    stats = {}
+    for section in IMPORT_SECTIONS:
+        stats.update({f"{section}_imported": 0, f"{section}_updated": 0, f"{section}_unchanged": 0})
+    return {**stats, "errors": []}
+
+# Every imported document records where it came from (import_source, the
+# record's ID in the backup) and a content_hash over its canonical fields:
+# everything the import writes except IDs, ownership, timestamps and
+# derived fields. In merge mode a record whose source ID or content matches
+# an existing document is compared by hash and skipped when unchanged or
+# updated in place when not, so restoring the same backup twice, or syncing
+# the same data between devices repeatedly, writes only what changed.
+IMPORT_VOLATILE_FIELDS = {"id", "user_id", "created_at", "updated_at", "search_tokens", "search_terms",
+                          "is_low_stock", "import_source", "content_hash"}
+
+def import_content_hash(doc: dict, fields: List[str]) -> str:
+    canonical = json.dumps({field: doc.get(field) for field in fields}, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def fingerprint_import_doc(doc: dict, source: dict) -> List[str]:
+    """Stamp import_source and content_hash on a built document; returns its canonical fields."""
+    fields = sorted(set(doc) - IMPORT_VOLATILE_FIELDS)
+    if source.get("id") is not None:
+        doc["import_source"] = str(source["id"])
+    doc["content_hash"] = import_content_hash(doc, fields)
+    return fields
+
+async def merge_import_batch(section: str, docs: List[dict], sources: List[dict], context: dict, stats: dict) -> tuple:
+    """Apply a batch's matches with existing documents; returns the (docs, sources) still to insert."""
+    collection, label, _ = IMPORT_SECTIONS[section]
+    fields = {doc["id"]: fingerprint_import_doc(doc, source) for doc, source in zip(docs, sources)}
+    # A record exported from an imported copy also carries the ID it was
+    # originally imported from, so data synced A -> B -> A finds its original
+    keys = [[str(key) for key in (source.get("id"), source.get("import_source")) if key is not None] for source in sources]
+    source_ids = [key for doc_keys in keys for key in doc_keys]
+    projection = {"_id": 0, "id": 1, "import_source": 1, "content_hash": 1, "user_id": 1, "created_at": 1}
+    projection.update({field: 1 for doc_fields in fields.values() for field in doc_fields})
+    existing = await db[collection].find({
+        "user_id": context["user_id"],
+        **NOT_PENDING_DELETION,
+        "$or": [
+            {"id": {"$in": source_ids}},
+            {"import_source": {"$in": source_ids}},
+            {"content_hash": {"$in": [doc["content_hash"] for doc in docs]}}
+        ]
+    }, projection).to_list(None)
+    # Content only identifies documents that were not imported; identical
+    # records (two equal repairs, say) each keep their own document
+    by_hash = {}
+    for match in existing:
+        if match.get("content_hash") and not match.get("import_source"):
+            by_hash.setdefault(match["content_hash"], []).append(match)
+    by_source = {match["import_source"]: match for match in existing if match.get("import_source")}
+    # A record restored into the account it came from matches its original
+    by_source.update({match["id"]: match for match in existing})
     
-    # Map old vehicle IDs to new ones
-    vehicle_id_map = {}
-    
-    # Import vehicles
-    for vehicle in import_data.vehicles:
+    pending_docs, pending_sources, updates, changes = [], [], [], []
+    claimed = set()  # existing documents already matched in this batch
+    for doc, source, doc_keys in zip(docs, sources, keys):
+        candidates = [by_source[key] for key in doc_keys if key in by_source] + by_hash.get(doc["content_hash"], [])
+        match = next((candidate for candidate in candidates if candidate["id"] not in claimed), None)
+        if match is None:
+            pending_docs.append(doc)
+            pending_sources.append(source)
+            continue
+        claimed.add(match["id"])
+        if section == "vehicles":
+            context["vehicle_ids"][source.get("id")] = match["id"]
+        if import_content_hash(match, fields[doc["id"]]) == doc["content_hash"]:
+            stats[f"{section}_unchanged"] += 1
+            continue
+        changed = {key: value for key, value in doc.items() if key not in ("id", "user_id", "created_at", "import_source")}
+        changed["updated_at"] = datetime.now(timezone.utc).isoformat()
+        updates.append(UpdateOne({"id": match["id"], "user_id": context["user_id"]}, {"$set": changed}))
+        changes.append((match, {**match, **changed}))
+    if updates:
+        counted = counted_inventory_write(context["user_id"]) if section == "inventory" else nullcontext()
+        async with counted:
+            try:
+                await db[collection].bulk_write(updates, ordered=False)
+                stats[f"{section}_updated"] += len(updates)
+            except BulkWriteError as e:
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                stats["errors"].extend(f"{label} import error: {error.get('errmsg', 'write failed')}"
+                                       for error in e.details.get("writeErrors", []))
+                stats[f"{section}_updated"] += len(updates) - len(failed)
+                changes = [change for index, change in enumerate(changes) if index not in failed]
+            if section == "inventory":
+                await update_inventory_counters(context["user_id"], changes)
+        if section == "repairs":
+            await update_repair_rollups(changes)
+    return pending_docs, pending_sources
+
+async def import_section(section: str, records: List[dict], context: dict, stats: dict) -> List[dict]:
+    """Build and insert one section's records; returns the documents written."""
+    collection, label, build = IMPORT_SECTIONS[section]
+    docs = []
+    sources = []
+    for record in records:
         try:
-            old_id = vehicle.get("id")
-            new_id = str(uuid.uuid4())
-            vehicle_id_map[old_id] = new_id
-            
-            new_vehicle = {
-                "id": new_id,
-                "make": vehicle.get("make", "Unknown"),
-                "model": vehicle.get("model", "Unknown"),
-                "registration": vehicle.get("registration", ""),
-                "vin": vehicle.get("vin", ""),
-                "photo": vehicle.get("photo", ""),
-                "user_id": user_id,
-                "created_at": now,
-                "updated_at": now
-            }
-            await db.vehicles.insert_one(new_vehicle)
-            stats["vehicles_imported"] += 1
+            docs.append(await build(record, context))
+            sources.append(record)
+        except ImportSkipped as e:
+            stats["errors"].append(str(e))
         except Exception as e:
-            stats["errors"].append(f"Vehicle import error: {str(e)}")
+            stats["errors"].append(f"{label} import error: {str(e)}")
+    stats["errors"].extend(context.pop("media_errors", []))
     
-    # Import inventory
-    for item in import_data.inventory:
-        try:
-            # Map old vehicle IDs to new ones
-            old_vehicle_ids = item.get("vehicle_ids", [])
-            new_vehicle_ids = [vehicle_id_map.get(vid, vid) for vid in old_vehicle_ids if vid in vehicle_id_map]
-            
-            new_item = {
-                "id": str(uuid.uuid4()),
-                "name": item.get("name", "Unknown"),
-                "part_number": item.get("part_number", ""),
-                "category": item.get("category", "parts"),
-                "subcategory": item.get("subcategory", ""),
-                "quantity": item.get("quantity", 0),
-                "min_stock": item.get("min_stock", 1),
-                "price": item.get("price", 0),
-                "supplier": item.get("supplier", ""),
-                "location": item.get("location", ""),
-                "notes": item.get("notes", ""),
-                "photos": item.get("photos", []),
-                "vehicle_ids": new_vehicle_ids,
-                "condition": item.get("condition", ""),
-                "user_id": user_id,
-                "created_at": now,
-                "updated_at": now
-            }
-            await db.inventory.insert_one(new_item)
-            stats["inventory_imported"] += 1
-        except Exception as e:
-            stats["errors"].append(f"Inventory import error: {str(e)}")
+    written = []
+    imported = 0
+    for start in range(0, len(docs), IMPORT_BATCH_SIZE):
+        batch, batch_sources = docs[start:start + IMPORT_BATCH_SIZE], sources[start:start + IMPORT_BATCH_SIZE]
+        if context.get("mode") == "merge":
+            batch, batch_sources = await merge_import_batch(section, batch, batch_sources, context, stats)
+        else:
+            for doc, source in zip(batch, batch_sources):
+                fingerprint_import_doc(doc, source)
+        if not batch:
+            continue
+        failed, existing = set(), set()
+        counted = counted_inventory_write(context["user_id"]) if section == "inventory" else nullcontext()
+        async with counted:
+            try:
+                await db[collection].insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    if error.get("code") == 11000 and "job_id" in context:
+                        # Written by an earlier attempt at this job chunk
+                        existing.add(error["index"])
+                        continue
+                    failed.add(error["index"])
+                    stats["errors"].append(f"{label} import error: {error.get('errmsg', 'write failed')}")
+            batch_written = []
+            for index, doc in enumerate(batch):
+                if index in failed:
+                    continue
+                imported += 1
+                if section == "vehicles":
+                    context["vehicle_ids"][batch_sources[index].get("id")] = doc["id"]
+                if index not in existing:
+                    doc.pop("_id", None)
+                    batch_written.append(doc)
+            if section == "inventory":
+                await update_inventory_counters(context["user_id"], [(None, item) for item in batch_written])
+        written.extend(batch_written)
+    stats[f"{section}_imported"] += imported
     
-    # Import repairs
-    for repair in import_data.repairs:
-        try:
-            old_vehicle_id = repair.get("vehicle_id")
-            new_vehicle_id = vehicle_id_map.get(old_vehicle_id)
-            
-            if not new_vehicle_id:
-                stats["errors"].append(f"Repair skipped: vehicle not found")
-                continue
-            
-            new_repair = {
-                "id": str(uuid.uuid4()),
-                "vehicle_id": new_vehicle_id,
-                "cause_of_damage": repair.get("cause_of_damage", ""),
-                "affected_area": repair.get("affected_area", ""),
-                "parts_used": repair.get("parts_used", []),
-                "total_parts_cost": repair.get("total_parts_cost", 0),
-                "repair_details": repair.get("repair_details", ""),
-                "technicians": repair.get("technicians", []),
-                "user_id": user_id,
-                "created_at": now,
-                "updated_at": now
-            }
-            await db.repairs.insert_one(new_repair)
-            stats["repairs_imported"] += 1
-        except Exception as e:
-            stats["errors"].append(f"Repair import error: {str(e)}")
+    if section == "repairs":
+        await update_repair_rollups([(None, repair) for repair in written])
+    return written
+
+@api_router.post("/account/import")
+async def import_account_data(
+    import_data: ImportData,
+    mode: Literal["create", "merge"] = "create",
+    current_user: dict = Depends(get_current_user)
+):
+    """Import user data from a JSON file.
+
+    ``create`` adds every record with a new ID; ``merge`` skips records that
+    already exist unchanged and updates those that differ.
+    """
+    user_id = current_user["id"]
+    context = {"user_id": user_id, "now": datetime.now(timezone.utc).isoformat(), "vehicle_ids": {}, "mode": mode}
+    stats = new_import_stats()
     
-    # Import setups
-    for setup in import_data.setups:
-        try:
-            old_vehicle_id = setup.get("vehicle_id")
-            new_vehicle_id = vehicle_id_map.get(old_vehicle_id)
-            
-            if not new_vehicle_id:
-                stats["errors"].append(f"Setup skipped: vehicle not found")
-                continue
-            
-            new_setup = {
-                "id": str(uuid.uuid4()),
-                "name": setup.get("name", "Imported Setup"),
-                "vehicle_id": new_vehicle_id,
-                "user_id": user_id,
-                "conditions": setup.get("conditions", ""),
-                "tyre_compound": setup.get("tyre_compound", ""),
-                "tyre_type": setup.get("tyre_type", ""),
-                "tyre_size": setup.get("tyre_size", ""),
-                "tyre_condition": setup.get("tyre_condition", ""),
-                "tyre_pressure_fl": setup.get("tyre_pressure_fl", 0),
-                "tyre_pressure_fr": setup.get("tyre_pressure_fr", 0),
-                "tyre_pressure_rl": setup.get("tyre_pressure_rl", 0),
-                "tyre_pressure_rr": setup.get("tyre_pressure_rr", 0),
-                "ride_height_fl": setup.get("ride_height_fl", 0),
-                "ride_height_fr": setup.get("ride_height_fr", 0),
-                "ride_height_rl": setup.get("ride_height_rl", 0),
-                "ride_height_rr": setup.get("ride_height_rr", 0),
-                "camber_front": setup.get("camber_front", 0),
-                "camber_rear": setup.get("camber_rear", 0),
-                "toe_front": setup.get("toe_front", 0),
-                "toe_rear": setup.get("toe_rear", 0),
-                "spring_rate_front": setup.get("spring_rate_front", 0),
-                "spring_rate_rear": setup.get("spring_rate_rear", 0),
-                "damper_front": setup.get("damper_front", 0),
-                "damper_rear": setup.get("damper_rear", 0),
-                "arb_front": setup.get("arb_front", 0),
-                "arb_rear": setup.get("arb_rear", 0),
-                "aero_front": setup.get("aero_front", ""),
-                "aero_rear": setup.get("aero_rear", ""),
-                "event_name": setup.get("event_name", ""),
-                "event_date": setup.get("event_date", ""),
-                "rating": setup.get("rating", 0),
-                "notes": setup.get("notes", ""),
-                "created_at": now,
-                "updated_at": now
-            }
-            await db.setups.insert_one(new_setup)
-            stats["setups_imported"] += 1
-        except Exception as e:
-            stats["errors"].append(f"Setup import error: {str(e)}")
+    # Vehicles are written first so only vehicles that made it in are mapped
+    for section in IMPORT_SECTIONS:
+        await import_section(section, getattr(import_data, section), context, stats)
     
-    # Import stocktakes
-    for stocktake in import_data.stocktakes:
-        try:
-            new_stocktake = {
-                "id": str(uuid.uuid4()),
-                "user_id": user_id,
-                "items": stocktake.get("items", []),
-                "notes": stocktake.get("notes", ""),
-                "status": stocktake.get("status", "completed"),
-                "created_at": now,
-                "applied_at": stocktake.get("applied_at")
-            }
-            await db.stocktake_records.insert_one(new_stocktake)
-            stats["stocktakes_imported"] += 1
-        except Exception as e:
-            stats["errors"].append(f"Stocktake import error: {str(e)}")
+    await bump_versions(user_id, "vehicles", "inventory", "repairs", "setups")
     
     return {
         "status": "success",
@@ -714,34 +2016,900 @@ async def delete_account(delete_data: AccountDelete, current_user: dict = Depend
     
     user_id = current_user["id"]
     
-    # Get vehicle IDs for deleting setups
+    # Setups are keyed by vehicle, so capture the vehicle IDs for the cascade
     vehicles = await db.vehicles.find({"user_id": user_id}, {"id": 1}).to_list(None)
-    vehicle_ids = [v["id"] for v in vehicles]
+    job = await start_deletion("account", user_id, [user_id], [v["id"] for v in vehicles])
+    dashboard_cache.invalidate(user_id)
     
-    # Delete all user data
-    await db.inventory.delete_many({"user_id": user_id})
-    await db.usage_logs.delete_many({"user_id": user_id})
-    await db.repairs.delete_many({"user_id": user_id})
-    await db.stocktake_records.delete_many({"user_id": user_id})
-    await db.feedback.delete_many({"user_id": user_id})
+    # The user record is gone; the rest of their data is removed in the background
+    return {"status": "success", "message": "Account deleted", "deletion_id": job["id"] if job else None}
+
+
+# ============== IMPORT JOBS ==============
+
+# Large backups are uploaded as a job: the client sends the file in numbered
+# chunks and each chunk is parsed and imported as it arrives, so nothing
+# holds the whole file and a dropped connection only loses the chunk in
+# flight. The job document stores the resume point (next_chunk), progress
+# and the parser state, so any worker can take the next chunk. Record IDs
+# are derived from the job ID and record ordinal, so re-sending a chunk
+# whose import was interrupted rewrites the same records instead of
+# duplicating them. Sections are imported in file order, so vehicles must
+# come before the records that reference them (as they do in exports).
+IMPORT_ID_NAMESPACE = uuid.UUID("6f1c9a52-3b7e-4d0a-9a43-52c1e8d7b0f4")
+IMPORT_CHUNK_MAX_BYTES = 4 * 1024 * 1024
+# One record may span chunks, but no larger: the unparsed tail is saved on the
+# job document, which must stay well inside MongoDB's 16MB document limit
+# even at 4 bytes per character
+IMPORT_PENDING_MAX_CHARS = 2 * 1024 * 1024
+IMPORT_JOB_LOCK_SECONDS = 120  # renewed before every batch while a chunk is processed
+IMPORT_JOB_MAX_ERRORS = 100
+IMPORT_JOB_RETENTION = timedelta(days=7)
+
+class ImportJobCreate(BaseModel):
+    format: Literal["json", "ndjson"] = "json"
+    mode: Literal["create", "merge"] = "create"
+    filename: str = ""
+    total_bytes: Optional[int] = None
+
+class ImportJob(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    status: str  # uploading, completed, failed
+    format: str
+    mode: str = "create"
+    filename: str = ""
+    total_bytes: Optional[int] = None
+    received_bytes: int = 0
+    next_chunk: int = 0  # resume point: the chunk index the server expects next
+    records_processed: int = 0
+    stats: dict
+    error_count: int = 0  # stats["errors"] keeps only the first IMPORT_JOB_MAX_ERRORS
+    error: Optional[str] = None  # why a failed job stopped
+    created_at: str
+    updated_at: str
+
+class ImportStreamParser:
+    """Incremental parser for export files fed one chunk at a time.
+
+    Understands the JSON export (an object whose section values are arrays of
+    records) and NDJSON export lines. Yields (section, record) pairs for
+    complete records and keeps only the unparsed tail, so its whole state is
+    a small dict that is saved on the import job between chunks.
+    """
+    
+    def __init__(self, format: str, state: Optional[dict] = None):
+        state = state or {}
+        self.format = format
+        self.mode = state.get("mode", "start")  # start, key, array, done (JSON only)
+        self.section = state.get("section")
+        self.buffer = state.get("buffer", "")
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.decoder.setstate((state.get("pending_bytes", b""), 0))
+        self.json = json.JSONDecoder()
     
-    # Delete setups for user's vehicles
-    if vehicle_ids:
-        await db.setups.delete_many({"vehicle_id": {"$in": vehicle_ids}})
+    def state(self) -> dict:
+        return {"mode": self.mode, "section": self.section, "buffer": self.buffer,
+                "pending_bytes": self.decoder.getstate()[0]}
     
-    # Delete vehicles
-    await db.vehicles.delete_many({"user_id": user_id})
+    def feed(self, data: bytes, final: bool = False) -> List[tuple]:
+        """Complete records in ``data``; raises ValueError on malformed input."""
+        try:
+            self.buffer += self.decoder.decode(data, final)
+        except UnicodeDecodeError:
+            raise ValueError("Backup file is not valid UTF-8")
+        records = self.parse_ndjson(final) if self.format == "ndjson" else self.parse_json(final)
+        if len(self.buffer) > IMPORT_PENDING_MAX_CHARS:
+            raise ValueError("Backup file contains a record that is too large or malformed")
+        return records
+    
+    def parse_ndjson(self, final: bool) -> List[tuple]:
+        lines = self.buffer.split("\n")
+        self.buffer = "" if final else lines.pop()
+        records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid NDJSON line: {e}")
+            if isinstance(entry, dict) and entry.get("section") in IMPORT_SECTIONS and isinstance(entry.get("record"), dict):
+                records.append((entry["section"], entry["record"]))
+        return records
     
-    # Delete user
-    await db.users.delete_one({"id": user_id})
+    def decode_value(self, text: str, pos: int, final: bool):
+        """(value, end) for the JSON value at ``pos``, or None if it may be incomplete."""
+        try:
+            value, end = self.json.raw_decode(text, pos)
+        except ValueError as e:
+            if final:
+                raise ValueError(f"Invalid JSON: {e}")
+            return None
+        # A number at the very end could still continue in the next chunk
+        if end == len(text) and not final:
+            return None
+        return value, end
+    
+    def skip_space(self, text: str, pos: int) -> int:
+        while pos < len(text) and text[pos] in " \t\r\n":
+            pos += 1
+        return pos
+    
+    def parse_json(self, final: bool) -> List[tuple]:
+        text, pos, records = self.buffer, 0, []
+        while True:
+            pos = self.skip_space(text, pos)
+            if pos >= len(text):
+                break
+            char = text[pos]
+            if self.mode == "done":
+                raise ValueError("Unexpected data after the end of the backup")
+            if self.mode == "start":
+                if char != "{":
+                    raise ValueError("Backup file must be a JSON object")
+                self.mode, pos = "key", pos + 1
+            elif char == ",":
+                pos += 1
+            elif self.mode == "array":
+                if char == "]":
+                    self.mode, self.section, pos = "key", None, pos + 1
+                    continue
+                decoded = self.decode_value(text, pos, final)
+                if decoded is None:
+                    break
+                record, pos = decoded
+                if self.section in IMPORT_SECTIONS and isinstance(record, dict):
+                    records.append((self.section, record))
+            elif char == "}":
+                self.mode, pos = "done", pos + 1
+            else:
+                # "key": value, consumed only once the key, colon and either
+                # an opening "[" or the whole value are available
+                decoded = self.decode_value(text, pos, final)
+                if decoded is None:
+                    break
+                key, end = decoded
+                end = self.skip_space(text, end)
+                if end >= len(text):
+                    break
+                if not isinstance(key, str) or text[end] != ":":
+                    raise ValueError("Invalid JSON: expected a key")
+                end = self.skip_space(text, end + 1)
+                if end >= len(text):
+                    break
+                if text[end] == "[":
+                    self.mode, self.section, pos = "array", key, end + 1
+                    continue
+                decoded = self.decode_value(text, end, final)
+                if decoded is None:
+                    break
+                pos = decoded[1]
+        self.buffer = text[pos:]
+        if final and self.mode != "done":
+            raise ValueError("Backup file ended unexpectedly")
+        return records
+
+async def run_import_job(job: dict, data: bytes, final: bool) -> dict:
+    """Parse and import ``data`` for a claimed job; returns the fields to save."""
+    context = {
+        "user_id": job["user_id"],
+        "now": job["created_at"],
+        "vehicle_ids": dict(job["vehicle_ids"]),
+        "job_id": job["id"],
+        "ordinal": job["ordinal"],
+        "mode": job.get("mode", "create")
+    }
+    stats = job["stats"]
+    errors_before = len(stats["errors"])
+    parser = ImportStreamParser(job["format"], job["parser"])
+    update = {"received_bytes": job["received_bytes"] + len(data)}
+    try:
+        records = parser.feed(data, final)
+    except ValueError as e:
+        return {**update, "status": "failed", "error": str(e)}
+    
+    # Consecutive records of a section are written together
+    batch_section, batch = None, []
+    for section, record in records + [(None, None)]:
+        if batch and (section != batch_section or len(batch) >= IMPORT_BATCH_SIZE):
+            await renew_import_lock(job)
+            await import_section(batch_section, batch, context, stats)
+            batch = []
+        batch_section = section
+        if record is not None:
+            batch.append(record)
+    if records:
+        await bump_versions(job["user_id"], "vehicles", "inventory", "repairs", "setups")
+    
+    new_errors = len(stats["errors"]) - errors_before
+    stats["errors"] = stats["errors"][:IMPORT_JOB_MAX_ERRORS]
+    return {
+        **update,
+        "parser": parser.state(),
+        "vehicle_ids": list(context["vehicle_ids"].items()),
+        "ordinal": context["ordinal"],
+        "records_processed": job["records_processed"] + len(records),
+        "stats": stats,
+        "error_count": job["error_count"] + new_errors,
+        "status": "completed" if final else "uploading"
+    }
+
+async def claim_import_job(job_id: str, user_id: str, query: dict) -> Optional[dict]:
+    """Lock an uploading job matching ``query`` for one chunk's processing.
+
+    The returned job carries the lock_owner token that renewing, saving and
+    unlocking must present.
+    """
+    now = time.time()
+    owner = str(uuid.uuid4())
+    job = await db.import_jobs.find_one_and_update(
+        {"id": job_id, "user_id": user_id, "status": "uploading", "locked_until": {"$lt": now}, **query},
+        {"$set": {"locked_until": now + IMPORT_JOB_LOCK_SECONDS, "lock_owner": owner}},
+        projection={"_id": 0}
+    )
+    return {**job, "lock_owner": owner} if job else None
+
+async def renew_import_lock(job: dict):
+    """Extend the chunk lock; 409 if it expired and another request took the job."""
+    result = await db.import_jobs.update_one(
+        {"id": job["id"], "lock_owner": job["lock_owner"]},
+        {"$set": {"locked_until": time.time() + IMPORT_JOB_LOCK_SECONDS}}
+    )
+    if not result.matched_count:
+        raise HTTPException(status_code=409, detail="This chunk is already being processed")
+
+async def unlock_import_job(job: dict):
+    await db.import_jobs.update_one(
+        {"id": job["id"], "lock_owner": job["lock_owner"]}, {"$set": {"locked_until": 0}}
+    )
+
+async def save_import_job(job: dict, update: dict) -> dict:
+    now = datetime.now(timezone.utc)
+    update = {**update, "locked_until": 0, "updated_at": now.isoformat(), "expires_at": now + IMPORT_JOB_RETENTION}
+    result = await db.import_jobs.update_one({"id": job["id"], "lock_owner": job["lock_owner"]}, {"$set": update})
+    if not result.matched_count:
+        # Our lock expired and another request has taken over this chunk
+        raise HTTPException(status_code=409, detail="This chunk is already being processed")
+    return {**job, **update}
+
+async def get_user_import_job(job_id: str, user_id: str) -> dict:
+    job = await db.import_jobs.find_one({"id": job_id, "user_id": user_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@api_router.post("/account/import/jobs", response_model=ImportJob)
+async def create_import_job(job_create: ImportJobCreate, current_user: dict = Depends(get_current_user)):
+    """Start a chunked import; upload chunks with PUT .../chunks/{index}."""
+    now = datetime.now(timezone.utc)
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": current_user["id"],
+        "status": "uploading",
+        "format": job_create.format,
+        "mode": job_create.mode,
+        "filename": job_create.filename,
+        "total_bytes": job_create.total_bytes,
+        "received_bytes": 0,
+        "next_chunk": 0,
+        "records_processed": 0,
+        "stats": new_import_stats(),
+        "error_count": 0,
+        "error": None,
+        "parser": None,
+        "vehicle_ids": [],
+        "ordinal": 0,
+        "locked_until": 0,
+        "lock_owner": None,
+        "created_at": now.isoformat(),
+        "updated_at": now.isoformat(),
+        "expires_at": now + IMPORT_JOB_RETENTION
+    }
+    await db.import_jobs.insert_one(job)
+    return ImportJob(**job)
+
+@api_router.get("/account/import/jobs/{job_id}", response_model=ImportJob)
+async def get_import_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    return ImportJob(**await get_user_import_job(job_id, current_user["id"]))
+
+@api_router.put("/account/import/jobs/{job_id}/chunks/{index}", response_model=ImportJob)
+async def upload_import_chunk(job_id: str, index: int, request: Request, current_user: dict = Depends(get_current_user)):
+    """Import the next chunk of the file (raw bytes). Re-sending a received chunk is a no-op."""
+    data = await request.body()
+    if len(data) > IMPORT_CHUNK_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Chunks are limited to {IMPORT_CHUNK_MAX_BYTES} bytes")
+    
+    job = await claim_import_job(job_id, current_user["id"], {"next_chunk": index})
+    if not job:
+        job = await get_user_import_job(job_id, current_user["id"])
+        if index < job["next_chunk"]:
+            return ImportJob(**job)
+        if job["status"] != "uploading":
+            raise HTTPException(status_code=409, detail=f"Import job is {job['status']}")
+        if index > job["next_chunk"]:
+            raise HTTPException(status_code=409, detail=f"Expected chunk {job['next_chunk']}")
+        raise HTTPException(status_code=409, detail="This chunk is already being processed")
+    
+    try:
+        update = await run_import_job(job, data, final=False)
+    except BaseException:
+        # Leave next_chunk unchanged so the client can re-send this chunk
+        await unlock_import_job(job)
+        raise
+    if update["status"] == "uploading":
+        update["next_chunk"] = index + 1
+    return ImportJob(**await save_import_job(job, update))
+
+@api_router.post("/account/import/jobs/{job_id}/complete", response_model=ImportJob)
+async def complete_import_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Mark the upload finished and import whatever the last chunk left pending."""
+    job = await claim_import_job(job_id, current_user["id"], {})
+    if not job:
+        job = await get_user_import_job(job_id, current_user["id"])
+        if job["status"] == "completed":
+            return ImportJob(**job)
+        if job["status"] != "uploading":
+            raise HTTPException(status_code=409, detail=f"Import job is {job['status']}")
+        raise HTTPException(status_code=409, detail="A chunk is still being processed")
+    
+    try:
+        update = await run_import_job(job, b"", final=True)
+    except BaseException:
+        await unlock_import_job(job)
+        raise
+    return ImportJob(**await save_import_job(job, update))
+
+# ============== DELETION JOBS ==============
+
+# Deleting an account or item removes the root record in the request and
+# hands its dependent records to a deletion job, which a background worker
+# works through in batches of DELETION_BATCH_SIZE. A vehicle is only marked
+# with the job's deletion_id in the request (reads skip it from then on);
+# the worker pulls it from inventory items, removes its setups and repairs
+# and deletes the vehicle itself last. The job is written before the roots
+# are touched and lists them, so a request that dies part-way is still
+# finished by the worker. Each step deletes (or $pulls
+# from) whatever still matches it, so a job whose worker died is claimed
+# again once its lock expires and carries on from its saved step; progress
+# is saved on the job after every batch.
+DELETION_JOB_LOCK_SECONDS = 120
+DELETION_RETRY_SECONDS = 30
+DELETION_JOB_RETENTION = timedelta(days=7)
+USAGE_EVENT_COLLECTIONS = ("usage_buckets", "usage_buckets_archive", "usage_logs", "usage_rollups")
+ACCOUNT_COLLECTIONS = (
+    "inventory", *USAGE_EVENT_COLLECTIONS, "repairs", "repair_rollups", "stocktakes", "stocktake_records",
+    "feedback", "vehicles", "collection_versions", "inventory_counters", "import_jobs"
+)
+# Matches records not marked by a pending deletion job
+NOT_PENDING_DELETION = {"deletion_id": {"$exists": False}}
+# Collections whose cached reads change once a job's cascade has run
+DELETION_VERSIONS = {"item": ("inventory",), "vehicle": ("inventory", "setups", "setup_groups", "repairs")}
+
+class DeletionStep(BaseModel):
+    collection: str
+    deleted: int = 0  # documents deleted (or updated, for $pull steps) so far
+
+class DeletionJob(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    kind: str  # account, vehicle, item
+    root_ids: List[str]
+    status: str  # pending, running, completed
+    step: int = 0  # index of the first step not yet finished
+    steps: List[DeletionStep]
+    deleted: int = 0
+    attempts: int = 0
+    error: Optional[str] = None  # why the last attempt stopped, if it did
+    created_at: str
+    updated_at: str
+    finished_at: Optional[str] = None
+
+def deletion_steps(job: dict) -> List[tuple]:
+    """(collection, filter, $pull spec or None) for each step of ``job``'s cascade."""
+    user_id, root_ids = job["user_id"], job["root_ids"]
+    if job["kind"] == "item":
+        match = {"user_id": user_id, "item_id": {"$in": root_ids}}
+        return [(name, match, None) for name in USAGE_EVENT_COLLECTIONS]
+    if job["kind"] == "vehicle":
+        match = {"user_id": user_id, "vehicle_id": {"$in": root_ids}}
+        return [
+            ("inventory", {"user_id": user_id, "vehicle_ids": {"$in": root_ids}}, {"vehicle_ids": {"$in": root_ids}}),
+            ("setups", match, None),
+            ("setup_groups", match, None),
+            ("repairs", match, None),
+            ("repair_rollups", match, None),
+            ("vehicles", {"user_id": user_id, "id": {"$in": root_ids}, "deletion_id": job["id"]}, None),
+        ]
+    # Setups are found through the account's vehicles, captured at enqueue time
+    by_vehicle = {"vehicle_id": {"$in": job["vehicle_ids"]}}
+    return [("setups", by_vehicle, None), ("setup_groups", by_vehicle, None)] + [
+        (name, {"user_id": user_id}, None) for name in ACCOUNT_COLLECTIONS
+    ]
+
+async def enqueue_deletion(kind: str, user_id: str, root_ids: List[str], vehicle_ids: Optional[List[str]] = None) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "kind": kind,
+        "root_ids": root_ids,
+        "vehicle_ids": vehicle_ids or [],
+        "status": "pending",
+        "step": 0,
+        "deleted": 0,
+        "attempts": 0,
+        "error": None,
+        "locked_until": 0,
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None
+    }
+    job["steps"] = [{"collection": name, "deleted": 0} for name, _, _ in deletion_steps(job)]
+    await db.deletion_jobs.insert_one(job)
+    job.pop("_id", None)
+    return job
+
+async def delete_deletion_roots(job: dict) -> List[str]:
+    """Remove whichever of ``job``'s root records still exist; returns their IDs."""
+    user_id, root_ids = job["user_id"], job["root_ids"]
+    if job["kind"] == "account":
+        result = await db.users.delete_one({"id": user_id})
+        principal_cache.invalidate_user(user_id)
+        return [user_id] if result.deleted_count else []
+    # Tag the roots with the job first so each is claimed by exactly one
+    # deleter (and an item's counters released once), even if the same
+    # record is deleted twice at once
+    collection = db.vehicles if job["kind"] == "vehicle" else db.inventory
+    match = {"id": {"$in": root_ids}, "user_id": user_id}
+    await collection.update_many({**match, **NOT_PENDING_DELETION}, {"$set": {"deletion_id": job["id"]}})
+    claimed = {**match, "deletion_id": job["id"]}
+    if job["kind"] == "vehicle":
+        # Marked only; the cascade deletes the vehicles once their records are gone
+        vehicles = await collection.find(claimed, {"_id": 0, "id": 1}).to_list(None)
+        return [vehicle["id"] for vehicle in vehicles]
+    items = await collection.find(claimed, {**COUNTER_FIELDS, "id": 1}).to_list(None)
+    if items:
+        async with counted_inventory_write(user_id):
+            await collection.delete_many(claimed)
+            await update_inventory_counters(user_id, [(item, None) for item in items])
+    return [item["id"] for item in items]
+
+async def start_deletion(kind: str, user_id: str, root_ids: List[str], vehicle_ids: Optional[List[str]] = None) -> Optional[dict]:
+    """Enqueue a cascade and remove its roots; None (and no job) if none existed.
+
+    The returned job's root_ids are narrowed to the roots it removed itself.
+    """
+    job = await enqueue_deletion(kind, user_id, root_ids, vehicle_ids)
+    removed = await delete_deletion_roots(job)
+    if not removed:
+        await db.deletion_jobs.delete_one({"id": job["id"]})
+        return None
+    if len(removed) < len(root_ids):
+        # Roots already gone are cascaded by whichever job removed them
+        job["root_ids"] = removed
+        await db.deletion_jobs.update_one({"id": job["id"]}, {"$set": {"root_ids": removed}})
+    _deletion_wakeup.set()
+    return job
+
+async def claim_deletion_job() -> Optional[dict]:
+    now = time.time()
+    return await db.deletion_jobs.find_one_and_update(
+        {"status": {"$in": ["pending", "running"]}, "locked_until": {"$lt": now}},
+        {"$set": {"status": "running", "locked_until": now + DELETION_JOB_LOCK_SECONDS}, "$inc": {"attempts": 1}},
+        sort=[("created_at", ASCENDING)]
+    )
+
+async def run_deletion_job(job: dict):
+    """Finish ``job``'s cascade from its saved step, one batch at a time."""
+    await delete_deletion_roots(job)
+    for index, (name, match, pull) in enumerate(deletion_steps(job)):
+        if index < job["step"]:
+            continue
+        collection = db[name]
+        while True:
+            batch = await collection.find(match, {"_id": 1}).limit(DELETION_BATCH_SIZE).to_list(DELETION_BATCH_SIZE)
+            if not batch:
+                break
+            batch_filter = {"_id": {"$in": [doc["_id"] for doc in batch]}}
+            if pull:
+                count = (await collection.update_many(batch_filter, {"$pull": pull})).modified_count
+            else:
+                count = (await collection.delete_many(batch_filter)).deleted_count
+            await db.deletion_jobs.update_one({"id": job["id"]}, {
+                "$inc": {f"steps.{index}.deleted": count, "deleted": count},
+                "$set": {"locked_until": time.time() + DELETION_JOB_LOCK_SECONDS,
+                         "updated_at": datetime.now(timezone.utc).isoformat()}
+            })
+        await db.deletion_jobs.update_one({"id": job["id"]}, {"$set": {"step": index + 1}})
     
-    return {"status": "success", "message": "Account and all data deleted"}
+    now = datetime.now(timezone.utc)
+    await db.deletion_jobs.update_one({"id": job["id"]}, {"$set": {
+        "status": "completed", "step": len(job["steps"]), "error": None, "locked_until": 0,
+        "updated_at": now.isoformat(), "finished_at": now.isoformat(), "expires_at": now + DELETION_JOB_RETENTION
+    }})
+    if job["kind"] in DELETION_VERSIONS:
+        await bump_versions(job["user_id"], *DELETION_VERSIONS[job["kind"]])
+    logger.info(f"Deletion job {job['id']} ({job['kind']}) completed")
+
+async def process_deletion_jobs() -> int:
+    """Run claimable deletion jobs until none are left; returns how many completed."""
+    completed = 0
+    while job := await claim_deletion_job():
+        try:
+            await run_deletion_job(job)
+        except Exception as e:
+            # Any failure (a malformed job included) is recorded on that job,
+            # which is retried later; the rest of the queue carries on
+            logger.exception(f"Deletion job {job.get('id', job['_id'])} failed, will retry")
+            await db.deletion_jobs.update_one({"_id": job["_id"]}, {"$set": {
+                "error": f"{type(e).__name__}: {e}", "locked_until": time.time() + DELETION_RETRY_SECONDS,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }})
+            continue
+        completed += 1
+    return completed
+
+_deletion_wakeup = asyncio.Event()
 
+async def run_deletion_worker(interval: float):
+    """Process deletion jobs as they are enqueued, polling every ``interval`` seconds (0 = never) for retries."""
+    while True:
+        try:
+            await process_deletion_jobs()
+        except Exception:
+            logger.exception("Deletion worker failed")
+        try:
+            await asyncio.wait_for(_deletion_wakeup.wait(), interval if interval > 0 else None)
+        except asyncio.TimeoutError:
+            pass
+        _deletion_wakeup.clear()
+
+@api_router.get("/deletions/{deletion_id}", response_model=DeletionJob)
+async def get_deletion_job(deletion_id: str, current_user: dict = Depends(get_current_user)):
+    """Progress of a vehicle or item deletion's cascade."""
+    job = await db.deletion_jobs.find_one({"id": deletion_id, "user_id": current_user["id"]}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Deletion not found")
+    return DeletionJob(**job)
+
+# ============== LOW STOCK FLAG ==============
+
+# Every write that changes quantity or min_stock keeps is_low_stock in sync so
+# the low-stock filter is an indexed equality match.
+LOW_STOCK_STAGE = {"$set": {"is_low_stock": {"$lte": ["$quantity", "$min_stock"]}}}
+
+def is_low_stock(item: dict) -> bool:
+    return item["quantity"] <= item["min_stock"]
+
+async def backfill_low_stock_flags(database) -> int:
+    """Set is_low_stock on items written before the flag existed."""
+    result = await database.inventory.update_many({"is_low_stock": {"$exists": False}}, [LOW_STOCK_STAGE])
+    return result.modified_count
+
+# ============== STOCK MOVEMENTS ==============
+
+# Quantity changes from usage, restocks, repairs and stocktakes are applied as
+# one guarded pipeline update per item: the new quantity, the low-stock flag
+# and a ledger entry (kept in a bounded stock_movements array on the item) are
+# written together, so concurrent movements never overwrite each other.
+# Item reads for responses leave out the ledger and the search index fields
+ITEM_PROJECTION = {"_id": 0, "stock_movements": 0, "search_tokens": 0, "search_terms": 0}
+
+def stock_movement_pipeline(quantity_expr, delta_expr, kind: str, reason: str = "", ref_id: Optional[str] = None) -> list:
+    now = datetime.now(timezone.utc).isoformat()
+    entry = {
+        "$mergeObjects": [
+            {"$literal": {"id": str(uuid.uuid4()), "kind": kind, "reason": reason, "ref_id": ref_id, "created_at": now}},
+            {"delta": delta_expr, "quantity_after": quantity_expr}
+        ]
+    }
+    return [
+        {"$set": {
+            "quantity": quantity_expr,
+            "updated_at": now,
+            "stock_movements": {"$slice": [
+                {"$concatArrays": [{"$ifNull": ["$stock_movements", []]}, [entry]]},
+                -STOCK_LEDGER_LENGTH
+            ]}
+        }},
+        LOW_STOCK_STAGE
+    ]
+
+async def apply_stock_movement(
+    user_id: str,
+    item_id: str,
+    delta: int,
+    kind: str,
+    reason: str = "",
+    ref_id: Optional[str] = None
+) -> Optional[dict]:
+    """Add ``delta`` to an item's quantity and record it in the ledger.
+
+    Removals only apply while the item holds at least ``-delta`` units.
+    Returns the updated item, or None if the item is missing or short.
+    """
+    query = {"id": item_id, "user_id": user_id}
+    if delta < 0:
+        query["quantity"] = {"$gte": -delta}
+    async with counted_inventory_write(user_id):
+        item = await db.inventory.find_one_and_update(
+            query,
+            stock_movement_pipeline({"$add": ["$quantity", delta]}, delta, kind, reason, ref_id),
+            projection=ITEM_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        if item:
+            await update_inventory_counters(user_id, [({**item, "quantity": item["quantity"] - delta}, item)])
+    return item
+
+async def set_stock_level(user_id: str, item_id: str, quantity: int, kind: str, ref_id: Optional[str] = None):
+    """Set an absolute quantity (e.g. a stocktake count), recording the difference."""
+    async with counted_inventory_write(user_id):
+        before = await db.inventory.find_one_and_update(
+            {"id": item_id, "user_id": user_id},
+            stock_movement_pipeline(quantity, {"$subtract": [quantity, "$quantity"]}, kind, ref_id=ref_id),
+            projection=COUNTER_FIELDS,
+            return_document=ReturnDocument.BEFORE
+        )
+        if before:
+            await update_inventory_counters(user_id, [(before, {**before, "quantity": quantity})])
+    return before
+
+async def stock_movement_failed(user_id: str, item_id: str):
+    """Raise the error explaining why apply_stock_movement matched nothing."""
+    if not await db.inventory.count_documents({"id": item_id, "user_id": user_id}, limit=1):
+        raise HTTPException(status_code=404, detail="Item not found")
+    raise HTTPException(status_code=400, detail="Insufficient quantity")
+
+# ============== INVENTORY COUNTERS ==============
+
+# Item count, low-stock count and stock value per (user, category), kept in
+# inventory_counters and moved with $inc by every inventory write so the
+# dashboard KPIs are read without touching the items. Writes pass the stored
+# item as it was before and after the change (None when it did not exist);
+# reconcile_inventory_counters recomputes the counters from the items and
+# corrects any drift.
+#
+# An item write and its $inc are separate operations, so a reconcile that
+# reads between them would "correct" a change the $inc is about to apply.
+# Writers therefore run inside counted_inventory_write, which lists them in
+# the user's collection_versions document (counter_writers) and counts them
+# (counter_writes); a reconcile only uses a snapshot taken while no writer
+# was listed and none started, and otherwise retries.
+COUNTER_FIELDS = {"_id": 0, "category": 1, "quantity": 1, "min_stock": 1, "price": 1}
+COUNTER_RECONCILE_ATTEMPTS = 5
+COUNTER_RECONCILE_RETRY_DELAY = 0.2
+# A writer listed for longer than this died mid-write and is dropped
+COUNTER_WRITE_STALE_SECONDS = 300
+
+@asynccontextmanager
+async def counted_inventory_write(user_id: str):
+    """Mark an inventory write and its counter $inc as in flight for reconcile_user_counters."""
+    token = str(uuid.uuid4())
+    await db.collection_versions.update_one(
+        {"user_id": user_id},
+        {"$inc": {"counter_writes": 1}, "$push": {"counter_writers": {"id": token, "at": time.time()}}},
+        upsert=True
+    )
+    try:
+        yield
+    finally:
+        await db.collection_versions.update_one({"user_id": user_id}, {"$pull": {"counter_writers": {"id": token}}})
+
+async def quiet_counter_writes(database, user_id: str) -> Optional[int]:
+    """The user's counter_writes if no counted write is in flight, else None."""
+    doc = await database.collection_versions.find_one(
+        {"user_id": user_id}, {"_id": 0, "counter_writes": 1, "counter_writers": 1}
+    ) or {}
+    cutoff = time.time() - COUNTER_WRITE_STALE_SECONDS
+    writers = doc.get("counter_writers", [])
+    if any(writer["at"] < cutoff for writer in writers):
+        await database.collection_versions.update_one(
+            {"user_id": user_id}, {"$pull": {"counter_writers": {"at": {"$lt": cutoff}}}}
+        )
+        writers = [writer for writer in writers if writer["at"] >= cutoff]
+    return None if writers else doc.get("counter_writes", 0)
+
+def counter_deltas(changes) -> dict:
+    """Per-category $inc documents for a list of (before, after) item pairs."""
+    deltas = {}
+    for before, after in changes:
+        for item, sign in ((before, -1), (after, 1)):
+            if item is None:
+                continue
+            delta = deltas.setdefault(item["category"], {"items": 0, "low_stock": 0, "value": 0.0})
+            delta["items"] += sign
+            delta["low_stock"] += sign if is_low_stock(item) else 0
+            delta["value"] += sign * item.get("price", 0) * item["quantity"]
+    return {category: d for category, d in deltas.items() if d["items"] or d["low_stock"] or d["value"]}
+
+async def update_inventory_counters(user_id: str, changes):
+    deltas = counter_deltas(changes)
+    if deltas:
+        await db.inventory_counters.bulk_write([
+            UpdateOne({"user_id": user_id, "category": category}, {"$inc": delta}, upsert=True)
+            for category, delta in deltas.items()
+        ], ordered=False)
+
+async def read_inventory_counters(user_id: str) -> dict:
+    rows = await db.inventory_counters.find({"user_id": user_id}, {"_id": 0}).to_list(None)
+    if not rows and await db.inventory.count_documents({"user_id": user_id}, limit=1):
+        # Items written before counters existed: build them on first read
+        await reconcile_user_counters(db, user_id)
+        rows = await db.inventory_counters.find({"user_id": user_id}, {"_id": 0}).to_list(None)
+    rows = [row for row in rows if row["items"] > 0]
+    return {
+        "total_items": sum(row["items"] for row in rows),
+        "low_stock_count": sum(row["low_stock"] for row in rows),
+        "total_value": round(sum(row["value"] for row in rows), 2),
+        "categories": {row["category"]: row["items"] for row in rows}
+    }
+
+async def reconcile_user_counters(database, user_id: str, repair: bool = True) -> Optional[dict]:
+    """Recompute a user's counters from their items and $inc away any drift.
+
+    Returns the corrections needed, keyed by category (empty if none); with
+    ``repair=False`` they are only reported. Returns None if inventory writes
+    kept the user busy for every attempt, leaving the counters untouched.
+    """
+    for attempt in range(COUNTER_RECONCILE_ATTEMPTS):
+        writes = await quiet_counter_writes(database, user_id)
+        if writes is not None:
+            expected = {
+                row["_id"]: row for row in await database.inventory.aggregate([
+                    {"$match": {"user_id": user_id}},
+                    {"$group": {
+                        "_id": "$category",
+                        "items": {"$sum": 1},
+                        "low_stock": {"$sum": {"$cond": [{"$lte": ["$quantity", "$min_stock"]}, 1, 0]}},
+                        "value": {"$sum": {"$multiply": ["$price", "$quantity"]}}
+                    }}
+                ]).to_list(None)
+            }
+            stored = {
+                row["category"]: row
+                for row in await database.inventory_counters.find({"user_id": user_id}, {"_id": 0}).to_list(None)
+            }
+            # No write was in flight or started while both were read, so they
+            # agree; later writes $inc on top of the correction
+            if await quiet_counter_writes(database, user_id) == writes:
+                break
+        await asyncio.sleep(COUNTER_RECONCILE_RETRY_DELAY * (attempt + 1))
+    else:
+        return None
+    corrections = {}
+    for category in expected.keys() | stored.keys():
+        want, have = expected.get(category, {}), stored.get(category, {})
+        correction = {
+            "items": want.get("items", 0) - have.get("items", 0),
+            "low_stock": want.get("low_stock", 0) - have.get("low_stock", 0),
+            "value": want.get("value", 0.0) - have.get("value", 0.0)
+        }
+        if correction["items"] or correction["low_stock"] or abs(correction["value"]) > 0.005:
+            corrections[category] = correction
+    if not repair:
+        return corrections
+    if corrections:
+        await database.inventory_counters.bulk_write([
+            UpdateOne({"user_id": user_id, "category": category}, {"$inc": correction}, upsert=True)
+            for category, correction in corrections.items()
+        ], ordered=False)
+    # Drop categories that no longer hold items
+    await database.inventory_counters.delete_many({"user_id": user_id, "items": {"$lte": 0}})
+    return corrections
+
+async def reconcile_inventory_counters(database, repair: bool = True) -> dict:
+    """Reconcile every user's counters; returns the users that had drifted and those too busy to check."""
+    user_ids = set(await database.inventory.distinct("user_id"))
+    user_ids.update(await database.inventory_counters.distinct("user_id"))
+    drifted, busy = {}, []
+    for user_id in sorted(user_ids):
+        corrections = await reconcile_user_counters(database, user_id, repair)
+        if corrections is None:
+            busy.append(user_id)
+        elif corrections:
+            drifted[user_id] = corrections
+            if repair:
+                # Counter corrections change the dashboard totals in every worker
+                await database.collection_versions.update_one(
+                    {"user_id": user_id}, {"$inc": {"inventory": 1}}, upsert=True
+                )
+                dashboard_cache.invalidate(user_id)
+    return {"users_checked": len(user_ids), "drifted": drifted, "busy": busy}
+
+async def reconcile_counters_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await reconcile_inventory_counters(db)
+            if report["drifted"]:
+                logger.warning(f"Repaired inventory counter drift for {len(report['drifted'])} users")
+            if report["busy"]:
+                logger.info(f"Skipped {len(report['busy'])} users with inventory writes in flight")
+        except PyMongoError as e:
+            logger.error(f"Inventory counter reconciliation failed: {e}")
+
+# ============== INVENTORY SEARCH ==============
+
+SEARCH_FIELD_WEIGHTS = {"name": 3, "part_number": 2, "supplier": 1}
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case, accent-stripped alphanumeric tokens of ``text``."""
+    normalized = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return re.findall(r"[a-z0-9]+", normalized)
+
+def build_search_fields(item: dict) -> dict:
+    """search_tokens and search_terms for name, part_number and supplier, stored on each item.
+
+    search_tokens holds the word prefixes of all three fields and is what the
+    $all filter matches. search_terms tags them by field ("name:bra") and adds
+    the whole words ("name=brake") so the relevance score can be computed in
+    the query. Part numbers also contribute their punctuation-free form so
+    "ABC-123" is found by "abc123" as well as "abc 123".
+    """
+    prefixes, terms = set(), set()
+    for field in SEARCH_FIELD_WEIGHTS:
+        words = tokenize(item.get(field, ""))
+        if field == "part_number" and len(words) > 1:
+            words.append("".join(words))
+        for word in words:
+            terms.add(f"{field}={word[:SEARCH_PREFIX_MAX_LENGTH]}")
+            for length in range(1, min(len(word), SEARCH_PREFIX_MAX_LENGTH) + 1):
+                prefixes.add(word[:length])
+                terms.add(f"{field}:{word[:length]}")
+    return {"search_tokens": sorted(prefixes), "search_terms": sorted(terms)}
+
+def search_query_tokens(search: str) -> List[str]:
+    # Longest token first: MongoDB uses the first $all term for the index bounds
+    tokens = {token[:SEARCH_PREFIX_MAX_LENGTH] for token in tokenize(search)}
+    return sorted(tokens, key=len, reverse=True)
+
+def search_score_expr(query_tokens: List[str]) -> dict:
+    """Aggregation expression scoring an item against ``query_tokens``.
+
+    Each query token scores a field's weight when it prefixes a word of that
+    field, and twice the weight when it is the whole word.
+    """
+    terms = {"$ifNull": ["$search_terms", []]}
+    return {"$add": [
+        {"$multiply": [weight, {"$size": {"$filter": {"input": terms, "cond": {"$in": [
+            "$$this", [f"{field}:{token}" for token in query_tokens] + [f"{field}={token}" for token in query_tokens]
+        ]}}}}]}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items()
+    ]}
+
+async def backfill_search_tokens(database, batch_size: int = 500) -> int:
+    """Populate search_tokens and search_terms on items written before they existed."""
+    updated = 0
+    while True:
+        items = await database.inventory.find(
+            {"search_terms": {"$exists": False}},
+            {"_id": 0, "id": 1, "name": 1, "part_number": 1, "supplier": 1}
+        ).to_list(batch_size)
+        if not items:
+            return updated
+        for item in items:
+            await database.inventory.update_one(
+                {"id": item["id"]},
+                {"$set": build_search_fields(item)}
+            )
+        updated += len(items)
 
 # ============== INVENTORY ROUTES ==============
 
 @api_router.post("/inventory", response_model=InventoryItem)
 async def create_item(item: InventoryItemCreate, current_user: dict = Depends(get_current_user)):
+    item_doc = await new_item_doc(item, current_user["id"])
+    async with counted_inventory_write(current_user["id"]):
+        await db.inventory.insert_one(item_doc)
+        await update_inventory_counters(current_user["id"], [(None, item_doc)])
+    await bump_versions(current_user["id"], "inventory")
+    
+    return InventoryItem(**item_doc)
+
+async def new_item_doc(item: InventoryItemCreate, user_id: str) -> dict:
+    """Build the stored document for a new inventory item."""
     item_id = str(uuid.uuid4())
     now = datetime.now(timezone.utc).isoformat()
     
@@ -763,25 +2931,82 @@ async def create_item(item: InventoryItemCreate, current_user: dict = Depends(ge
         "price": item.price,
         "min_stock": item.min_stock,
         "notes": item.notes,
-        "photos": item.photos[:3],  # Limit to 3 photos
+        "photos": await ingest_photos(item.photos[:3]),  # Limit to 3 photos
         "vehicle_ids": item.vehicle_ids[:2],  # Limit to 2 vehicles
-        "user_id": current_user["id"],
+        "user_id": user_id,
         "created_at": now,
         "updated_at": now
     }
-    await db.inventory.insert_one(item_doc)
-    
-    return InventoryItem(**item_doc)
+    item_doc.update(build_search_fields(item_doc))
+    item_doc["is_low_stock"] = is_low_stock(item_doc)
+    return item_doc
+
+def encode_cursor(doc: dict) -> str:
+    """Opaque keyset cursor pointing just after ``doc`` in INVENTORY_SORT order."""
+    raw = json.dumps([doc["created_at"], doc["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def encode_search_cursor(offset: int) -> str:
+    """Opaque cursor for the search results after the first ``offset`` (in rank order)."""
+    raw = json.dumps({"offset": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = json.loads(base64.urlsafe_b64decode(padded.encode()))["offset"]
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError
+        return offset
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-@api_router.get("/inventory", response_model=List[InventoryItem])
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(created_at, str) or not isinstance(item_id, str):
+            raise ValueError
+        return created_at, item_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@api_router.get("/inventory", response_model=Union[List[InventoryItem], List[InventoryItemSummary]])
 async def get_items(
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
     subcategory: Optional[str] = None,
     vehicle_id: Optional[str] = None,
     search: Optional[str] = None,
     low_stock: Optional[bool] = None,
+    limit: int = Query(INVENTORY_PAGE_SIZE_DEFAULT, ge=1, le=INVENTORY_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    view: str = "full",
     current_user: dict = Depends(get_current_user)
 ):
+    """List inventory one page at a time.
+
+    Items are returned in (created_at, id) order. When more items remain the
+    response carries an ``X-Next-Cursor`` header to pass back as ``cursor``;
+    ``include_total=true`` adds an ``X-Total-Count`` header.
+
+    With ``search`` the items matching every search word (as a word prefix of
+    name, part number or supplier) are returned ranked by relevance instead;
+    the ranking is done in the query and ``X-Next-Cursor`` pages through it.
+
+    ``view=summary`` returns InventoryItemSummary rows without photos or notes.
+
+    Responses carry a weak ETag; a matching ``If-None-Match`` gets a 304.
+    """
+    not_modified = await conditional_get(request, response, current_user["id"], "inventory")
+    if not_modified:
+        return not_modified
+    projection = view_projection(view, InventoryItemSummary)
+    if view == "full":
+        projection = ITEM_PROJECTION
+    model = InventoryItemSummary if view == "summary" else InventoryItem
     query = {"user_id": current_user["id"]}
     
     if category:
@@ -793,42 +3018,96 @@ async def get_items(
     if vehicle_id:
         query["vehicle_ids"] = vehicle_id
     
+    if low_stock:
+        query["is_low_stock"] = True
+    
     if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"part_number": {"$regex": search, "$options": "i"}},
-            {"supplier": {"$regex": search, "$options": "i"}}
-        ]
+        query_tokens = search_query_tokens(search)
+        if not query_tokens:
+            return []
+        query["search_tokens"] = {"$all": query_tokens}
+        if include_total:
+            response.headers["X-Total-Count"] = str(await db.inventory.count_documents(query))
+        
+        offset = decode_search_cursor(cursor) if cursor else 0
+        items = await db.inventory.aggregate([
+            {"$match": query},
+            {"$addFields": {"_score": search_score_expr(query_tokens), "_name": {"$toLower": "$name"}}},
+            {"$sort": {"_score": -1, "_name": 1, "id": 1}},
+            {"$skip": offset},
+            {"$limit": limit + 1},
+            {"$unset": ["_score", "_name"]},
+            {"$project": projection}
+        ]).to_list(limit + 1)
+        if len(items) > limit:
+            items = items[:limit]
+            response.headers["X-Next-Cursor"] = encode_search_cursor(offset + limit)
+        return [model(**item) for item in items]
+    
+    if include_total:
+        response.headers["X-Total-Count"] = str(await db.inventory.count_documents(query))
     
-    items = await db.inventory.find(query, {"_id": 0}).to_list(1000)
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        keyset = {"$or": [
+            {"created_at": {"$gt": after_created_at}},
+            {"created_at": after_created_at, "id": {"$gt": after_id}}
+        ]}
+        query = {"$and": [query, keyset]}
     
-    if low_stock:
-        items = [item for item in items if item["quantity"] <= item["min_stock"]]
+    items = await db.inventory.find(query, projection).sort(INVENTORY_SORT).limit(limit + 1).to_list(limit + 1)
+    
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(items[-1])
     
-    return [InventoryItem(**item) for item in items]
+    return [model(**item) for item in items]
 
 @api_router.get("/inventory/{item_id}", response_model=InventoryItem)
-async def get_item(item_id: str, current_user: dict = Depends(get_current_user)):
+async def get_item(item_id: str, request: Request, response: Response, current_user: dict = Depends(get_current_user)):
     item = await db.inventory.find_one(
         {"id": item_id, "user_id": current_user["id"]},
-        {"_id": 0}
+        ITEM_PROJECTION
     )
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
+    not_modified = conditional_document(request, response, item)
+    if not_modified:
+        return not_modified
     return InventoryItem(**item)
 
 @api_router.put("/inventory/{item_id}", response_model=InventoryItem)
 async def update_item(
     item_id: str,
     update: InventoryItemUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    item = await db.inventory.find_one(
-        {"id": item_id, "user_id": current_user["id"]}
-    )
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
+    query = {"id": item_id, "user_id": current_user["id"]}
+    
+    # Rebuilding search tokens needs any search fields this update leaves out
+    item = None
+    changed = update.model_dump(exclude_none=True)
+    if any(f in changed for f in SEARCH_FIELD_WEIGHTS) and not all(f in changed for f in SEARCH_FIELD_WEIGHTS):
+        item = await db.inventory.find_one(query, {"_id": 0, **{f: 1 for f in SEARCH_FIELD_WEIGHTS}})
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
     
+    update_data = await item_update_fields(update, item)
+    async with counted_inventory_write(current_user["id"]):
+        previous = await update_and_fetch(
+            db.inventory, query, item_update_doc(update_data), response, if_match,
+            "Item not found", ITEM_PROJECTION, return_document=ReturnDocument.BEFORE
+        )
+        updated_item = {**previous, **update_data}
+        await update_inventory_counters(current_user["id"], [(previous, updated_item)])
+    response.headers["ETag"] = document_etag(updated_item)
+    await bump_versions(current_user["id"], "inventory")
+    return InventoryItem(**updated_item)
+
+async def item_update_fields(update: InventoryItemUpdate, item: Optional[dict] = None) -> dict:
+    """The fields to set for ``update``; unchanged search fields come from ``item``."""
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
     
     # Clear subcategory and condition if category is changed to non-parts
@@ -836,57 +3115,278 @@ async def update_item(
         update_data["subcategory"] = ""
         update_data["condition"] = ""
     
-    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    if "photos" in update_data:
+        update_data["photos"] = await ingest_photos(update_data["photos"][:3])
     
-    await db.inventory.update_one(
-        {"id": item_id},
-        {"$set": update_data}
-    )
+    if any(field in update_data for field in SEARCH_FIELD_WEIGHTS):
+        update_data.update(build_search_fields({**(item or {}), **update_data}))
     
-    updated_item = await db.inventory.find_one({"id": item_id}, {"_id": 0})
-    return InventoryItem(**updated_item)
+    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+    return update_data
+
+def item_update_doc(update_data: dict):
+    """Update document for ``update_data``; a pipeline when is_low_stock must follow."""
+    if "quantity" in update_data or "min_stock" in update_data:
+        return [{"$set": {k: {"$literal": v} for k, v in update_data.items()}}, LOW_STOCK_STAGE]
+    return {"$set": update_data}
 
 @api_router.delete("/inventory/{item_id}")
 async def delete_item(item_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.inventory.delete_one(
-        {"id": item_id, "user_id": current_user["id"]}
-    )
-    if result.deleted_count == 0:
+    # Usage history for the item is removed by a deletion job
+    job = await start_deletion("item", current_user["id"], [item_id])
+    if not job:
         raise HTTPException(status_code=404, detail="Item not found")
+    await bump_versions(current_user["id"], "inventory")
+    
+    return {"message": "Item deleted successfully", "deletion_id": job["id"]}
+
+@api_router.post("/inventory/bulk", response_model=InventoryBulkResponse)
+async def bulk_write_items(request: InventoryBulkRequest, current_user: dict = Depends(get_current_user)):
+    """Apply a batch of creates, updates and deletes as one unordered bulk_write.
+
+    Each operation is validated against the user's items (fetched in a single
+    query) and reported individually; a failing operation does not stop the
+    others. Each item id may appear in at most one operation per batch.
+    Updates only apply to the version read here, and deletes go through a
+    deletion job like DELETE /inventory/{id}, so counters only move for
+    writes that actually happened.
+    """
+    operations = request.operations
+    if len(operations) > INVENTORY_BULK_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {INVENTORY_BULK_MAX_OPERATIONS} operations per request"
+        )
+    user_id = current_user["id"]
+    
+    target_ids = list({op.id for op in operations if op.op != "create" and op.id})
+    existing = {}
+    if target_ids:
+        async for doc in db.inventory.find(
+            {"user_id": user_id, "id": {"$in": target_ids}, **NOT_PENDING_DELETION}, ITEM_PROJECTION
+        ):
+            existing[doc["id"]] = doc
+    
+    results = []
+    writes = []
+    write_positions = []  # index into results for each entry in writes
+    counter_changes = {}  # index -> (before, after) for inventory_counters
+    updated_versions = {}  # index -> updated_at written by an update
+    delete_indexes = {}  # item id -> index of its delete
+    seen_ids = set()
+    
+    for index, operation in enumerate(operations):
+        result = InventoryBulkResult(index=index, op=operation.op, id=operation.id)
+        results.append(result)
+        
+        if operation.op == "create":
+            if operation.item is None:
+                result.status, result.error = "error", "Missing item"
+                continue
+            item_doc = await new_item_doc(operation.item, user_id)
+            writes.append(InsertOne(item_doc))
+            result.id = item_doc["id"]
+            result.item = InventoryItem(**item_doc)
+            counter_changes[index] = (None, item_doc)
+        else:
+            item = existing.get(operation.id)
+            if item is None:
+                result.status, result.error = "error", "Item not found"
+                continue
+            if operation.id in seen_ids:
+                result.status, result.error = "error", "Item already targeted by another operation in this batch"
+                continue
+            seen_ids.add(operation.id)
+            
+            if operation.op == "update":
+                if operation.changes is None:
+                    result.status, result.error = "error", "Missing changes"
+                    continue
+                update_data = await item_update_fields(operation.changes, item)
+                # Only the version read above, so the counter change below is exact
+                writes.append(UpdateOne(
+                    {"id": operation.id, "user_id": user_id, "updated_at": item.get("updated_at"), **NOT_PENDING_DELETION},
+                    item_update_doc(update_data)
+                ))
+                result.item = InventoryItem(**{**item, **update_data})
+                counter_changes[index] = (item, {**item, **update_data})
+                updated_versions[index] = update_data["updated_at"]
+            else:
+                delete_indexes[operation.id] = index
+                continue
+        write_positions.append(index)
+    
+    deletion_id = None
+    if delete_indexes:
+        # Removes the items and releases their counters; the job then removes their usage history
+        job = await start_deletion("item", user_id, list(delete_indexes))
+        removed = set(job["root_ids"]) if job else set()
+        deletion_id = job["id"] if job else None
+        for item_id, index in delete_indexes.items():
+            if item_id not in removed:
+                results[index].status, results[index].error = "error", "Item not found"
+    
+    if writes:
+        async with counted_inventory_write(user_id):
+            try:
+                bulk_result = await db.inventory.bulk_write(writes, ordered=False)
+                matched = bulk_result.matched_count
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    result = results[write_positions[error["index"]]]
+                    result.status, result.error, result.item = "error", error.get("errmsg", "Write failed"), None
+                matched = e.details.get("nMatched", 0)
+            if matched < sum(1 for index in updated_versions if results[index].status == "ok"):
+                # Some updates matched nothing (the item changed or went away since
+                # it was read); an update applied only if its version is there now
+                current = {}
+                async for doc in db.inventory.find(
+                    {"user_id": user_id, "id": {"$in": [results[index].id for index in updated_versions]}},
+                    {"_id": 0, "id": 1, "updated_at": 1}
+                ):
+                    current[doc["id"]] = doc["updated_at"]
+                for index, version in updated_versions.items():
+                    result = results[index]
+                    if result.status == "ok" and current.get(result.id) != version:
+                        result.status, result.error, result.item = "error", "Item was modified or deleted concurrently", None
+            await update_inventory_counters(
+                user_id, [counter_changes[index] for index in write_positions if results[index].status == "ok"]
+            )
     
-    # Also delete usage logs for this item
-    await db.usage_logs.delete_many({"item_id": item_id})
+    succeeded = [r for r in results if r.status == "ok"]
+    if succeeded:
+        await bump_versions(user_id, "inventory")
     
-    return {"message": "Item deleted successfully"}
+    logger.info(f"Bulk inventory write for {user_id}: {len(succeeded)}/{len(results)} operations applied")
+    return InventoryBulkResponse(
+        created=sum(1 for r in succeeded if r.op == "create"),
+        updated=sum(1 for r in succeeded if r.op == "update"),
+        deleted=sum(1 for r in succeeded if r.op == "delete"),
+        failed=len(results) - len(succeeded),
+        results=results,
+        deletion_id=deletion_id
+    )
+
+# ============== USAGE LOG STORAGE ==============
+
+# Usage events are stored with the bucket pattern: one usage_buckets document
+# per (user, item, UTC month) holding the events in time order, plus last_at
+# for recency queries. Buckets older than USAGE_ARCHIVE_AFTER_MONTHS move to
+# usage_buckets_archive, which reads only consult when the hot tier holds too
+# few events. The per-event usage_logs collection is legacy: its documents
+# are moved into buckets at startup.
+USAGE_EVENT_FIELDS = ("id", "quantity_used", "reason", "event_name", "created_at")
+
+def usage_month(created_at: str) -> str:
+    return period_buckets(created_at)["day"][:7]
+
+def usage_bucket_push(logs: List[dict]) -> tuple:
+    """(filter, update) appending ``logs`` (same user, item and month) to their bucket."""
+    first = logs[0]
+    events = [{field: log[field] for field in USAGE_EVENT_FIELDS} for log in logs]
+    return (
+        {"user_id": first["user_id"], "item_id": first["item_id"], "month": usage_month(first["created_at"])},
+        {
+            "$push": {"events": {"$each": events, "$sort": {"created_at": 1}}},
+            "$max": {"last_at": max(log["created_at"] for log in logs)}
+        }
+    )
+
+async def usage_bucket_merge(collection, logs: List[dict]) -> Optional[UpdateOne]:
+    """Upsert op adding ``logs`` (one bucket's worth) minus events the bucket already holds."""
+    bucket_filter, _ = usage_bucket_push(logs)
+    existing = await collection.find_one(bucket_filter, {"_id": 0, "events.id": 1})
+    present = {event["id"] for event in (existing or {}).get("events", [])}
+    logs = [log for log in logs if log["id"] not in present]
+    return UpdateOne(*usage_bucket_push(logs), upsert=True) if logs else None
+
+async def latest_usage_events(query: dict, limit: int) -> List[dict]:
+    """The newest ``limit`` usage events in buckets matching ``query``, newest first."""
+    events = []
+    for collection in (db.usage_buckets, db.usage_buckets_archive):
+        buckets = collection.find(
+            query,
+            {"_id": 0, "user_id": 1, "item_id": 1, "last_at": 1, "events": {"$slice": -limit}}
+        ).sort("last_at", DESCENDING)
+        async for bucket in buckets:
+            # Buckets arrive newest-first by their latest event; once we hold
+            # ``limit`` events newer than this bucket's latest, none of its
+            # events (or any later bucket's) can make the cut.
+            if len(events) >= limit and bucket["last_at"] <= events[limit - 1]["created_at"]:
+                break
+            events.extend({**event, "item_id": bucket["item_id"], "user_id": bucket["user_id"]} for event in bucket["events"])
+            events.sort(key=lambda event: event["created_at"], reverse=True)
+        if len(events) >= limit:
+            break
+    return events[:limit]
+
+async def migrate_usage_logs(database, batch_size: int = 500, lease: Optional[tuple] = None) -> int:
+    """Move legacy per-event usage_logs documents into monthly buckets.
+
+    A batch is deleted from usage_logs only after its events are in buckets,
+    and bucket pushes skip events already present, so an interrupted
+    migration can simply run again.
+    """
+    moved = 0
+    while True:
+        await renew_maintenance_lease(database, lease)
+        batch = await database.usage_logs.find({}).sort("_id", ASCENDING).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        grouped = {}
+        for log in batch:
+            grouped.setdefault((log["user_id"], log["item_id"], usage_month(log["created_at"])), []).append(log)
+        ops = [op for logs in grouped.values() if (op := await usage_bucket_merge(database.usage_buckets, logs))]
+        if ops:
+            await database.usage_buckets.bulk_write(ops, ordered=False)
+        await database.usage_logs.delete_many({"_id": {"$in": [log["_id"] for log in batch]}})
+        moved += len(batch)
+    if moved:
+        logging.info(f"Moved {moved} usage logs into monthly buckets")
+    return moved
+
+async def archive_usage_buckets(database, older_than_months: int = USAGE_ARCHIVE_AFTER_MONTHS, batch_size: int = 500) -> int:
+    """Move buckets for months before the cutoff to usage_buckets_archive.
+
+    Like migrate_usage_logs, safe to re-run after an interruption.
+    """
+    today = datetime.now(timezone.utc).date()
+    months = today.year * 12 + today.month - 1 - older_than_months
+    cutoff = f"{months // 12:04d}-{months % 12 + 1:02d}"
+    archived = 0
+    while True:
+        batch = await database.usage_buckets.find({"month": {"$lt": cutoff}}).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        ops = []
+        for bucket in batch:
+            logs = [{**event, "user_id": bucket["user_id"], "item_id": bucket["item_id"]} for event in bucket["events"]]
+            if logs and (op := await usage_bucket_merge(database.usage_buckets_archive, logs)):
+                ops.append(op)
+        if ops:
+            await database.usage_buckets_archive.bulk_write(ops, ordered=False)
+        await database.usage_buckets.delete_many({"_id": {"$in": [bucket["_id"] for bucket in batch]}})
+        archived += len(batch)
+    if archived:
+        logging.info(f"Archived {archived} usage buckets older than {cutoff}")
+    return archived
+
 
 # ============== USAGE LOG ROUTES ==============
 
+async def withdraw_usage_event(bucket_filter: dict, log_id: str):
+    """Remove a usage event whose stock deduction did not happen (and its bucket if left empty)."""
+    await db.usage_buckets.update_one(bucket_filter, {"$pull": {"events": {"id": log_id}}})
+    await db.usage_buckets.delete_one({**bucket_filter, "events": {"$size": 0}})
+
 @api_router.post("/usage", response_model=UsageLog)
 async def create_usage_log(
     log: UsageLogCreate,
     current_user: dict = Depends(get_current_user)
 ):
-    # Verify item exists and belongs to user
-    item = await db.inventory.find_one(
-        {"id": log.item_id, "user_id": current_user["id"]}
-    )
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
-    # Update item quantity
-    new_quantity = item["quantity"] - log.quantity_used
-    if new_quantity < 0:
-        raise HTTPException(status_code=400, detail="Insufficient quantity")
+    if log.quantity_used <= 0:
+        raise HTTPException(status_code=400, detail="quantity_used must be positive")
     
-    await db.inventory.update_one(
-        {"id": log.item_id},
-        {"$set": {
-            "quantity": new_quantity,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
-    )
-    
-    # Create usage log
     log_id = str(uuid.uuid4())
     now = datetime.now(timezone.utc).isoformat()
     
@@ -899,117 +3399,664 @@ async def create_usage_log(
         "event_name": log.event_name,
         "created_at": now
     }
-    await db.usage_logs.insert_one(log_doc)
+    # Record the usage event before deducting stock, and take it back if the
+    # deduction does not happen, so stock never moves without its record
+    bucket_filter, bucket_update = usage_bucket_push([log_doc])
+    await db.usage_buckets.update_one(bucket_filter, bucket_update, upsert=True)
+    try:
+        # Deduct stock (fails if the item is missing or short)
+        item = await apply_stock_movement(
+            current_user["id"], log.item_id, -log.quantity_used, "usage",
+            reason=log.reason, ref_id=log_id
+        )
+    except Exception:
+        # The deduction may still have been applied; its ledger entry says so
+        if not await db.inventory.count_documents(
+            {"id": log.item_id, "user_id": current_user["id"], "stock_movements.ref_id": log_id}, limit=1
+        ):
+            await withdraw_usage_event(bucket_filter, log_id)
+        raise
+    if not item:
+        await withdraw_usage_event(bucket_filter, log_id)
+        await stock_movement_failed(current_user["id"], log.item_id)
+    
+    await db.usage_rollups.bulk_write(usage_rollup_ops(log_doc, item), ordered=False)
+    await bump_versions(current_user["id"], "inventory")
     
     return UsageLog(**log_doc)
 
+@api_router.post("/inventory/{item_id}/movements", response_model=InventoryItem)
+async def create_stock_movement(
+    item_id: str,
+    movement: StockMovementCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Restock or adjust an item by a relative amount."""
+    if movement.delta == 0:
+        raise HTTPException(status_code=400, detail="delta must not be zero")
+    item = await apply_stock_movement(
+        current_user["id"], item_id, movement.delta, movement.kind, reason=movement.reason
+    )
+    if not item:
+        await stock_movement_failed(current_user["id"], item_id)
+    await bump_versions(current_user["id"], "inventory")
+    return InventoryItem(**item)
+
+@api_router.get("/inventory/{item_id}/movements", response_model=List[StockMovement])
+async def get_stock_movements(item_id: str, current_user: dict = Depends(get_current_user)):
+    """Recent stock movements for an item, newest first."""
+    item = await db.inventory.find_one(
+        {"id": item_id, "user_id": current_user["id"]},
+        {"_id": 0, "stock_movements": 1}
+    )
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return [StockMovement(**m) for m in reversed(item.get("stock_movements", []))]
+
 @api_router.get("/usage/{item_id}", response_model=List[UsageLog])
 async def get_usage_logs(item_id: str, current_user: dict = Depends(get_current_user)):
-    logs = await db.usage_logs.find(
-        {"item_id": item_id, "user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    
+    # A deleted item's events may not have been removed by its deletion job yet
+    if not await db.inventory.find_one({"id": item_id, "user_id": current_user["id"]}, {"_id": 1}):
+        return []
+    logs = await latest_usage_events({"user_id": current_user["id"], "item_id": item_id}, 100)
     return [UsageLog(**log) for log in logs]
 
 # ============== DASHBOARD STATS ==============
 
-@api_router.get("/dashboard/stats", response_model=DashboardStats)
-async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
-    items = await db.inventory.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    total_items = len(items)
-    low_stock_count = sum(1 for item in items if item["quantity"] <= item["min_stock"])
-    total_value = sum(item["price"] * item["quantity"] for item in items)
+# Collections whose collection_versions counters the dashboard depends on
+# (usage events bump "inventory")
+DASHBOARD_VERSION_COLLECTIONS = ("inventory", "vehicles", "setups", "repairs")
+
+class DashboardCache:
+    """Bounded LRU cache of DashboardStats payloads, keyed by user_id.
+
+    Each entry records the user's collection_versions counters it was
+    computed from, and ``get`` only serves it while they are unchanged, so a
+    write handled by any worker process (which bumps the counters) makes the
+    entry stale everywhere. Versions are read before computing, so a write
+    racing a computation costs a recomputation, never stale stats.
+    ``invalidate`` drops an entry early in this process.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str, versions: tuple) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, entry_versions, stats = entry
+        if expires_at <= time.monotonic() or entry_versions != versions:
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return stats
+
+    def put(self, user_id: str, stats: dict, versions: tuple):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl, versions, stats)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str):
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "background_refresh": DASHBOARD_CACHE_REFRESH,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+dashboard_cache = DashboardCache(DASHBOARD_CACHE_SIZE, DASHBOARD_CACHE_TTL)
+_dashboard_refreshes: dict = {}
+
+def invalidate_dashboard(user_id: str):
+    dashboard_cache.invalidate(user_id)
+    if DASHBOARD_CACHE_REFRESH and user_id not in _dashboard_refreshes:
+        _dashboard_refreshes[user_id] = asyncio.create_task(refresh_dashboard(user_id))
+
+async def refresh_dashboard(user_id: str):
+    try:
+        # Let the rest of the request's writes land before recomputing
+        await asyncio.sleep(0)
+        await cached_dashboard_stats(user_id)
+    except Exception as e:
+        logger.warning(f"Background dashboard refresh failed for {user_id}: {e}")
+    finally:
+        _dashboard_refreshes.pop(user_id, None)
+
+async def cached_dashboard_stats(user_id: str) -> dict:
+    counters = await db.collection_versions.find_one({"user_id": user_id}, {"_id": 0}) or {}
+    versions = tuple(counters.get(collection, 0) for collection in DASHBOARD_VERSION_COLLECTIONS)
+    stats = dashboard_cache.get(user_id, versions)
+    if stats is None:
+        stats = (await compute_dashboard_stats(user_id)).model_dump()
+        dashboard_cache.put(user_id, stats, versions)
+    return stats
+
+async def recent_usage_activity(user_id: str, limit: int = 10) -> List[dict]:
+    """Latest usage logs with item names, skipping logs whose item was deleted."""
+    recent_logs = await latest_usage_events({"user_id": user_id}, limit)
     
-    categories = {}
-    for item in items:
-        cat = item["category"]
-        if cat not in categories:
-            categories[cat] = 0
-        categories[cat] += 1
+    item_ids = list({log["item_id"] for log in recent_logs})
+    items = await db.inventory.find(
+        {"id": {"$in": item_ids}, "user_id": user_id},
+        {"_id": 0, "id": 1, "name": 1}
+    ).to_list(len(item_ids)) if item_ids else []
+    item_names = {item["id"]: item["name"] for item in items}
     
-    # Recent activity (usage logs)
-    recent_logs = await db.usage_logs.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(10)
-    
-    # Enrich logs with item names - only include logs where item still exists
-    recent_activity = []
-    for log in recent_logs:
-        item = await db.inventory.find_one({"id": log["item_id"]}, {"_id": 0, "name": 1})
-        if item:  # Only add if item still exists
-            recent_activity.append({
-                "id": log["id"],
-                "item_id": log["item_id"],
-                "item_name": item["name"],
-                "quantity_used": log["quantity_used"],
-                "reason": log["reason"],
-                "event_name": log["event_name"],
-                "created_at": log["created_at"]
-            })
+    return [
+        {
+            "id": log["id"],
+            "item_id": log["item_id"],
+            "item_name": item_names[log["item_id"]],
+            "quantity_used": log["quantity_used"],
+            "reason": log["reason"],
+            "event_name": log["event_name"],
+            "created_at": log["created_at"]
+        }
+        for log in recent_logs if log["item_id"] in item_names
+    ]
+
+@api_router.get("/dashboard/stats", response_model=DashboardStats)
+async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
+    return DashboardStats(**await cached_dashboard_stats(current_user["id"]))
+
+async def compute_dashboard_stats(user_id: str) -> DashboardStats:
+    # Independent queries run concurrently; vehicle names come from one fetch
+    # of the user's vehicles (at most two) rather than a lookup per row.
+    stats, recent_activity, vehicles, recent_setups_raw, recent_repairs_raw = await asyncio.gather(
+        read_inventory_counters(user_id),
+        recent_usage_activity(user_id),
+        db.vehicles.find({"user_id": user_id, **NOT_PENDING_DELETION}, {"_id": 0, "id": 1, "make": 1, "model": 1}).to_list(None),
+        db.setups.find(
+            {"user_id": user_id},
+            {"_id": 0, "id": 1, "name": 1, "vehicle_id": 1, "event_name": 1, "conditions": 1, "rating": 1, "created_at": 1}
+        ).sort("created_at", -1).to_list(5),
+        db.repairs.find(
+            {"user_id": user_id},
+            {"_id": 0, "id": 1, "vehicle_id": 1, "cause_of_damage": 1, "affected_area": 1, "total_parts_cost": 1, "created_at": 1}
+        ).sort("created_at", -1).to_list(5)
+    )
+    vehicle_names = {v["id"]: f"{v['make']} {v['model']}" for v in vehicles}
     
-    # Get recent setups with vehicle info
-    recent_setups_raw = await db.setups.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(5)
-    
-    recent_setups = []
-    for setup in recent_setups_raw:
-        vehicle = await db.vehicles.find_one({"id": setup["vehicle_id"]}, {"_id": 0, "make": 1, "model": 1})
-        if vehicle:
-            recent_setups.append({
-                "id": setup["id"],
-                "name": setup["name"],
-                "vehicle_id": setup["vehicle_id"],
-                "vehicle_name": f"{vehicle['make']} {vehicle['model']}",
-                "event_name": setup.get("event_name", ""),
-                "conditions": setup.get("conditions", ""),
-                "rating": setup.get("rating", 0),
-                "created_at": setup["created_at"]
-            })
+    recent_setups = [
+        {
+            "id": setup["id"],
+            "name": setup["name"],
+            "vehicle_id": setup["vehicle_id"],
+            "vehicle_name": vehicle_names[setup["vehicle_id"]],
+            "event_name": setup.get("event_name", ""),
+            "conditions": setup.get("conditions", ""),
+            "rating": setup.get("rating", 0),
+            "created_at": setup["created_at"]
+        }
+        for setup in recent_setups_raw if setup["vehicle_id"] in vehicle_names
+    ]
     
-    # Get recent repairs with vehicle info
-    recent_repairs_raw = await db.repairs.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(5)
-    
-    recent_repairs = []
-    for repair in recent_repairs_raw:
-        vehicle = await db.vehicles.find_one({"id": repair["vehicle_id"]}, {"_id": 0, "make": 1, "model": 1})
-        if vehicle:
-            recent_repairs.append({
-                "id": repair["id"],
-                "vehicle_id": repair["vehicle_id"],
-                "vehicle_name": f"{vehicle['make']} {vehicle['model']}",
-                "cause_of_damage": repair["cause_of_damage"],
-                "affected_area": repair.get("affected_area", ""),
-                "total_parts_cost": repair["total_parts_cost"],
-                "created_at": repair["created_at"]
-            })
+    recent_repairs = [
+        {
+            "id": repair["id"],
+            "vehicle_id": repair["vehicle_id"],
+            "vehicle_name": vehicle_names[repair["vehicle_id"]],
+            "cause_of_damage": repair["cause_of_damage"],
+            "affected_area": repair.get("affected_area", ""),
+            "total_parts_cost": repair["total_parts_cost"],
+            "created_at": repair["created_at"]
+        }
+        for repair in recent_repairs_raw if repair["vehicle_id"] in vehicle_names
+    ]
     
     return DashboardStats(
-        total_items=total_items,
-        low_stock_count=low_stock_count,
-        total_value=total_value,
-        categories=categories,
+        **stats,
         recent_activity=recent_activity,
         recent_setups=recent_setups,
         recent_repairs=recent_repairs
     )
 
+# ============== ANALYTICS ==============
+
+# Usage and repair history is pre-aggregated into daily and weekly buckets
+# (usage_rollups per item, repair_rollups per vehicle and affected area) by
+# the write paths, so chart series are read from a few rollup documents per
+# bucket instead of scanning usage_logs and repairs. Buckets are UTC dates
+# (YYYY-MM-DD); a week bucket is the date of its Monday.
+ANALYTICS_PERIODS = ("day", "week")
+ANALYTICS_DEFAULT_BUCKETS = {"day": 30, "week": 12}
+ANALYTICS_MAX_BUCKETS = 400
+REPAIR_ROLLUP_FIELDS = {"_id": 0, "user_id": 1, "vehicle_id": 1, "affected_area": 1, "total_parts_cost": 1, "created_at": 1}
+
+class AnalyticsSeries(BaseModel):
+    key: str
+    label: str
+    totals: dict
+    points: List[dict]  # one per bucket, e.g. {"bucket": "2026-03-02", "quantity": 4}
+
+class AnalyticsResponse(BaseModel):
+    period: str
+    buckets: List[str]
+    series: List[AnalyticsSeries]
+
+def period_buckets(created_at: str) -> dict:
+    moment = datetime.fromisoformat(created_at)
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc)
+    day = moment.date()
+    return {"day": day.isoformat(), "week": (day - timedelta(days=day.weekday())).isoformat()}
+
+def usage_rollup_ops(log: dict, item: dict) -> list:
+    return [
+        UpdateOne(
+            {"user_id": log["user_id"], "period": period, "bucket": bucket, "item_id": log["item_id"]},
+            {"$inc": {"quantity": log["quantity_used"], "events": 1}, "$set": {"category": item["category"]}},
+            upsert=True
+        )
+        for period, bucket in period_buckets(log["created_at"]).items()
+    ]
+
+def repair_rollup_ops(changes) -> list:
+    """$inc upserts for (before, after) repair pairs; None marks a missing side."""
+    ops = []
+    for before, after in changes:
+        for repair, sign in ((before, -1), (after, 1)):
+            if repair is None:
+                continue
+            for period, bucket in period_buckets(repair["created_at"]).items():
+                ops.append(UpdateOne(
+                    {"user_id": repair["user_id"], "period": period, "bucket": bucket,
+                     "vehicle_id": repair["vehicle_id"], "affected_area": repair.get("affected_area", "")},
+                    {"$inc": {"repairs": sign, "parts_cost": sign * (repair.get("total_parts_cost") or 0)}},
+                    upsert=True
+                ))
+    return ops
+
+async def update_repair_rollups(changes):
+    ops = repair_rollup_ops(changes)
+    if ops:
+        await db.repair_rollups.bulk_write(ops, ordered=False)
+
+# Maintenance jobs that must not run twice at once (the rollup backfill is
+# not idempotent) hold a lease in maintenance_leases. The holder renews it
+# before every batch and stops if another process has taken it over, so a
+# job that outlives its lease cannot overlap with its successor.
+MAINTENANCE_LEASE_SECONDS = 600
+
+class MaintenanceLeaseLost(Exception):
+    pass
+
+async def claim_maintenance_lease(database, name: str, seconds: float = MAINTENANCE_LEASE_SECONDS) -> Optional[tuple]:
+    """Take the lease ``name``; returns (name, owner) or None if another process holds it."""
+    now = time.time()
+    owner = str(uuid.uuid4())
+    try:
+        await database.maintenance_leases.update_one(
+            {"_id": name, "until": {"$lt": now}},
+            {"$set": {"until": now + seconds, "owner": owner}},
+            upsert=True
+        )
+        return name, owner
+    except DuplicateKeyError:
+        return None
+
+async def renew_maintenance_lease(database, lease: Optional[tuple], seconds: float = MAINTENANCE_LEASE_SECONDS):
+    """Extend ``lease`` (no-op for None); raises MaintenanceLeaseLost if it was taken over."""
+    if lease is None:
+        return
+    name, owner = lease
+    result = await database.maintenance_leases.update_one(
+        {"_id": name, "owner": owner}, {"$set": {"until": time.time() + seconds}}
+    )
+    if not result.matched_count:
+        raise MaintenanceLeaseLost(f"Lease {name} was taken over by another process")
+
+async def release_maintenance_lease(database, lease: tuple):
+    name, owner = lease
+    await database.maintenance_leases.update_one({"_id": name, "owner": owner}, {"$set": {"until": 0}})
+
+async def backfill_analytics_rollups(database, batch_size: int = 500, lease: Optional[tuple] = None) -> dict:
+    """Roll up usage logs and repairs written before rollups were maintained.
+
+    Each source is scanned in _id order up to the newest _id present when the
+    backfill first ran (later documents are rolled up by their write path).
+    The last _id processed is saved in analytics_state after every batch, so
+    an interrupted backfill resumes where it stopped. Not idempotent: run it
+    under a maintenance ``lease``, which is renewed before every batch.
+    """
+    processed = {}
+    for source in ("usage_logs", "repairs"):
+        collection = database[source]
+        state = await database.analytics_state.find_one({"_id": source})
+        if state is None:
+            newest = await collection.find({}, {"_id": 1}).sort("_id", DESCENDING).limit(1).to_list(1)
+            state = {"_id": source, "cutoff": newest[0]["_id"] if newest else None, "high_water": None}
+            try:
+                await database.analytics_state.insert_one(state)
+            except DuplicateKeyError:
+                # Another process started this backfill first
+                state = await database.analytics_state.find_one({"_id": source})
+        processed[source] = 0
+        while state["cutoff"] is not None and state["high_water"] != state["cutoff"]:
+            await renew_maintenance_lease(database, lease)
+            id_range = {"$lte": state["cutoff"]}
+            if state["high_water"] is not None:
+                id_range["$gt"] = state["high_water"]
+            batch = await collection.find({"_id": id_range}).sort("_id", ASCENDING).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            if source == "usage_logs":
+                items = {
+                    item["id"]: item for item in await database.inventory.find(
+                        {"id": {"$in": list({log["item_id"] for log in batch})}},
+                        {"_id": 0, "id": 1, "category": 1}
+                    ).to_list(None)
+                }
+                ops = [op for log in batch if log["item_id"] in items for op in usage_rollup_ops(log, items[log["item_id"]])]
+                rollups = database.usage_rollups
+            else:
+                ops = repair_rollup_ops([(None, repair) for repair in batch])
+                rollups = database.repair_rollups
+            if ops:
+                await rollups.bulk_write(ops, ordered=False)
+            state["high_water"] = batch[-1]["_id"]
+            await database.analytics_state.update_one({"_id": source}, {"$set": {"high_water": state["high_water"]}})
+            processed[source] += len(batch)
+        if processed[source]:
+            logging.info(f"Rolled up {processed[source]} {source} for analytics")
+    return processed
+
+def analytics_buckets(period: str, start: Optional[str], end: Optional[str]) -> List[str]:
+    """Every bucket from ``start`` to ``end`` (inclusive); defaults to the recent past."""
+    if period not in ANALYTICS_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Unknown period '{period}'. Use one of: {', '.join(ANALYTICS_PERIODS)}")
+    try:
+        end_date = date.fromisoformat(end) if end else datetime.now(timezone.utc).date()
+        start_date = date.fromisoformat(start) if start else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be dates (YYYY-MM-DD)")
+    step = timedelta(days=1 if period == "day" else 7)
+    if period == "week":
+        end_date -= timedelta(days=end_date.weekday())
+        if start_date:
+            start_date -= timedelta(days=start_date.weekday())
+    if start_date is None:
+        start_date = end_date - step * (ANALYTICS_DEFAULT_BUCKETS[period] - 1)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end_date - start_date) // step + 1 > ANALYTICS_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"At most {ANALYTICS_MAX_BUCKETS} buckets per request")
+    buckets = []
+    while start_date <= end_date:
+        buckets.append(start_date.isoformat())
+        start_date += step
+    return buckets
+
+async def rollup_series(collection, match: dict, key_field: str, metrics: tuple, buckets: List[str], label_lookup=None) -> List[AnalyticsSeries]:
+    """Sum ``metrics`` per (key, bucket) and densify into zero-filled series.
+
+    ``label_lookup`` is an async callable mapping a list of keys to display names.
+    """
+    rows = await collection.aggregate([
+        {"$match": {**match, "bucket": {"$gte": buckets[0], "$lte": buckets[-1]}}},
+        {"$group": {
+            "_id": {"key": f"${key_field}", "bucket": "$bucket"},
+            **{metric: {"$sum": f"${metric}"} for metric in metrics}
+        }}
+    ]).to_list(None)
+    
+    values = {}
+    for row in rows:
+        values.setdefault(row["_id"]["key"], {})[row["_id"]["bucket"]] = row
+    labels = await label_lookup([key for key in values if key]) if label_lookup and values else {}
+    series = []
+    for key, by_bucket in values.items():
+        points = [
+            {"bucket": bucket, **{metric: by_bucket.get(bucket, {}).get(metric, 0) for metric in metrics}}
+            for bucket in buckets
+        ]
+        totals = {metric: sum(point[metric] for point in points) for metric in metrics}
+        if not any(totals.values()):
+            continue
+        series.append(AnalyticsSeries(key=key or "", label=labels.get(key) or key or "Unspecified", totals=totals, points=points))
+    series.sort(key=lambda s: s.totals[metrics[0]], reverse=True)
+    return series
+
+@api_router.get("/analytics/usage", response_model=AnalyticsResponse)
+async def get_usage_analytics(
+    group_by: Literal["category", "item"] = "category",
+    period: str = "day",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    category: Optional[str] = None,
+    item_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Units used per bucket, one series per category or item."""
+    buckets = analytics_buckets(period, start, end)
+    match = {"user_id": current_user["id"], "period": period}
+    if category:
+        match["category"] = category
+    if item_id:
+        match["item_id"] = item_id
+    
+    async def item_names(item_ids):
+        items = await db.inventory.find(
+            {"id": {"$in": item_ids}, "user_id": current_user["id"]},
+            {"_id": 0, "id": 1, "name": 1}
+        ).to_list(None)
+        return {item["id"]: item["name"] for item in items}
+    
+    if group_by == "item":
+        series = await rollup_series(db.usage_rollups, match, "item_id", ("quantity", "events"), buckets, item_names)
+    else:
+        series = await rollup_series(db.usage_rollups, match, "category", ("quantity", "events"), buckets)
+    return AnalyticsResponse(period=period, buckets=buckets, series=series)
+
+@api_router.get("/analytics/repairs", response_model=AnalyticsResponse)
+async def get_repair_analytics(
+    group_by: Literal["vehicle", "affected_area"] = "vehicle",
+    period: str = "week",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    vehicle_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Repair count and parts cost per bucket, one series per vehicle or affected area."""
+    buckets = analytics_buckets(period, start, end)
+    match = {"user_id": current_user["id"], "period": period}
+    if vehicle_id:
+        match["vehicle_id"] = vehicle_id
+    
+    async def vehicle_names(vehicle_ids):
+        vehicles = await db.vehicles.find(
+            {"id": {"$in": vehicle_ids}, "user_id": current_user["id"]},
+            {"_id": 0, "id": 1, "make": 1, "model": 1}
+        ).to_list(None)
+        return {v["id"]: f"{v['make']} {v['model']}" for v in vehicles}
+    
+    if group_by == "vehicle":
+        series = await rollup_series(db.repair_rollups, match, "vehicle_id", ("parts_cost", "repairs"), buckets, vehicle_names)
+    else:
+        series = await rollup_series(db.repair_rollups, match, "affected_area", ("parts_cost", "repairs"), buckets)
+    return AnalyticsResponse(period=period, buckets=buckets, series=series)
+
+# ============== RESTOCK FORECAST ==============
+
+# Burn rates come from the daily usage_rollups rather than raw usage events,
+# so the read is bounded by items x days however many events were logged.
+# MongoDB groups the window into one document per item holding parallel
+# arrays of day offsets and quantities; those are concatenated into a dense
+# items x days matrix, and rates, days until min_stock and reorder
+# quantities are computed for every item at once on NumPy arrays.
+FORECAST_ITEM_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "category": 1, "part_number": 1, "supplier": 1,
+    "quantity": 1, "min_stock": 1, "price": 1, "created_at": 1
+}
+
+class ReorderItem(BaseModel):
+    id: str
+    name: str
+    category: str
+    part_number: str = ""
+    quantity: int
+    min_stock: int
+    daily_rate: float  # units per day, weighted towards recent usage
+    days_until_min_stock: float
+    min_stock_date: str  # UTC date quantity is expected to reach min_stock
+    reorder_quantity: int  # covers the horizon at daily_rate and restores min_stock
+    estimated_cost: float
+
+class SupplierReorder(BaseModel):
+    supplier: str
+    items: List[ReorderItem]
+    estimated_cost: float
+
+class RestockForecast(BaseModel):
+    generated_at: str
+    lookback_days: int
+    horizon_days: int
+    suppliers: List[SupplierReorder]
+
+def burn_rates(usage: np.ndarray, first_day: np.ndarray, half_life_days: float) -> np.ndarray:
+    """Exponentially weighted units per day for each row of ``usage``.
+
+    ``usage`` is items x days (oldest first); each item's average only counts
+    days from ``first_day`` (its creation) on, so new items are not diluted
+    by days they did not exist.
+    """
+    days = usage.shape[1]
+    weights = 0.5 ** (np.arange(days - 1, -1, -1) / half_life_days)
+    active = np.arange(days)[None, :] >= first_day[:, None]
+    return (usage @ weights) / (active @ weights)
+
+def daily_usage_pipeline(user_id: str, window_start: date, lookback_days: int) -> list:
+    start = datetime(window_start.year, window_start.month, window_start.day, tzinfo=timezone.utc)
+    return [
+        {"$match": {
+            "user_id": user_id, "period": "day",
+            "bucket": {"$gte": window_start.isoformat(), "$lte": (window_start + timedelta(days=lookback_days - 1)).isoformat()}
+        }},
+        {"$group": {
+            "_id": "$item_id",
+            "days": {"$push": {"$divide": [{"$subtract": [{"$dateFromString": {"dateString": "$bucket"}}, start]}, 86400000]}},
+            "quantity": {"$push": "$quantity"}
+        }}
+    ]
+
+def forecast_restock(items: List[dict], daily_usage: List[dict], window_start: date, lookback_days: int,
+                     horizon_days: int, half_life_days: float) -> List[dict]:
+    """SupplierReorder dicts from items and daily_usage_pipeline output.
+
+    Plain dicts, validated once by the route's response_model.
+    """
+    index = {item["id"]: row for row, item in enumerate(items)}
+    daily_usage = [series for series in daily_usage if series["_id"] in index]
+    lengths = np.array([len(series["days"]) for series in daily_usage], dtype=np.intp)
+    rows = np.repeat(np.array([index[series["_id"]] for series in daily_usage], dtype=np.intp), lengths)
+    days = np.fromiter(chain.from_iterable(series["days"] for series in daily_usage), float, count=lengths.sum())
+    used = np.fromiter(chain.from_iterable(series["quantity"] for series in daily_usage), float, count=lengths.sum())
+    cells = rows * lookback_days + days.astype(np.intp)
+    usage = np.bincount(cells, weights=used, minlength=len(items) * lookback_days).reshape(len(items), lookback_days)
+    # Items created before the window count from its first day
+    columns = {(window_start + timedelta(days=day)).isoformat(): day for day in range(lookback_days)}
+    first_day = np.array([columns.get(item.get("created_at", "")[:10], 0) for item in items])
+    quantity = np.array([item.get("quantity", 0) for item in items], dtype=float)
+    min_stock = np.array([item.get("min_stock", 0) for item in items], dtype=float)
+    price = np.array([item.get("price") or 0 for item in items], dtype=float)
+    
+    rates = burn_rates(usage, first_day, half_life_days)
+    headroom = quantity - min_stock
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_left = np.where(headroom <= 0, 0.0, headroom / rates)  # inf when unused
+    reorder = np.ceil(np.maximum(rates * horizon_days - headroom, 0))
+    due = np.flatnonzero((days_left <= horizon_days) & (reorder > 0))
+    # Soonest first; among equals, the fastest burning
+    due = due[np.lexsort((-rates[due], days_left[due]))]
+    
+    today = window_start + timedelta(days=lookback_days - 1)
+    dates = [(today + timedelta(days=day)).isoformat() for day in range(horizon_days + 1)]
+    columns = zip(
+        due.tolist(),
+        np.round(rates[due], 3).tolist(),
+        np.round(days_left[due], 1).tolist(),
+        days_left[due].astype(np.intp).tolist(),
+        reorder[due].astype(np.intp).tolist(),
+        np.round(reorder[due] * price[due], 2).tolist()
+    )
+    suppliers = {}
+    for row, rate, days_until, day, reorder_quantity, cost in columns:
+        item = items[row]
+        suppliers.setdefault(item.get("supplier") or "", []).append({
+            "id": item["id"],
+            "name": item["name"],
+            "category": item.get("category", ""),
+            "part_number": item.get("part_number", ""),
+            "quantity": item.get("quantity", 0),
+            "min_stock": item.get("min_stock", 0),
+            "daily_rate": rate,
+            "days_until_min_stock": days_until,
+            "min_stock_date": dates[day],
+            "reorder_quantity": reorder_quantity,
+            "estimated_cost": cost
+        })
+    # Suppliers keep the order of their most urgent item
+    return [
+        {"supplier": supplier, "items": reorders, "estimated_cost": round(sum(r["estimated_cost"] for r in reorders), 2)}
+        for supplier, reorders in suppliers.items()
+    ]
+
+@api_router.get("/forecast/restock", response_model=RestockForecast)
+async def get_restock_forecast(
+    lookback_days: int = Query(90, ge=7, le=ANALYTICS_MAX_BUCKETS),
+    horizon_days: int = Query(30, ge=1, le=365),
+    half_life_days: float = Query(14, gt=0),
+    current_user: dict = Depends(get_current_user)
+):
+    """Items expected to reach min_stock within the horizon, grouped by supplier."""
+    user_id = current_user["id"]
+    now = datetime.now(timezone.utc)
+    window_start = now.date() - timedelta(days=lookback_days - 1)
+    items, daily_usage = await asyncio.gather(
+        db.inventory.find({"user_id": user_id}, FORECAST_ITEM_PROJECTION).to_list(None),
+        db.usage_rollups.aggregate(daily_usage_pipeline(user_id, window_start, lookback_days)).to_list(None)
+    )
+    suppliers = forecast_restock(items, daily_usage, window_start, lookback_days, horizon_days, half_life_days) if items else []
+    return {
+        "generated_at": now.isoformat(),
+        "lookback_days": lookback_days,
+        "horizon_days": horizon_days,
+        "suppliers": suppliers
+    }
+
 # ============== VEHICLE ROUTES ==============
 
 @api_router.post("/vehicles", response_model=Vehicle)
 async def create_vehicle(vehicle: VehicleCreate, current_user: dict = Depends(get_current_user)):
     # Check if user already has 2 vehicles
-    existing_count = await db.vehicles.count_documents({"user_id": current_user["id"]})
+    existing_count = await db.vehicles.count_documents({"user_id": current_user["id"], **NOT_PENDING_DELETION})
     if existing_count >= 2:
         raise HTTPException(status_code=400, detail="Maximum 2 vehicles allowed")
     
@@ -1022,78 +4069,73 @@ async def create_vehicle(vehicle: VehicleCreate, current_user: dict = Depends(ge
         "model": vehicle.model,
         "registration": vehicle.registration,
         "vin": vehicle.vin,
-        "photo": vehicle.photo,
+        "photo": await ingest_photo(vehicle.photo),
         "user_id": current_user["id"],
         "created_at": now,
         "updated_at": now
     }
     await db.vehicles.insert_one(vehicle_doc)
+    await bump_versions(current_user["id"], "vehicles")
     
     return Vehicle(**vehicle_doc)
 
-@api_router.get("/vehicles", response_model=List[Vehicle])
-async def get_vehicles(current_user: dict = Depends(get_current_user)):
+@api_router.get("/vehicles", response_model=Union[List[Vehicle], List[VehicleSummary]])
+async def get_vehicles(request: Request, response: Response, view: str = "full", current_user: dict = Depends(get_current_user)):
+    not_modified = await conditional_get(request, response, current_user["id"], "vehicles")
+    if not_modified:
+        return not_modified
+    projection = view_projection(view, VehicleSummary)
+    model = VehicleSummary if view == "summary" else Vehicle
     vehicles = await db.vehicles.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
+        {"user_id": current_user["id"], **NOT_PENDING_DELETION},
+        projection
     ).to_list(2)
     
-    return [Vehicle(**v) for v in vehicles]
+    return [model(**v) for v in vehicles]
 
 @api_router.get("/vehicles/{vehicle_id}", response_model=Vehicle)
-async def get_vehicle(vehicle_id: str, current_user: dict = Depends(get_current_user)):
+async def get_vehicle(vehicle_id: str, request: Request, response: Response, current_user: dict = Depends(get_current_user)):
     vehicle = await db.vehicles.find_one(
-        {"id": vehicle_id, "user_id": current_user["id"]},
+        {"id": vehicle_id, "user_id": current_user["id"], **NOT_PENDING_DELETION},
         {"_id": 0}
     )
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
+    not_modified = conditional_document(request, response, vehicle)
+    if not_modified:
+        return not_modified
     return Vehicle(**vehicle)
 
 @api_router.put("/vehicles/{vehicle_id}", response_model=Vehicle)
 async def update_vehicle(
     vehicle_id: str,
     update: VehicleUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    vehicle = await db.vehicles.find_one(
-        {"id": vehicle_id, "user_id": current_user["id"]}
-    )
-    if not vehicle:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-    
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
+    if "photo" in update_data:
+        update_data["photo"] = await ingest_photo(update_data["photo"])
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
-    await db.vehicles.update_one(
-        {"id": vehicle_id},
-        {"$set": update_data}
+    updated_vehicle = await update_and_fetch(
+        db.vehicles, {"id": vehicle_id, "user_id": current_user["id"], **NOT_PENDING_DELETION}, {"$set": update_data},
+        response, if_match, "Vehicle not found"
     )
-    
-    updated_vehicle = await db.vehicles.find_one({"id": vehicle_id}, {"_id": 0})
+    await bump_versions(current_user["id"], "vehicles")
     return Vehicle(**updated_vehicle)
 
 @api_router.delete("/vehicles/{vehicle_id}")
 async def delete_vehicle(vehicle_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.vehicles.delete_one(
-        {"id": vehicle_id, "user_id": current_user["id"]}
-    )
-    if result.deleted_count == 0:
+    # A deletion job pulls the vehicle from inventory items, removes its
+    # setups and repairs, then deletes the vehicle
+    job = await start_deletion("vehicle", current_user["id"], [vehicle_id])
+    if not job:
         raise HTTPException(status_code=404, detail="Vehicle not found")
+    await bump_versions(current_user["id"], "vehicles")
     
-    # Remove this vehicle from all inventory items
-    await db.inventory.update_many(
-        {"user_id": current_user["id"], "vehicle_ids": vehicle_id},
-        {"$pull": {"vehicle_ids": vehicle_id}}
-    )
-    
-    # Delete all setups for this vehicle
-    await db.setups.delete_many({"vehicle_id": vehicle_id})
-    
-    # Delete all repairs for this vehicle
-    await db.repairs.delete_many({"vehicle_id": vehicle_id})
-    
-    return {"message": "Vehicle deleted successfully"}
+    return {"message": "Vehicle deleted successfully", "deletion_id": job["id"]}
 
 # ============== SETUP ROUTES ==============
 
@@ -1101,7 +4143,7 @@ async def delete_vehicle(vehicle_id: str, current_user: dict = Depends(get_curre
 async def create_setup(setup: SetupCreate, current_user: dict = Depends(get_current_user)):
     # Verify vehicle exists and belongs to user
     vehicle = await db.vehicles.find_one(
-        {"id": setup.vehicle_id, "user_id": current_user["id"]}
+        {"id": setup.vehicle_id, "user_id": current_user["id"], **NOT_PENDING_DELETION}
     )
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
@@ -1156,15 +4198,24 @@ async def create_setup(setup: SetupCreate, current_user: dict = Depends(get_curr
         "updated_at": now
     }
     await db.setups.insert_one(setup_doc)
+    await bump_versions(current_user["id"], "setups")
     
     return Setup(**setup_doc)
 
-@api_router.get("/setups/vehicle/{vehicle_id}", response_model=List[Setup])
+@api_router.get("/setups/vehicle/{vehicle_id}", response_model=Union[List[Setup], List[SetupSummary]])
 async def get_vehicle_setups(
     vehicle_id: str, 
+    request: Request,
+    response: Response,
     search: Optional[str] = None,
+    view: str = "full",
     current_user: dict = Depends(get_current_user)
 ):
+    not_modified = await conditional_get(request, response, current_user["id"], "setups")
+    if not_modified:
+        return not_modified
+    projection = view_projection(view, SetupSummary)
+    model = SetupSummary if view == "summary" else Setup
     query = {"vehicle_id": vehicle_id, "user_id": current_user["id"]}
     
     # If search parameter is provided, search in name, event_name, and conditions
@@ -1175,58 +4226,60 @@ async def get_vehicle_setups(
             {"conditions": {"$regex": search, "$options": "i"}}
         ]
     
-    setups = await db.setups.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+    setups = await db.setups.find(query, projection).sort("created_at", -1).to_list(100)
     
-    return [Setup(**s) for s in setups]
+    return [model(**s) for s in setups]
 
 @api_router.get("/setups/{setup_id}", response_model=Setup)
-async def get_setup(setup_id: str, current_user: dict = Depends(get_current_user)):
+async def get_setup(setup_id: str, request: Request, response: Response, current_user: dict = Depends(get_current_user)):
     setup = await db.setups.find_one(
         {"id": setup_id, "user_id": current_user["id"]},
         {"_id": 0}
     )
     if not setup:
         raise HTTPException(status_code=404, detail="Setup not found")
+    not_modified = conditional_document(request, response, setup)
+    if not_modified:
+        return not_modified
     return Setup(**setup)
 
 @api_router.put("/setups/{setup_id}", response_model=Setup)
 async def update_setup(
     setup_id: str,
     update: SetupUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    setup = await db.setups.find_one(
-        {"id": setup_id, "user_id": current_user["id"]}
-    )
-    if not setup:
-        raise HTTPException(status_code=404, detail="Setup not found")
-    
+    query = {"id": setup_id, "user_id": current_user["id"]}
+    not_found = "Setup not found"
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
     
-    # Handle group_id - allow setting to empty string to remove from group
-    if "group_id" in update.model_dump():
+    # Handle group_id - only when sent; null or empty string removes from group
+    if "group_id" in update.model_fields_set:
         group_id_value = update.group_id
         if group_id_value == "" or group_id_value is None:
             update_data["group_id"] = None
         else:
-            # Verify group exists and belongs to same vehicle
             group = await db.setup_groups.find_one(
-                {"id": group_id_value, "user_id": current_user["id"], "vehicle_id": setup["vehicle_id"]}
+                {"id": group_id_value, "user_id": current_user["id"]},
+                {"_id": 0, "vehicle_id": 1}
             )
             if not group:
                 raise HTTPException(status_code=404, detail="Setup group not found or belongs to different vehicle")
+            # The group must belong to the setup's vehicle
+            query["vehicle_id"] = group["vehicle_id"]
+            not_found = "Setup not found or setup group belongs to different vehicle"
             update_data["group_id"] = group_id_value
     
     if "rating" in update_data:
         update_data["rating"] = min(max(update_data["rating"], 0), 5)
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
-    await db.setups.update_one(
-        {"id": setup_id},
-        {"$set": update_data}
+    updated_setup = await update_and_fetch(
+        db.setups, query, {"$set": update_data}, response, if_match, not_found
     )
-    
-    updated_setup = await db.setups.find_one({"id": setup_id}, {"_id": 0})
+    await bump_versions(current_user["id"], "setups")
     return Setup(**updated_setup)
 
 @api_router.delete("/setups/{setup_id}")
@@ -1236,6 +4289,7 @@ async def delete_setup(setup_id: str, current_user: dict = Depends(get_current_u
     )
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Setup not found")
+    await bump_versions(current_user["id"], "setups")
     
     return {"message": "Setup deleted successfully"}
 
@@ -1245,7 +4299,7 @@ async def delete_setup(setup_id: str, current_user: dict = Depends(get_current_u
 async def create_setup_group(group: SetupGroupCreate, current_user: dict = Depends(get_current_user)):
     # Verify vehicle exists and belongs to user
     vehicle = await db.vehicles.find_one(
-        {"id": group.vehicle_id, "user_id": current_user["id"]}
+        {"id": group.vehicle_id, "user_id": current_user["id"], **NOT_PENDING_DELETION}
     )
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
@@ -1264,11 +4318,15 @@ async def create_setup_group(group: SetupGroupCreate, current_user: dict = Depen
         "updated_at": now
     }
     await db.setup_groups.insert_one(group_doc)
+    await bump_versions(current_user["id"], "setup_groups")
     
     return SetupGroup(**group_doc)
 
 @api_router.get("/setup-groups/vehicle/{vehicle_id}", response_model=List[SetupGroup])
-async def get_vehicle_setup_groups(vehicle_id: str, current_user: dict = Depends(get_current_user)):
+async def get_vehicle_setup_groups(vehicle_id: str, request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    not_modified = await conditional_get(request, response, current_user["id"], "setup_groups")
+    if not_modified:
+        return not_modified
     groups = await db.setup_groups.find(
         {"vehicle_id": vehicle_id, "user_id": current_user["id"]},
         {"_id": 0}
@@ -1276,17 +4334,23 @@ async def get_vehicle_setup_groups(vehicle_id: str, current_user: dict = Depends
     return [SetupGroup(**g) for g in groups]
 
 @api_router.get("/setup-groups/{group_id}", response_model=SetupGroup)
-async def get_setup_group(group_id: str, current_user: dict = Depends(get_current_user)):
+async def get_setup_group(group_id: str, request: Request, response: Response, current_user: dict = Depends(get_current_user)):
     group = await db.setup_groups.find_one(
         {"id": group_id, "user_id": current_user["id"]},
         {"_id": 0}
     )
     if not group:
         raise HTTPException(status_code=404, detail="Setup group not found")
+    not_modified = conditional_document(request, response, group)
+    if not_modified:
+        return not_modified
     return SetupGroup(**group)
 
 @api_router.get("/setup-groups/{group_id}/setups", response_model=List[Setup])
-async def get_group_setups(group_id: str, current_user: dict = Depends(get_current_user)):
+async def get_group_setups(group_id: str, request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    not_modified = await conditional_get(request, response, current_user["id"], "setup_groups", "setups")
+    if not_modified:
+        return not_modified
     # Verify group exists
     group = await db.setup_groups.find_one(
         {"id": group_id, "user_id": current_user["id"]}
@@ -1304,23 +4368,18 @@ async def get_group_setups(group_id: str, current_user: dict = Depends(get_curre
 async def update_setup_group(
     group_id: str,
     update: SetupGroupUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    group = await db.setup_groups.find_one(
-        {"id": group_id, "user_id": current_user["id"]}
-    )
-    if not group:
-        raise HTTPException(status_code=404, detail="Setup group not found")
-    
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
-    await db.setup_groups.update_one(
-        {"id": group_id},
-        {"$set": update_data}
+    updated_group = await update_and_fetch(
+        db.setup_groups, {"id": group_id, "user_id": current_user["id"]}, {"$set": update_data},
+        response, if_match, "Setup group not found"
     )
-    
-    updated_group = await db.setup_groups.find_one({"id": group_id}, {"_id": 0})
+    await bump_versions(current_user["id"], "setup_groups")
     return SetupGroup(**updated_group)
 
 @api_router.delete("/setup-groups/{group_id}")
@@ -1339,15 +4398,77 @@ async def delete_setup_group(group_id: str, current_user: dict = Depends(get_cur
     
     # Delete the group
     await db.setup_groups.delete_one({"id": group_id})
+    await bump_versions(current_user["id"], "setup_groups", "setups")
     
     return {"message": "Setup group deleted successfully"}
 
+# ============== MEDIA ROUTES ==============
+
+@api_router.get("/media/{media_id}")
+async def get_media(
+    media_id: str,
+    variant: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """Stream a stored photo. Content-addressed, so responses are cacheable forever.
+
+    ``variant`` (thumbnail, card or full) selects a resized copy; photos
+    stored before variants existed are always served as uploaded.
+    """
+    if not re.fullmatch(r"[0-9a-f]{64}", media_id):
+        raise HTTPException(status_code=404, detail="Media not found")
+    if variant is not None and variant not in IMAGE_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Unknown variant. Use one of: {', '.join(IMAGE_VARIANTS)}")
+    
+    cache_control = "public, max-age=31536000, immutable"
+    if not variant and if_none_match and f'"{media_id}"' in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": f'"{media_id}"', "Cache-Control": cache_control})
+    
+    media = await db.media.find_one({"id": media_id}, {"_id": 0})
+    if not media:
+        raise HTTPException(status_code=404, detail="Media not found")
+    if variant and media.get("variants", {}).get(variant, media_id) != media_id:
+        media = await db.media.find_one({"id": media["variants"][variant]}, {"_id": 0})
+        if not media:
+            raise HTTPException(status_code=404, detail="Media not found")
+    
+    etag = f'"{media["id"]}"'
+    cache_headers = {"ETag": etag, "Cache-Control": cache_control}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=cache_headers)
+    
+    chunks = await media_store.stream(media["id"])
+    return StreamingResponse(
+        chunks,
+        media_type=media["content_type"],
+        headers={**cache_headers, "Content-Length": str(media["size"])}
+    )
+
 # ============== ROOT ROUTE ==============
 
 @api_router.get("/")
 async def api_root():
     return {"message": "RallyCommand API"}
 
+@api_router.get("/metrics")
+async def get_metrics(current_user: dict = Depends(get_current_user)):
+    """In-process cache counters for this worker; 404 unless METRICS_ENABLED."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"principal_cache": principal_cache.stats(), "dashboard_cache": dashboard_cache.stats()}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """Readiness probe: only report ready once MongoDB has been warmed up and answers a ping."""
+    pool = _mongo.pool_stats()
+    if not _mongo.warm:
+        return JSONResponse(status_code=503, content={"status": "starting", "pool": pool})
+    try:
+        latency_ms = await _mongo.ping()
+    except PyMongoError as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "error": str(e), "pool": pool})
+    return {"status": "ready", "round_trip_ms": round(latency_ms, 2), "pool": pool}
+
 # Health check at actual root "/" for deployment platforms
 @app.get("/")
 async def root():
@@ -1393,17 +4514,31 @@ class RepairLog(BaseModel):
     created_at: str
     updated_at: str
 
+class RepairLogSummary(BaseModel):
+    """Lightweight list view (view=summary): no parts list or repair details."""
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    vehicle_id: str
+    cause_of_damage: str
+    affected_area: str = ""
+    total_parts_cost: float
+    technicians: List[str]
+    created_at: str
+    updated_at: str
+
 # ============== REPAIR LOG ROUTES ==============
 
 @api_router.post("/repairs", response_model=RepairLog)
 async def create_repair_log(repair: RepairLogCreate, current_user: dict = Depends(get_current_user)):
     # Verify vehicle exists and belongs to user
     vehicle = await db.vehicles.find_one(
-        {"id": repair.vehicle_id, "user_id": current_user["id"]}
+        {"id": repair.vehicle_id, "user_id": current_user["id"], **NOT_PENDING_DELETION}
     )
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
+    repair_id = str(uuid.uuid4())
+    
     # Process parts and calculate costs
     parts_data = []
     total_cost = 0.0
@@ -1417,26 +4552,23 @@ async def create_repair_log(repair: RepairLogCreate, current_user: dict = Depend
             "cost": part.cost
         }
         
-        # If from inventory, get the price and optionally deduct quantity
+        # If from inventory, deduct the quantity when in stock and take the price
         if part.source == "inventory" and part.inventory_item_id:
-            inv_item = await db.inventory.find_one(
-                {"id": part.inventory_item_id, "user_id": current_user["id"]},
-                {"_id": 0}
+            inv_item = await apply_stock_movement(
+                current_user["id"], part.inventory_item_id, -part.quantity, "repair", ref_id=repair_id
             )
+            if not inv_item:
+                # Not enough stock to deduct; still cost the part
+                inv_item = await db.inventory.find_one(
+                    {"id": part.inventory_item_id, "user_id": current_user["id"]},
+                    {"_id": 0, "price": 1}
+                )
             if inv_item:
                 part_entry["cost"] = inv_item["price"] * part.quantity
-                # Optionally deduct from inventory
-                new_qty = inv_item["quantity"] - part.quantity
-                if new_qty >= 0:
-                    await db.inventory.update_one(
-                        {"id": part.inventory_item_id},
-                        {"$set": {"quantity": new_qty, "updated_at": datetime.now(timezone.utc).isoformat()}}
-                    )
         
         total_cost += part_entry["cost"]
         parts_data.append(part_entry)
     
-    repair_id = str(uuid.uuid4())
     now = datetime.now(timezone.utc).isoformat()
     
     repair_doc = {
@@ -1453,49 +4585,60 @@ async def create_repair_log(repair: RepairLogCreate, current_user: dict = Depend
         "updated_at": now
     }
     await db.repairs.insert_one(repair_doc)
+    await update_repair_rollups([(None, repair_doc)])
+    await bump_versions(current_user["id"], "repairs", "inventory")
     
     return RepairLog(**repair_doc)
 
-@api_router.get("/repairs", response_model=List[RepairLog])
-async def get_all_repairs(current_user: dict = Depends(get_current_user)):
+@api_router.get("/repairs", response_model=Union[List[RepairLog], List[RepairLogSummary]])
+async def get_all_repairs(request: Request, response: Response, view: str = "full", current_user: dict = Depends(get_current_user)):
+    not_modified = await conditional_get(request, response, current_user["id"], "repairs")
+    if not_modified:
+        return not_modified
+    projection = view_projection(view, RepairLogSummary)
+    model = RepairLogSummary if view == "summary" else RepairLog
     repairs = await db.repairs.find(
         {"user_id": current_user["id"]},
-        {"_id": 0}
+        projection
     ).sort("created_at", -1).to_list(100)
     
-    return [RepairLog(**r) for r in repairs]
+    return [model(**r) for r in repairs]
 
-@api_router.get("/repairs/vehicle/{vehicle_id}", response_model=List[RepairLog])
-async def get_vehicle_repairs(vehicle_id: str, current_user: dict = Depends(get_current_user)):
+@api_router.get("/repairs/vehicle/{vehicle_id}", response_model=Union[List[RepairLog], List[RepairLogSummary]])
+async def get_vehicle_repairs(vehicle_id: str, request: Request, response: Response, view: str = "full", current_user: dict = Depends(get_current_user)):
+    not_modified = await conditional_get(request, response, current_user["id"], "repairs")
+    if not_modified:
+        return not_modified
+    projection = view_projection(view, RepairLogSummary)
+    model = RepairLogSummary if view == "summary" else RepairLog
     repairs = await db.repairs.find(
         {"vehicle_id": vehicle_id, "user_id": current_user["id"]},
-        {"_id": 0}
+        projection
     ).sort("created_at", -1).to_list(100)
     
-    return [RepairLog(**r) for r in repairs]
+    return [model(**r) for r in repairs]
 
 @api_router.get("/repairs/{repair_id}", response_model=RepairLog)
-async def get_repair(repair_id: str, current_user: dict = Depends(get_current_user)):
+async def get_repair(repair_id: str, request: Request, response: Response, current_user: dict = Depends(get_current_user)):
     repair = await db.repairs.find_one(
         {"id": repair_id, "user_id": current_user["id"]},
         {"_id": 0}
     )
     if not repair:
         raise HTTPException(status_code=404, detail="Repair log not found")
+    not_modified = conditional_document(request, response, repair)
+    if not_modified:
+        return not_modified
     return RepairLog(**repair)
 
 @api_router.put("/repairs/{repair_id}", response_model=RepairLog)
 async def update_repair(
     repair_id: str,
     update: RepairLogUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    repair = await db.repairs.find_one(
-        {"id": repair_id, "user_id": current_user["id"]}
-    )
-    if not repair:
-        raise HTTPException(status_code=404, detail="Repair log not found")
-    
     update_data = {}
     if update.cause_of_damage is not None:
         update_data["cause_of_damage"] = update.cause_of_damage
@@ -1512,21 +4655,26 @@ async def update_repair(
     
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
-    await db.repairs.update_one(
-        {"id": repair_id},
-        {"$set": update_data}
+    previous = await update_and_fetch(
+        db.repairs, {"id": repair_id, "user_id": current_user["id"]}, {"$set": update_data},
+        response, if_match, "Repair log not found", return_document=ReturnDocument.BEFORE
     )
-    
-    updated_repair = await db.repairs.find_one({"id": repair_id}, {"_id": 0})
+    updated_repair = {**previous, **update_data}
+    response.headers["ETag"] = document_etag(updated_repair)
+    await update_repair_rollups([(previous, updated_repair)])
+    await bump_versions(current_user["id"], "repairs")
     return RepairLog(**updated_repair)
 
 @api_router.delete("/repairs/{repair_id}")
 async def delete_repair(repair_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.repairs.delete_one(
-        {"id": repair_id, "user_id": current_user["id"]}
+    deleted = await db.repairs.find_one_and_delete(
+        {"id": repair_id, "user_id": current_user["id"]},
+        projection=REPAIR_ROLLUP_FIELDS
     )
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Repair log not found")
+    await update_repair_rollups([(deleted, None)])
+    await bump_versions(current_user["id"], "repairs")
     
     return {"message": "Repair log deleted successfully"}
 
@@ -1627,11 +4775,12 @@ async def apply_stocktake(stocktake_id: str, current_user: dict = Depends(get_cu
     # Update inventory quantities based on stocktake
     now = datetime.now(timezone.utc).isoformat()
     for item in stocktake["items"]:
-        await db.inventory.update_one(
-            {"id": item["item_id"], "user_id": current_user["id"]},
-            {"$set": {"quantity": item["actual_quantity"], "updated_at": now}}
+        await set_stock_level(
+            current_user["id"], item["item_id"], item["actual_quantity"], "stocktake", ref_id=stocktake_id
         )
     
+    await bump_versions(current_user["id"], "inventory")
+    
     # Mark stocktake as applied
     await db.stocktakes.update_one(
         {"id": stocktake_id},
@@ -1808,6 +4957,3 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
@@ -0,0 +1,76 @@
+"""
+Test Suite for Analytics
+Tests: rollup-backed series from GET /api/analytics/usage and /api/analytics/repairs
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('VITE_BACKEND_URL', 'https://rally-inventory.preview.emergentagent.com').rstrip('/')
+
+# Test credentials
+TEST_EMAIL = "demo@rallyteam.com"
+TEST_PASSWORD = "rally2024"
+
+
+class TestAnalytics:
+    """Chart-ready series over a date range"""
+
+    def test_usage_series_counts_new_usage(self, api_client, auth_token):
+        """Logged usage shows up in today's bucket of its item series"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_Analytics_{uuid.uuid4().hex[:8]}", "category": "tools", "quantity": 10
+        }, headers=headers)
+        assert response.status_code == 200
+        item_id = response.json()["id"]
+
+        response = api_client.post(f"{BASE_URL}/api/usage", json={
+            "item_id": item_id, "quantity_used": 3
+        }, headers=headers)
+        assert response.status_code == 200
+
+        response = api_client.get(f"{BASE_URL}/api/analytics/usage", params={
+            "group_by": "item", "period": "day", "item_id": item_id
+        }, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["buckets"]) == 30
+        assert len(data["series"]) == 1
+        series = data["series"][0]
+        assert series["key"] == item_id
+        assert series["totals"] == {"quantity": 3, "events": 1}
+        assert series["points"][-1]["quantity"] == 3
+
+        api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+
+    def test_invalid_range_rejected(self, api_client, auth_token):
+        """Unknown periods and oversized ranges return 400"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.get(f"{BASE_URL}/api/analytics/repairs", params={"period": "month"}, headers=headers)
+        assert response.status_code == 400
+        response = api_client.get(f"{BASE_URL}/api/analytics/repairs", params={
+            "period": "day", "start": "2000-01-01"
+        }, headers=headers)
+        assert response.status_code == 400
+
+
+@pytest.fixture
+def api_client():
+    """Shared requests session"""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+
+@pytest.fixture
+def auth_token(api_client):
+    """Get authentication token"""
+    response = api_client.post(f"{BASE_URL}/api/auth/login", json={
+        "email": TEST_EMAIL,
+        "password": TEST_PASSWORD
+    })
+    if response.status_code == 200:
+        return response.json().get("token")
+    pytest.skip(f"Authentication failed: {response.status_code} - {response.text}")
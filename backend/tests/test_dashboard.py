@@ -0,0 +1,65 @@
+"""
+Test Suite for Dashboard Stats
+Tests: inventory totals computed by GET /api/dashboard/stats
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('VITE_BACKEND_URL', 'https://rally-inventory.preview.emergentagent.com').rstrip('/')
+
+# Test credentials
+TEST_EMAIL = "demo@rallyteam.com"
+TEST_PASSWORD = "rally2024"
+
+
+class TestDashboardStats:
+    """Inventory totals across the whole inventory"""
+
+    def test_totals_follow_new_item(self, api_client, auth_token):
+        """Adding an item raises count, value and its category count"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.get(f"{BASE_URL}/api/dashboard/stats", headers=headers)
+        assert response.status_code == 200
+        before = response.json()
+
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_Dash_{uuid.uuid4().hex[:8]}",
+            "category": "tools",
+            "quantity": 4,
+            "min_stock": 5,
+            "price": 2.5
+        }, headers=headers)
+        assert response.status_code == 200
+        item_id = response.json()["id"]
+
+        response = api_client.get(f"{BASE_URL}/api/dashboard/stats", headers=headers)
+        assert response.status_code == 200
+        after = response.json()
+        assert after["total_items"] == before["total_items"] + 1
+        assert after["low_stock_count"] == before["low_stock_count"] + 1
+        assert after["total_value"] == pytest.approx(before["total_value"] + 10.0)
+        assert after["categories"].get("tools", 0) == before["categories"].get("tools", 0) + 1
+
+        api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+
+
+@pytest.fixture
+def api_client():
+    """Shared requests session"""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+
+@pytest.fixture
+def auth_token(api_client):
+    """Get authentication token"""
+    response = api_client.post(f"{BASE_URL}/api/auth/login", json={
+        "email": TEST_EMAIL,
+        "password": TEST_PASSWORD
+    })
+    if response.status_code == 200:
+        return response.json().get("token")
+    pytest.skip(f"Authentication failed: {response.status_code} - {response.text}")
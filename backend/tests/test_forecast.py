@@ -0,0 +1,73 @@
+"""
+Test Suite for Restock Forecast
+Tests: burn rates and the supplier-grouped reorder list from GET /api/forecast/restock
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('VITE_BACKEND_URL', 'https://rally-inventory.preview.emergentagent.com').rstrip('/')
+
+# Test credentials
+TEST_EMAIL = "demo@rallyteam.com"
+TEST_PASSWORD = "rally2024"
+
+
+class TestRestockForecast:
+    """Reorder suggestions from recent usage"""
+
+    def test_fast_burning_item_is_listed_under_supplier(self, api_client, auth_token):
+        """An item used today at 4/day with 4 units above min_stock is due in one day"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        supplier = f"TEST_Supplier_{uuid.uuid4().hex[:8]}"
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_Forecast_{uuid.uuid4().hex[:8]}", "category": "tools",
+            "quantity": 10, "min_stock": 2, "supplier": supplier, "price": 5
+        }, headers=headers)
+        assert response.status_code == 200
+        item_id = response.json()["id"]
+
+        response = api_client.post(f"{BASE_URL}/api/usage", json={
+            "item_id": item_id, "quantity_used": 4
+        }, headers=headers)
+        assert response.status_code == 200
+
+        response = api_client.get(f"{BASE_URL}/api/forecast/restock", params={"horizon_days": 7}, headers=headers)
+        assert response.status_code == 200
+        groups = {group["supplier"]: group for group in response.json()["suppliers"]}
+        assert supplier in groups
+        item = groups[supplier]["items"][0]
+        assert item["id"] == item_id
+        assert item["daily_rate"] == 4
+        assert item["days_until_min_stock"] == 1
+        assert item["reorder_quantity"] == 24
+        assert groups[supplier]["estimated_cost"] == 120
+
+        api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+
+    def test_invalid_window_rejected(self, api_client, auth_token):
+        """Lookback windows shorter than a week are rejected"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.get(f"{BASE_URL}/api/forecast/restock", params={"lookback_days": 3}, headers=headers)
+        assert response.status_code == 422
+
+
+@pytest.fixture
+def api_client():
+    """Shared requests session"""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+
+@pytest.fixture
+def auth_token(api_client):
+    """Get authentication token"""
+    response = api_client.post(f"{BASE_URL}/api/auth/login", json={
+        "email": TEST_EMAIL,
+        "password": TEST_PASSWORD
+    })
+    if response.status_code == 200:
+        return response.json().get("token")
+    pytest.skip(f"Authentication failed: {response.status_code} - {response.text}")
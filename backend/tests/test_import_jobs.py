@@ -0,0 +1,110 @@
+"""
+Test Suite for Import Jobs
+Tests: chunked, resumable uploads via /api/account/import/jobs and the job status endpoint
+"""
+import pytest
+import requests
+import os
+import json
+import uuid
+
+BASE_URL = os.environ.get('VITE_BACKEND_URL', 'https://rally-inventory.preview.emergentagent.com').rstrip('/')
+
+# Test credentials
+TEST_EMAIL = "demo@rallyteam.com"
+TEST_PASSWORD = "rally2024"
+
+
+class TestImportJobs:
+    """Backups uploaded in chunks and imported as they arrive"""
+
+    def test_chunked_upload_resumes_and_completes(self, api_client, auth_token):
+        """Records split across chunks are imported; re-sent and out-of-order chunks are handled"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        tag = uuid.uuid4().hex[:8]
+        backup = json.dumps({
+            "exported_at": "2026-01-01T00:00:00+00:00",
+            "user": {"email": "someone@example.com"},
+            "vehicles": [{"id": "old-vehicle", "make": f"TEST_Job_{tag}", "model": "Évo"}],
+            "inventory": [{"name": f"TEST_Job_Item_{tag}_{i}", "vehicle_ids": ["old-vehicle"]} for i in range(5)],
+            "repairs": [],
+            "setups": [],
+            "stocktakes": []
+        }, ensure_ascii=False).encode()
+        chunks = [backup[i:i + 64] for i in range(0, len(backup), 64)]
+
+        response = api_client.post(f"{BASE_URL}/api/account/import/jobs", json={
+            "format": "json", "total_bytes": len(backup)
+        }, headers=headers)
+        assert response.status_code == 200
+        job = response.json()
+        assert (job["status"], job["next_chunk"]) == ("uploading", 0)
+
+        for index, chunk in enumerate(chunks):
+            response = api_client.put(f"{BASE_URL}/api/account/import/jobs/{job['id']}/chunks/{index}",
+                                      data=chunk, headers=headers)
+            assert response.status_code == 200
+            assert response.json()["next_chunk"] == index + 1
+
+        # A chunk the server already has is acknowledged; skipping ahead is refused
+        response = api_client.put(f"{BASE_URL}/api/account/import/jobs/{job['id']}/chunks/0", data=chunks[0], headers=headers)
+        assert response.status_code == 200
+        response = api_client.put(f"{BASE_URL}/api/account/import/jobs/{job['id']}/chunks/{len(chunks) + 1}",
+                                  data=b"{}", headers=headers)
+        assert response.status_code == 409
+
+        response = api_client.post(f"{BASE_URL}/api/account/import/jobs/{job['id']}/complete", headers=headers)
+        assert response.status_code == 200
+        job = response.json()
+        assert job["status"] == "completed"
+        assert job["received_bytes"] == len(backup)
+        assert job["stats"]["vehicles_imported"] == 1
+        assert job["stats"]["inventory_imported"] == 5
+
+        response = api_client.get(f"{BASE_URL}/api/account/import/jobs/{job['id']}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["status"] == "completed"
+
+        vehicles = api_client.get(f"{BASE_URL}/api/vehicles", headers=headers).json()
+        vehicle = next(v for v in vehicles if v["make"] == f"TEST_Job_{tag}")
+        items = api_client.get(f"{BASE_URL}/api/inventory", params={"vehicle_id": vehicle["id"]}, headers=headers).json()
+        assert len(items) == 5
+        for item in items:
+            api_client.delete(f"{BASE_URL}/api/inventory/{item['id']}", headers=headers)
+        api_client.delete(f"{BASE_URL}/api/vehicles/{vehicle['id']}", headers=headers)
+
+    def test_truncated_file_fails_job(self, api_client, auth_token):
+        """Completing a job whose file ends mid-document marks it failed"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.post(f"{BASE_URL}/api/account/import/jobs", json={"format": "json"}, headers=headers)
+        job_id = response.json()["id"]
+        response = api_client.put(f"{BASE_URL}/api/account/import/jobs/{job_id}/chunks/0",
+                                  data=b'{"vehicles": [{"make": "TEST_Truncated"', headers=headers)
+        assert response.status_code == 200
+
+        response = api_client.post(f"{BASE_URL}/api/account/import/jobs/{job_id}/complete", headers=headers)
+        assert response.status_code == 200
+        job = response.json()
+        assert job["status"] == "failed"
+        assert job["error"]
+        assert job["stats"]["vehicles_imported"] == 0
+
+
+@pytest.fixture
+def api_client():
+    """Shared requests session"""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+
+@pytest.fixture
+def auth_token(api_client):
+    """Get authentication token"""
+    response = api_client.post(f"{BASE_URL}/api/auth/login", json={
+        "email": TEST_EMAIL,
+        "password": TEST_PASSWORD
+    })
+    if response.status_code == 200:
+        return response.json().get("token")
+    pytest.skip(f"Authentication failed: {response.status_code} - {response.text}")
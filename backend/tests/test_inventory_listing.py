@@ -0,0 +1,166 @@
+"""
+Test Suite for Inventory Listing
+Tests: cursor pagination, server-side low-stock filtering and conditional GET on /api/inventory
+"""
+import pytest
+import requests
+import os
+import uuid
+
+BASE_URL = os.environ.get('VITE_BACKEND_URL', 'https://rally-inventory.preview.emergentagent.com').rstrip('/')
+
+# Test credentials
+TEST_EMAIL = "demo@rallyteam.com"
+TEST_PASSWORD = "rally2024"
+
+
+class TestInventoryPagination:
+    """Keyset pagination with opaque cursors"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, auth_token):
+        """Create a handful of items to page through"""
+        self.client = api_client
+        self.headers = {"Authorization": f"Bearer {auth_token}"}
+        self.tag = f"TEST_Page_{uuid.uuid4().hex[:8]}"
+        self.item_ids = []
+        for i in range(5):
+            response = api_client.post(f"{BASE_URL}/api/inventory", json={
+                "name": f"{self.tag}_{i}",
+                "category": "tools",
+                "quantity": 5
+            }, headers=self.headers)
+            assert response.status_code == 200
+            self.item_ids.append(response.json()["id"])
+        yield
+        for item_id in self.item_ids:
+            api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=self.headers)
+
+    def test_pages_cover_all_items_once(self):
+        """Following X-Next-Cursor returns every item exactly once"""
+        seen = []
+        cursor = None
+        while True:
+            params = {"category": "tools", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(f"{BASE_URL}/api/inventory", params=params, headers=self.headers)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page) <= 2
+            seen.extend(item["id"] for item in page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert len(seen) == len(set(seen)), "Items repeated across pages"
+        for item_id in self.item_ids:
+            assert item_id in seen
+
+    def test_include_total(self):
+        """include_total returns X-Total-Count for the whole filter"""
+        response = self.client.get(f"{BASE_URL}/api/inventory", params={
+            "category": "tools", "limit": 1, "include_total": "true"
+        }, headers=self.headers)
+        assert response.status_code == 200
+        assert int(response.headers["X-Total-Count"]) >= len(self.item_ids)
+        assert len(response.json()) == 1
+
+    def test_invalid_cursor(self):
+        """Malformed cursors are rejected"""
+        response = self.client.get(f"{BASE_URL}/api/inventory", params={"cursor": "not-a-cursor"}, headers=self.headers)
+        assert response.status_code == 400
+
+
+class TestLowStockFilter:
+    """low_stock is evaluated by the database and tracks quantity writes"""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, api_client, auth_token):
+        self.client = api_client
+        self.headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_LowStock_{uuid.uuid4().hex[:8]}",
+            "category": "fluids",
+            "quantity": 5,
+            "min_stock": 2
+        }, headers=self.headers)
+        assert response.status_code == 200
+        self.item_id = response.json()["id"]
+        yield
+        api_client.delete(f"{BASE_URL}/api/inventory/{self.item_id}", headers=self.headers)
+
+    def low_stock_ids(self):
+        response = self.client.get(f"{BASE_URL}/api/inventory", params={
+            "low_stock": "true", "category": "fluids"
+        }, headers=self.headers)
+        assert response.status_code == 200
+        for item in response.json():
+            assert item["quantity"] <= item["min_stock"]
+        return [item["id"] for item in response.json()]
+
+    def test_low_stock_follows_usage_and_restock(self):
+        """Item enters the low-stock list after usage and leaves it after restock"""
+        assert self.item_id not in self.low_stock_ids()
+
+        response = self.client.post(f"{BASE_URL}/api/usage", json={
+            "item_id": self.item_id, "quantity_used": 4
+        }, headers=self.headers)
+        assert response.status_code == 200
+        assert self.item_id in self.low_stock_ids()
+
+        response = self.client.put(f"{BASE_URL}/api/inventory/{self.item_id}", json={
+            "quantity": 10
+        }, headers=self.headers)
+        assert response.status_code == 200
+        assert self.item_id not in self.low_stock_ids()
+
+
+
+class TestConditionalGet:
+    """ETag / If-None-Match revalidation"""
+
+    def test_unchanged_list_returns_304_until_write(self, api_client, auth_token):
+        """A matching If-None-Match gets 304; any inventory write changes the ETag"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.get(f"{BASE_URL}/api/inventory", headers=headers)
+        assert response.status_code == 200
+        etag = response.headers.get("ETag")
+        assert etag
+
+        response = api_client.get(f"{BASE_URL}/api/inventory", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_ETag_{uuid.uuid4().hex[:8]}",
+            "category": "tools",
+            "quantity": 1
+        }, headers=headers)
+        assert response.status_code == 200
+        item_id = response.json()["id"]
+
+        response = api_client.get(f"{BASE_URL}/api/inventory", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers.get("ETag") != etag
+
+        api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+
+@pytest.fixture
+def api_client():
+    """Shared requests session"""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+
+@pytest.fixture
+def auth_token(api_client):
+    """Get authentication token"""
+    response = api_client.post(f"{BASE_URL}/api/auth/login", json={
+        "email": TEST_EMAIL,
+        "password": TEST_PASSWORD
+    })
+    if response.status_code == 200:
+        return response.json().get("token")
+    pytest.skip(f"Authentication failed: {response.status_code} - {response.text}")
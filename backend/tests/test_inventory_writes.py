@@ -0,0 +1,233 @@
+"""
+Test Suite for Inventory Writes
+Tests: batched create/update/delete via POST /api/inventory/bulk, the stock movement ledger, usage history,
+background deletion jobs and If-Match on PUT
+"""
+import pytest
+import requests
+import os
+import time
+import uuid
+
+BASE_URL = os.environ.get('VITE_BACKEND_URL', 'https://rally-inventory.preview.emergentagent.com').rstrip('/')
+
+# Test credentials
+TEST_EMAIL = "demo@rallyteam.com"
+TEST_PASSWORD = "rally2024"
+
+
+class TestInventoryBulk:
+    """Mixed bulk operations with per-operation results"""
+
+    def test_mixed_operations(self, api_client, auth_token):
+        """Create, update and delete in one request; unknown ids fail individually"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        tag = f"TEST_Bulk_{uuid.uuid4().hex[:8]}"
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"{tag}_existing", "category": "tools", "quantity": 5
+        }, headers=headers)
+        assert response.status_code == 200
+        existing_id = response.json()["id"]
+
+        response = api_client.post(f"{BASE_URL}/api/inventory/bulk", json={"operations": [
+            {"op": "create", "item": {"name": f"{tag}_new", "category": "tools", "quantity": 2}},
+            {"op": "update", "id": existing_id, "changes": {"quantity": 9}},
+            {"op": "delete", "id": f"{tag}_missing"}
+        ]}, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["created"], data["updated"], data["deleted"], data["failed"]) == (1, 1, 0, 1)
+        created, updated, missing = data["results"]
+        assert created["status"] == "ok" and created["item"]["name"] == f"{tag}_new"
+        assert updated["status"] == "ok" and updated["item"]["quantity"] == 9
+        assert missing["status"] == "error"
+
+        response = api_client.post(f"{BASE_URL}/api/inventory/bulk", json={"operations": [
+            {"op": "delete", "id": existing_id},
+            {"op": "delete", "id": created["id"]}
+        ]}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["deleted"] == 2
+
+        response = api_client.get(f"{BASE_URL}/api/inventory/{existing_id}", headers=headers)
+        assert response.status_code == 404
+
+
+
+class TestStockMovements:
+    """Relative quantity changes recorded in the item ledger"""
+
+    def test_usage_and_restock_are_ledgered(self, api_client, auth_token):
+        """Usage and restock adjust quantity and appear newest-first in the ledger"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_Ledger_{uuid.uuid4().hex[:8]}", "category": "tools", "quantity": 5
+        }, headers=headers)
+        assert response.status_code == 200
+        item_id = response.json()["id"]
+
+        response = api_client.post(f"{BASE_URL}/api/usage", json={
+            "item_id": item_id, "quantity_used": 6
+        }, headers=headers)
+        assert response.status_code == 400
+
+        response = api_client.post(f"{BASE_URL}/api/usage", json={
+            "item_id": item_id, "quantity_used": 2
+        }, headers=headers)
+        assert response.status_code == 200
+
+        response = api_client.post(f"{BASE_URL}/api/inventory/{item_id}/movements", json={
+            "delta": 4, "reason": "TEST restock"
+        }, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["quantity"] == 7
+
+        response = api_client.get(f"{BASE_URL}/api/inventory/{item_id}/movements", headers=headers)
+        assert response.status_code == 200
+        movements = response.json()
+        assert [(m["kind"], m["delta"], m["quantity_after"]) for m in movements] == [
+            ("restock", 4, 7), ("usage", -2, 3)
+        ]
+
+        api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+
+
+class TestUsageHistory:
+    """Usage events read back from monthly buckets"""
+
+    def test_usage_history_newest_first(self, api_client, auth_token):
+        """GET /api/usage/{item_id} returns each logged event, newest first"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_Usage_{uuid.uuid4().hex[:8]}", "category": "tools", "quantity": 10
+        }, headers=headers)
+        assert response.status_code == 200
+        item_id = response.json()["id"]
+
+        logged = []
+        for reason in ("TEST first", "TEST second", "TEST third"):
+            response = api_client.post(f"{BASE_URL}/api/usage", json={
+                "item_id": item_id, "quantity_used": 1, "reason": reason
+            }, headers=headers)
+            assert response.status_code == 200
+            logged.append(response.json()["id"])
+
+        response = api_client.get(f"{BASE_URL}/api/usage/{item_id}", headers=headers)
+        assert response.status_code == 200
+        logs = response.json()
+        assert [log["id"] for log in logs] == logged[::-1]
+        assert all(log["item_id"] == item_id and log["quantity_used"] == 1 for log in logs)
+
+        api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+        response = api_client.get(f"{BASE_URL}/api/usage/{item_id}", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == []
+
+
+class TestDeletionJobs:
+    """Item deletes finish their cascade in a background deletion job"""
+
+    def test_item_usage_removed_by_deletion_job(self, api_client, auth_token):
+        """DELETE returns a deletion_id whose job completes and reports what it removed"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_Deletion_{uuid.uuid4().hex[:8]}", "category": "tools", "quantity": 5
+        }, headers=headers)
+        assert response.status_code == 200
+        item_id = response.json()["id"]
+        response = api_client.post(f"{BASE_URL}/api/usage", json={
+            "item_id": item_id, "quantity_used": 1, "reason": "TEST deletion"
+        }, headers=headers)
+        assert response.status_code == 200
+
+        response = api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+        assert response.status_code == 200
+        deletion_id = response.json()["deletion_id"]
+        response = api_client.get(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+        assert response.status_code == 404
+
+        deadline = time.time() + 30
+        while True:
+            response = api_client.get(f"{BASE_URL}/api/deletions/{deletion_id}", headers=headers)
+            assert response.status_code == 200
+            job = response.json()
+            if job["status"] == "completed" or time.time() > deadline:
+                break
+            time.sleep(1)
+        assert job["status"] == "completed"
+        assert job["kind"] == "item" and job["root_ids"] == [item_id]
+        assert job["step"] == len(job["steps"])
+        assert job["deleted"] == sum(step["deleted"] for step in job["steps"]) >= 1
+
+        response = api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+        assert response.status_code == 404
+
+
+class TestOptimisticConcurrency:
+    """PUT with If-Match carrying the updated_at version"""
+
+    def test_stale_version_is_rejected(self, api_client, auth_token):
+        """A PUT against an outdated version gets 412; the current version succeeds"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_IfMatch_{uuid.uuid4().hex[:8]}", "category": "tools", "quantity": 1
+        }, headers=headers)
+        assert response.status_code == 200
+        item = response.json()
+
+        response = api_client.put(f"{BASE_URL}/api/inventory/{item['id']}", json={"quantity": 2},
+                                  headers={**headers, "If-Match": f'"{item["updated_at"]}"'})
+        assert response.status_code == 200
+        assert response.headers.get("ETag") == f'"{response.json()["updated_at"]}"'
+
+        response = api_client.put(f"{BASE_URL}/api/inventory/{item['id']}", json={"quantity": 3},
+                                  headers={**headers, "If-Match": f'"{item["updated_at"]}"'})
+        assert response.status_code == 412
+
+        api_client.delete(f"{BASE_URL}/api/inventory/{item['id']}", headers=headers)
+
+    def test_get_etag_is_accepted_by_if_match(self, api_client, auth_token):
+        """The ETag from GET /inventory/{id} works as If-Match until the item changes"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = api_client.post(f"{BASE_URL}/api/inventory", json={
+            "name": f"TEST_IfMatch_{uuid.uuid4().hex[:8]}", "category": "tools", "quantity": 1
+        }, headers=headers)
+        assert response.status_code == 200
+        item_id = response.json()["id"]
+
+        response = api_client.get(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+        assert response.status_code == 200
+        etag = response.headers.get("ETag")
+        response = api_client.get(f"{BASE_URL}/api/inventory/{item_id}", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+        response = api_client.put(f"{BASE_URL}/api/inventory/{item_id}", json={"quantity": 2},
+                                  headers={**headers, "If-Match": etag})
+        assert response.status_code == 200
+        response = api_client.get(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+        assert response.headers.get("ETag") != etag
+
+        response = api_client.put(f"{BASE_URL}/api/inventory/{item_id}", json={"quantity": 3},
+                                  headers={**headers, "If-Match": etag})
+        assert response.status_code == 412
+
+        api_client.delete(f"{BASE_URL}/api/inventory/{item_id}", headers=headers)
+
+@pytest.fixture
+def api_client():
+    """Shared requests session"""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+
+@pytest.fixture
+def auth_token(api_client):
+    """Get authentication token"""
+    response = api_client.post(f"{BASE_URL}/api/auth/login", json={
+        "email": TEST_EMAIL,
+        "password": TEST_PASSWORD
+    })
+    if response.status_code == 200:
+        return response.json().get("token")
+    pytest.skip(f"Authentication failed: {response.status_code} - {response.text}")
@@ -4,13 +4,16 @@ Tests:
 1. Setup creation with new tyre fields (tyre_compound, tyre_condition, tyre_type, tyre_size)
 2. Setup update with tyre fields
 3. Setup retrieval with tyre fields
-4. Export data endpoint
+4. Export data endpoint (JSON, NDJSON and zip)
 5. Import data endpoint
 """
 import pytest
 import requests
 import os
 import json
+import io
+import zipfile
+import uuid
 
 BASE_URL = os.environ.get('VITE_BACKEND_URL', 'https://rally-inventory.preview.emergentagent.com')
 
@@ -313,7 +316,32 @@ class TestDataExportImport:
         assert "id" in vehicle
         assert "make" in vehicle
         assert "model" in vehicle
-    
+
+    def test_export_ndjson_format(self, auth_headers):
+        """NDJSON export starts with the header line and tags every record with its section"""
+        response = requests.get(f"{BASE_URL}/api/account/export", params={"format": "ndjson"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert "attachment" in response.headers.get("Content-Disposition", "")
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]["section"] == "export"
+        assert lines[0]["record"]["user"]["email"] == TEST_EMAIL
+        assert any(line["section"] == "vehicles" for line in lines[1:])
+
+    def test_export_zip_format(self, auth_headers):
+        """Zip export holds a manifest and one NDJSON entry per section"""
+        response = requests.get(f"{BASE_URL}/api/account/export", params={"format": "zip"}, headers=auth_headers)
+        assert response.status_code == 200
+
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        assert archive.testzip() is None
+        manifest = json.loads(archive.read("manifest.json"))
+        for section in manifest["sections"]:
+            assert f"{section}.ndjson" in archive.namelist()
+        vehicles = archive.read("vehicles.ndjson").decode().splitlines()
+        assert len(vehicles) > 0
+        assert "make" in json.loads(vehicles[0])
+
     def test_import_data_endpoint_empty(self, auth_headers):
         """Test import endpoint with empty data"""
         import_data = {
@@ -390,6 +418,107 @@ class TestDataExportImport:
         # Note: This may fail if vehicle_id mapping doesn't work, but we're testing the endpoint accepts the data
         assert response.status_code == 200
 
+    def test_import_remaps_ids_and_reports_errors(self, auth_headers):
+        """Records referencing an imported vehicle are remapped; others are reported and skipped"""
+        import_data = {
+            "vehicles": [{"id": "test-import-vehicle-remap", "make": "TEST_Remap_Make", "model": "TEST_Remap_Model"}],
+            "inventory": [
+                {"name": f"TEST_Import_Item_{i}", "vehicle_ids": ["test-import-vehicle-remap"]} for i in range(3)
+            ],
+            "repairs": [{"vehicle_id": "test-import-vehicle-missing", "cause_of_damage": "TEST"}],
+            "setups": [{"name": "TEST_Remapped_Setup", "vehicle_id": "test-import-vehicle-remap"}],
+            "stocktakes": []
+        }
+
+        response = requests.post(f"{BASE_URL}/api/account/import", json=import_data, headers=auth_headers)
+        assert response.status_code == 200
+        stats = response.json()["stats"]
+        assert stats["vehicles_imported"] == 1
+        assert stats["inventory_imported"] == 3
+        assert stats["setups_imported"] == 1
+        assert stats["repairs_imported"] == 0
+        assert "Repair skipped: vehicle not found" in stats["errors"]
+
+        vehicles = requests.get(f"{BASE_URL}/api/vehicles", headers=auth_headers).json()
+        vehicle = next(v for v in vehicles if v["make"] == "TEST_Remap_Make")
+        setups = requests.get(f"{BASE_URL}/api/setups/vehicle/{vehicle['id']}", headers=auth_headers).json()
+        assert [s["name"] for s in setups] == ["TEST_Remapped_Setup"]
+
+        items = requests.get(f"{BASE_URL}/api/inventory", params={"vehicle_id": vehicle["id"]}, headers=auth_headers).json()
+        assert len(items) == 3
+        for item in items:
+            assert item["vehicle_ids"] == [vehicle["id"]]
+            requests.delete(f"{BASE_URL}/api/inventory/{item['id']}", headers=auth_headers)
+
+    def test_merge_import_is_idempotent(self, auth_headers):
+        """Re-importing a backup in merge mode skips unchanged records and updates changed ones"""
+        tag = uuid.uuid4().hex[:8]
+        import_data = {
+            "vehicles": [{"id": f"test-merge-vehicle-{tag}", "make": f"TEST_Merge_{tag}", "model": "TEST_Merge_Model"}],
+            "inventory": [
+                {"id": f"test-merge-item-{tag}-{i}", "name": f"TEST_Merge_Item_{i}", "quantity": 2,
+                 "vehicle_ids": [f"test-merge-vehicle-{tag}"]} for i in range(2)
+            ],
+            "repairs": [],
+            "setups": [],
+            "stocktakes": []
+        }
+
+        response = requests.post(f"{BASE_URL}/api/account/import", params={"mode": "merge"}, json=import_data, headers=auth_headers)
+        assert response.status_code == 200
+        stats = response.json()["stats"]
+        assert (stats["vehicles_imported"], stats["inventory_imported"]) == (1, 2)
+
+        response = requests.post(f"{BASE_URL}/api/account/import", params={"mode": "merge"}, json=import_data, headers=auth_headers)
+        stats = response.json()["stats"]
+        assert (stats["vehicles_imported"], stats["inventory_imported"]) == (0, 0)
+        assert (stats["vehicles_unchanged"], stats["inventory_unchanged"]) == (1, 2)
+
+        import_data["inventory"][0]["quantity"] = 7
+        response = requests.post(f"{BASE_URL}/api/account/import", params={"mode": "merge"}, json=import_data, headers=auth_headers)
+        stats = response.json()["stats"]
+        assert (stats["inventory_imported"], stats["inventory_updated"], stats["inventory_unchanged"]) == (0, 1, 1)
+
+        vehicles = requests.get(f"{BASE_URL}/api/vehicles", headers=auth_headers).json()
+        vehicle = next(v for v in vehicles if v["make"] == f"TEST_Merge_{tag}")
+        items = requests.get(f"{BASE_URL}/api/inventory", params={"vehicle_id": vehicle["id"]}, headers=auth_headers).json()
+        assert sorted(item["quantity"] for item in items) == [2, 7]
+        for item in items:
+            requests.delete(f"{BASE_URL}/api/inventory/{item['id']}", headers=auth_headers)
+
+    def test_merge_import_keeps_identical_repairs(self, auth_headers):
+        """Identical records are matched one-to-one, never collapsed into one document"""
+        tag = uuid.uuid4().hex[:8]
+        vehicle_id = f"test-merge-vehicle-{tag}"
+        repair = {"vehicle_id": vehicle_id, "cause_of_damage": "TEST_Merge_Repair", "affected_area": "front",
+                  "total_parts_cost": 10}
+        import_data = {
+            "vehicles": [{"id": vehicle_id, "make": f"TEST_Merge_{tag}", "model": "TEST_Merge_Model"}],
+            "inventory": [],
+            "repairs": [{**repair, "id": f"test-merge-repair-{tag}-0"}],
+            "setups": [],
+            "stocktakes": []
+        }
+        response = requests.post(f"{BASE_URL}/api/account/import", params={"mode": "merge"}, json=import_data, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["stats"]["repairs_imported"] == 1
+
+        import_data["repairs"].append({**repair, "id": f"test-merge-repair-{tag}-1"})
+        response = requests.post(f"{BASE_URL}/api/account/import", params={"mode": "merge"}, json=import_data, headers=auth_headers)
+        assert response.status_code == 200
+        stats = response.json()["stats"]
+        assert (stats["repairs_imported"], stats["repairs_unchanged"]) == (1, 1)
+
+        response = requests.post(f"{BASE_URL}/api/account/import", params={"mode": "merge"}, json=import_data, headers=auth_headers)
+        stats = response.json()["stats"]
+        assert (stats["repairs_imported"], stats["repairs_unchanged"]) == (0, 2)
+
+        vehicles = requests.get(f"{BASE_URL}/api/vehicles", headers=auth_headers).json()
+        vehicle = next(v for v in vehicles if v["make"] == f"TEST_Merge_{tag}")
+        repairs = requests.get(f"{BASE_URL}/api/repairs/vehicle/{vehicle['id']}", headers=auth_headers).json()
+        assert len(repairs) == 2
+        requests.delete(f"{BASE_URL}/api/vehicles/{vehicle['id']}", headers=auth_headers)
+
 
 class TestCleanup:
     """Cleanup test data"""
@@ -21,6 +21,7 @@ import {
 } from '@/components/ui/select';
 import { toast } from 'sonner';
 import { Save, Package, Upload, X, Car } from 'lucide-react';
+import { mediaUrl } from '@/lib/utils';
 
 const API = `${import.meta.env.VITE_BACKEND_URL}/api`;
 
@@ -114,7 +115,7 @@ export const ItemFormDialog = ({ open, onClose, onSaved, item }) => {
 
   const fetchVehicles = async () => {
     try {
-      const response = await axios.get(`${API}/vehicles`, {
+      const response = await axios.get(`${API}/vehicles?view=summary`, {
         headers: getAuthHeader()
       });
       setVehicles(response.data);
@@ -440,7 +441,7 @@ export const ItemFormDialog = ({ open, onClose, onSaved, item }) => {
                         className="relative w-20 h-20 rounded-sm overflow-hidden border border-border group"
                       >
                         <img 
-                          src={photo} 
+                          src={mediaUrl(photo, 'thumbnail')} 
                           alt={`Photo ${index + 1}`}
                           className="w-full h-full object-cover"
                         />
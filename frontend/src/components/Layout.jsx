@@ -57,7 +57,7 @@ export const Layout = ({ children }) => {
         const headers = getAuthHeader();
         if (!headers.Authorization) return;
         
-        const response = await axios.get(`${API}/vehicles`, { headers });
+        const response = await axios.get(`${API}/vehicles?view=summary`, { headers });
         setVehicles(response.data);
       } catch (error) {
         console.error('Failed to fetch vehicles:', error);
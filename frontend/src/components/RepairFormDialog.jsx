@@ -81,7 +81,7 @@ export const RepairFormDialog = ({ open, onClose, onSaved, repair, vehicles }) =
 
   const fetchInventory = async () => {
     try {
-      const response = await axios.get(`${API}/inventory`, {
+      const response = await axios.get(`${API}/inventory?view=summary`, {
         headers: getAuthHeader()
       });
       setInventory(response.data);
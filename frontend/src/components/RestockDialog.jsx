@@ -39,17 +39,22 @@ export const RestockDialog = ({ open, onClose, onRestocked, item }) => {
 
     setLoading(true);
     try {
-      const newQuantity = item.quantity + formData.quantity;
-      const updatedNotes = formData.notes 
-        ? `${item.notes ? item.notes + '\n\n' : ''}[Restocked +${formData.quantity}] ${formData.notes}`
-        : item.notes;
-
-      await axios.put(`${API}/inventory/${item.id}`, {
-        quantity: newQuantity,
-        notes: updatedNotes
+      await axios.post(`${API}/inventory/${item.id}/movements`, {
+        delta: formData.quantity,
+        kind: 'restock',
+        reason: formData.notes
       }, {
         headers: getAuthHeader()
       });
+
+      if (formData.notes) {
+        const updatedNotes = `${item.notes ? item.notes + '\n\n' : ''}[Restocked +${formData.quantity}] ${formData.notes}`;
+        await axios.put(`${API}/inventory/${item.id}`, {
+          notes: updatedNotes
+        }, {
+          headers: getAuthHeader()
+        });
+      }
       
       toast.success(`Restocked ${formData.quantity} units successfully`);
       setFormData({ quantity: 1, notes: '' });
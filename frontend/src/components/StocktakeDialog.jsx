@@ -46,8 +46,14 @@ import {
 
 const API = `${import.meta.env.VITE_BACKEND_URL}/api`;
 
-export default function StocktakeDialog({ open, onClose, items, onStocktakeComplete }) {
+const PAGE_SIZE = 1000;
+
+// filterParams: the inventory page's query filters (category, low_stock, search...);
+// vehicleId: the page's global vehicle filter, if any
+export default function StocktakeDialog({ open, onClose, filterParams = '', vehicleId = null, onStocktakeComplete }) {
   const { getAuthHeader } = useAuth();
+  const [items, setItems] = useState([]);
+  const [loadingItems, setLoadingItems] = useState(false);
   const [mode, setMode] = useState(null); // null, 'device', 'pdf'
   const [selectedItemIndex, setSelectedItemIndex] = useState(null);
   const [stocktakeData, setStocktakeData] = useState([]);
@@ -60,18 +66,52 @@ export default function StocktakeDialog({ open, onClose, items, onStocktakeCompl
   const [selectedVehicle, setSelectedVehicle] = useState('all');
   const [filteredItems, setFilteredItems] = useState([]);
 
-  // Fetch vehicles when dialog opens
+  // Fetch vehicles and items when dialog opens
   useEffect(() => {
     if (open) {
       fetchVehicles();
+      fetchItems();
     }
   }, [open]);
 
+  // The inventory page only holds the pages it has loaded, so fetch every
+  // matching item here, following X-Next-Cursor until the last page
+  const fetchItems = async () => {
+    setLoadingItems(true);
+    try {
+      const headers = getAuthHeader();
+      let fetched = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams(filterParams);
+        params.set('limit', PAGE_SIZE);
+        params.set('view', 'summary');
+        if (cursor) params.set('cursor', cursor);
+        const response = await axios.get(`${API}/inventory?${params}`, { headers });
+        fetched = fetched.concat(response.data);
+        cursor = response.headers['x-next-cursor'] || null;
+      } while (cursor);
+      if (vehicleId) {
+        fetched = fetched.filter(item => 
+          item.vehicle_ids?.includes(vehicleId) || 
+          !item.vehicle_ids || 
+          item.vehicle_ids.length === 0
+        );
+      }
+      setItems(fetched);
+    } catch (error) {
+      setItems([]);
+      toast.error('Failed to load inventory for the stocktake');
+    } finally {
+      setLoadingItems(false);
+    }
+  };
+
   const fetchVehicles = async () => {
     try {
       const headers = getAuthHeader();
       if (!headers.Authorization) return;
-      const response = await axios.get(`${API}/vehicles`, { headers });
+      const response = await axios.get(`${API}/vehicles?view=summary`, { headers });
       setVehicles(response.data);
     } catch (error) {
       console.error('Failed to fetch vehicles:', error);
@@ -394,8 +434,8 @@ export default function StocktakeDialog({ open, onClose, items, onStocktakeCompl
 
           <div className="grid grid-cols-1 gap-4 mt-4">
             <Card 
-              className="bg-secondary/30 border-border hover:border-primary/50 cursor-pointer transition-colors"
-              onClick={() => setMode('device')}
+              className={`bg-secondary/30 border-border transition-colors ${loadingItems ? 'opacity-50 cursor-wait' : 'hover:border-primary/50 cursor-pointer'}`}
+              onClick={() => !loadingItems && setMode('device')}
               data-testid="stocktake-device-option"
             >
               <CardContent className="p-6 flex items-start gap-4">
@@ -413,8 +453,9 @@ export default function StocktakeDialog({ open, onClose, items, onStocktakeCompl
             </Card>
 
             <Card 
-              className="bg-secondary/30 border-border hover:border-primary/50 cursor-pointer transition-colors"
+              className={`bg-secondary/30 border-border transition-colors ${loadingItems ? 'opacity-50 cursor-wait' : 'hover:border-primary/50 cursor-pointer'}`}
               onClick={() => {
+                if (loadingItems) return;
                 generatePDF();
                 onClose();
               }}
@@ -436,7 +477,10 @@ export default function StocktakeDialog({ open, onClose, items, onStocktakeCompl
           </div>
 
           <div className="text-center text-sm text-muted-foreground mt-4">
-            {filteredItems.length} items to count • Total value: ${filteredItems.reduce((sum, item) => sum + (item.quantity * item.price), 0).toFixed(2)}
+            {loadingItems
+              ? 'Loading items...'
+              : `${filteredItems.length} items to count • Total value: $${filteredItems.reduce((sum, item) => sum + (item.quantity * item.price), 0).toFixed(2)}`
+            }
           </div>
         </DialogContent>
       </Dialog>
@@ -12,6 +12,7 @@ import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { toast } from 'sonner';
 import { Save, Car, Upload, X } from 'lucide-react';
+import { mediaUrl } from '@/lib/utils';
 
 const API = `${import.meta.env.VITE_BACKEND_URL}/api`;
 
@@ -124,7 +125,7 @@ export const VehicleFormDialog = ({ open, onClose, onSaved, vehicle }) => {
             {formData.photo ? (
               <div className="relative w-full h-40 rounded-sm overflow-hidden border border-border group">
                 <img 
-                  src={formData.photo} 
+                  src={mediaUrl(formData.photo, 'card')} 
                   alt="Vehicle"
                   className="w-full h-full object-cover"
                 />
@@ -4,3 +4,13 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+// Stored photos are referenced as /api/media/<hash> on the backend host.
+// variant: 'thumbnail' (160px), 'card' (480px) or 'full' (default)
+export function mediaUrl(src, variant) {
+  if (src && src.startsWith('/api/media/')) {
+    const url = `${import.meta.env.VITE_BACKEND_URL}${src}`;
+    return variant ? `${url}?variant=${variant}` : url;
+  }
+  return src;
+}
@@ -8,6 +8,7 @@ import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/com
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
+import { Checkbox } from '@/components/ui/checkbox';
 import { Badge } from '@/components/ui/badge';
 import { Separator } from '@/components/ui/separator';
 import {
@@ -41,6 +42,9 @@ import {
 } from 'lucide-react';
 
 const API = `${import.meta.env.VITE_BACKEND_URL}/api`;
+const IMPORT_CHUNK_BYTES = 1024 * 1024;
+const IMPORT_MAX_RETRIES = 5;
+const IMPORT_SECTIONS = ['vehicles', 'inventory', 'repairs', 'setups', 'stocktakes'];
 
 // Helper to redact sensitive info
 const redactEmail = (email) => {
@@ -89,6 +93,8 @@ export default function AccountPage() {
   const [importing, setImporting] = useState(false);
   const [importFile, setImportFile] = useState(null);
   const [importStats, setImportStats] = useState(null);
+  const [importProgress, setImportProgress] = useState(null);
+  const [importMerge, setImportMerge] = useState(true);
 
   useEffect(() => {
     if (user) {
@@ -150,14 +156,13 @@ export default function AccountPage() {
     setExporting(true);
     setShowExportDialog(false);
     try {
+      // The export is streamed; save the body as-is instead of parsing it
       const response = await axios.get(`${API}/account/export`, {
-        headers: getAuthHeader()
+        headers: getAuthHeader(),
+        responseType: 'blob'
       });
       
-      // Create and download JSON file
-      const dataStr = JSON.stringify(response.data, null, 2);
-      const blob = new Blob([dataStr], { type: 'application/json' });
-      const url = URL.createObjectURL(blob);
+      const url = URL.createObjectURL(response.data);
       const link = document.createElement('a');
       link.href = url;
       link.download = `rallycommand-data-${new Date().toISOString().split('T')[0]}.json`;
@@ -177,8 +182,8 @@ export default function AccountPage() {
   const handleImportFileChange = (e) => {
     const file = e.target.files?.[0];
     if (file) {
-      if (!file.name.endsWith('.json')) {
-        toast.error('Please select a JSON file');
+      if (!file.name.endsWith('.json') && !file.name.endsWith('.ndjson')) {
+        toast.error('Please select a JSON or NDJSON backup file');
         e.target.value = '';
         return;
       }
@@ -195,42 +200,65 @@ export default function AccountPage() {
     
     setImporting(true);
     try {
-      // Read and parse the JSON file
-      const fileContent = await importFile.text();
-      let importData;
-      
-      try {
-        importData = JSON.parse(fileContent);
-      } catch (parseError) {
-        toast.error('Invalid JSON file format');
-        setImporting(false);
-        return;
+      // Upload the file in chunks to an import job. The job id is remembered
+      // per file so an interrupted upload resumes where the server left off.
+      const fileKey = `importJob:${importMerge ? 'merge' : 'create'}:${importFile.name}:${importFile.size}:${importFile.lastModified}`;
+      let job = null;
+      const savedJobId = localStorage.getItem(fileKey);
+      if (savedJobId) {
+        try {
+          const response = await axios.get(`${API}/account/import/jobs/${savedJobId}`, { headers: getAuthHeader() });
+          if (response.data.status === 'uploading') job = response.data;
+        } catch (error) {
+          // Expired or unknown job: start over
+        }
+      }
+      if (!job) {
+        const response = await axios.post(`${API}/account/import/jobs`, {
+          format: importFile.name.endsWith('.ndjson') ? 'ndjson' : 'json',
+          mode: importMerge ? 'merge' : 'create',
+          filename: importFile.name,
+          total_bytes: importFile.size
+        }, { headers: getAuthHeader() });
+        job = response.data;
+        localStorage.setItem(fileKey, job.id);
       }
       
-      // Extract the data arrays from the export format
-      const payload = {
-        vehicles: importData.vehicles || [],
-        inventory: importData.inventory || [],
-        repairs: importData.repairs || [],
-        setups: importData.setups || [],
-        stocktakes: importData.stocktakes || []
-      };
-      
-      // Check if there's any data to import
-      const totalItems = payload.vehicles.length + payload.inventory.length + 
-                        payload.repairs.length + payload.setups.length + payload.stocktakes.length;
+      const totalChunks = Math.ceil(importFile.size / IMPORT_CHUNK_BYTES);
+      let failures = 0;
+      while (job.status === 'uploading' && job.next_chunk < totalChunks) {
+        const start = job.next_chunk * IMPORT_CHUNK_BYTES;
+        const chunk = importFile.slice(start, start + IMPORT_CHUNK_BYTES);
+        try {
+          const response = await axios.put(`${API}/account/import/jobs/${job.id}/chunks/${job.next_chunk}`, chunk, {
+            headers: { ...getAuthHeader(), 'Content-Type': 'application/octet-stream' }
+          });
+          job = response.data;
+          failures = 0;
+        } catch (error) {
+          if (++failures > IMPORT_MAX_RETRIES) throw error;
+          // Ask the server where to resume, then retry
+          await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+          const response = await axios.get(`${API}/account/import/jobs/${job.id}`, { headers: getAuthHeader() });
+          job = response.data;
+        }
+        setImportProgress(Math.round((job.received_bytes / importFile.size) * 100));
+      }
+      if (job.status === 'uploading') {
+        const response = await axios.post(`${API}/account/import/jobs/${job.id}/complete`, {}, { headers: getAuthHeader() });
+        job = response.data;
+      }
+      localStorage.removeItem(fileKey);
       
-      if (totalItems === 0) {
+      if (job.status === 'failed') {
+        toast.error(job.error || 'Failed to import data');
+        return;
+      }
+      setImportStats({ ...job.stats, error_count: job.error_count });
+      if (job.records_processed === 0) {
         toast.error('No data found in the file to import');
-        setImporting(false);
         return;
       }
-      
-      const response = await axios.post(`${API}/account/import`, payload, {
-        headers: getAuthHeader()
-      });
-      
-      setImportStats(response.data.stats);
       toast.success('Data imported successfully!');
       setImportFile(null);
       
@@ -243,6 +271,7 @@ export default function AccountPage() {
       toast.error(error.response?.data?.detail || 'Failed to import data');
     } finally {
       setImporting(false);
+      setImportProgress(null);
     }
   };
 
@@ -566,7 +595,7 @@ export default function AccountPage() {
                 <div className="flex-1">
                   <h3 className="font-semibold text-foreground">Import Data</h3>
                   <p className="text-sm text-muted-foreground mt-1">
-                    Restore data from a previously exported JSON file. New records will be created without affecting existing data.
+                    Restore data from a previously exported JSON file. Records that already exist are skipped or updated, so the same backup can be restored more than once.
                   </p>
                   
                   <div className="mt-3 space-y-3">
@@ -574,7 +603,7 @@ export default function AccountPage() {
                       <input
                         id="import-file-input"
                         type="file"
-                        accept=".json"
+                        accept=".json,.ndjson"
                         onChange={handleImportFileChange}
                         className="hidden"
                         data-testid="import-file-input"
@@ -588,6 +617,18 @@ export default function AccountPage() {
                       </label>
                     </div>
                     
+                    <div className="flex items-center space-x-2">
+                      <Checkbox
+                        id="import-merge"
+                        checked={importMerge}
+                        onCheckedChange={(checked) => setImportMerge(!!checked)}
+                        data-testid="import-merge-checkbox"
+                      />
+                      <Label htmlFor="import-merge" className="text-sm text-muted-foreground">
+                        Skip records that already exist (uncheck to always create copies)
+                      </Label>
+                    </div>
+                    
                     {importFile && (
                       <Button 
                         onClick={handleImportData}
@@ -597,7 +638,7 @@ export default function AccountPage() {
                         {importing ? (
                           <>
                             <div className="w-4 h-4 border-2 border-current border-t-transparent rounded-full animate-spin mr-2" />
-                            Importing...
+                            {importProgress !== null ? `Importing... ${importProgress}%` : 'Importing...'}
                           </>
                         ) : (
                           <>
@@ -617,8 +658,14 @@ export default function AccountPage() {
                           <li>• Repairs imported: {importStats.repairs_imported}</li>
                           <li>• Setups imported: {importStats.setups_imported}</li>
                           <li>• Stocktakes imported: {importStats.stocktakes_imported}</li>
+                          {IMPORT_SECTIONS.some((section) => importStats[`${section}_updated`] > 0) && (
+                            <li>• Existing records updated: {IMPORT_SECTIONS.reduce((sum, section) => sum + (importStats[`${section}_updated`] || 0), 0)}</li>
+                          )}
+                          {IMPORT_SECTIONS.some((section) => importStats[`${section}_unchanged`] > 0) && (
+                            <li>• Already up to date: {IMPORT_SECTIONS.reduce((sum, section) => sum + (importStats[`${section}_unchanged`] || 0), 0)}</li>
+                          )}
                           {importStats.errors?.length > 0 && (
-                            <li className="text-destructive">• Errors: {importStats.errors.length}</li>
+                            <li className="text-destructive">• Errors: {importStats.error_count ?? importStats.errors.length}</li>
                           )}
                         </ul>
                       </div>
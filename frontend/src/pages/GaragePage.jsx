@@ -23,6 +23,7 @@ import {
   Hash,
   FileText
 } from 'lucide-react';
+import { mediaUrl } from '@/lib/utils';
 
 const API = `${import.meta.env.VITE_BACKEND_URL}/api`;
 
@@ -147,7 +148,7 @@ export default function GaragePage() {
                   {vehicle.photo ? (
                     <div className="h-48 bg-secondary overflow-hidden cursor-pointer">
                       <img 
-                        src={vehicle.photo} 
+                        src={mediaUrl(vehicle.photo, 'card')} 
                         alt={`${vehicle.make} ${vehicle.model}`}
                         className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
                       />
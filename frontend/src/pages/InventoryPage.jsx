@@ -61,6 +61,8 @@ const categories = [
   { value: 'fluids', label: 'Fluids', icon: Droplets },
 ];
 
+const PAGE_SIZE = 100;
+
 const partSubcategories = [
   { value: '', label: 'All Part Types' },
   { value: 'panel', label: 'Panel' },
@@ -78,7 +80,11 @@ export default function InventoryPage() {
   const [allItems, setAllItems] = useState([]);
   const [vehicles, setVehicles] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalCount, setTotalCount] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [search, setSearch] = useState('');
+  const [searchedTerm, setSearchedTerm] = useState('');
   const [categoryFilter, setCategoryFilter] = useState(searchParams.get('category') || '');
   const [subcategoryFilter, setSubcategoryFilter] = useState('');
   const [showLowStock, setShowLowStock] = useState(searchParams.get('low_stock') === 'true');
@@ -114,30 +120,60 @@ export default function InventoryPage() {
     }
   };
 
-  const fetchItems = async () => {
+  const applyVehicleFilter = (list) => {
+    if (!selectedVehicle) return list;
+    return list.filter(item => 
+      item.vehicle_ids?.includes(selectedVehicle.id) || 
+      !item.vehicle_ids || 
+      item.vehicle_ids.length === 0
+    );
+  };
+
+  const filterParams = () => {
+    const params = new URLSearchParams();
+    if (categoryFilter) params.append('category', categoryFilter);
+    if (subcategoryFilter && categoryFilter === 'parts') params.append('subcategory', subcategoryFilter);
+    if (showLowStock) params.append('low_stock', 'true');
+    return params;
+  };
+
+  // The stocktake covers every item the table's filters (and search) match,
+  // not just the pages loaded so far
+  const stocktakeParams = () => {
+    const params = filterParams();
+    if (searchedTerm) {
+      // Search results ignore the low stock toggle, as in handleSearch
+      params.delete('low_stock');
+      params.append('search', searchedTerm);
+    }
+    return params.toString();
+  };
+
+  const fetchItems = async (cursor = null) => {
     try {
-      const params = new URLSearchParams();
-      if (categoryFilter) params.append('category', categoryFilter);
-      if (subcategoryFilter && categoryFilter === 'parts') params.append('subcategory', subcategoryFilter);
-      if (showLowStock) params.append('low_stock', 'true');
+      const params = filterParams();
+      params.append('limit', PAGE_SIZE);
+      params.append('view', 'summary');
+      if (cursor) {
+        params.append('cursor', cursor);
+      } else {
+        params.append('include_total', 'true');
+      }
       
       const response = await axios.get(`${API}/inventory?${params}`, {
         headers: getAuthHeader()
       });
       
-      let fetchedItems = response.data;
+      const fetchedItems = cursor ? [...allItems, ...response.data] : response.data;
       setAllItems(fetchedItems);
-      
-      // Apply global vehicle filter if selected
-      if (selectedVehicle) {
-        fetchedItems = fetchedItems.filter(item => 
-          item.vehicle_ids?.includes(selectedVehicle.id) || 
-          !item.vehicle_ids || 
-          item.vehicle_ids.length === 0
-        );
+      setNextCursor(response.headers['x-next-cursor'] || null);
+      if (!cursor) {
+        const total = response.headers['x-total-count'];
+        setTotalCount(total !== undefined ? parseInt(total, 10) : null);
       }
       
-      setItems(fetchedItems);
+      // Apply global vehicle filter if selected
+      setItems(applyVehicleFilter(fetchedItems));
     } catch (error) {
       toast.error('Failed to fetch inventory');
     } finally {
@@ -145,8 +181,16 @@ export default function InventoryPage() {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    await fetchItems(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleSearch = async () => {
     if (!search.trim()) {
+      setSearchedTerm('');
       fetchItems();
       return;
     }
@@ -154,6 +198,7 @@ export default function InventoryPage() {
     try {
       const params = new URLSearchParams();
       params.append('search', search);
+      params.append('view', 'summary');
       if (categoryFilter) params.append('category', categoryFilter);
       if (subcategoryFilter && categoryFilter === 'parts') params.append('subcategory', subcategoryFilter);
       
@@ -161,18 +206,10 @@ export default function InventoryPage() {
         headers: getAuthHeader()
       });
       
-      let fetchedItems = response.data;
-      
       // Apply global vehicle filter if selected
-      if (selectedVehicle) {
-        fetchedItems = fetchedItems.filter(item => 
-          item.vehicle_ids?.includes(selectedVehicle.id) || 
-          !item.vehicle_ids || 
-          item.vehicle_ids.length === 0
-        );
-      }
-      
-      setItems(fetchedItems);
+      setItems(applyVehicleFilter(response.data));
+      setNextCursor(null);
+      setSearchedTerm(search);
     } catch (error) {
       toast.error('Search failed');
     }
@@ -192,9 +229,17 @@ export default function InventoryPage() {
     }
   };
 
-  const handleEdit = (item) => {
-    setEditingItem(item);
-    setDialogOpen(true);
+  const handleEdit = async (item) => {
+    // The table only loads the summary view; the form needs the full item
+    try {
+      const response = await axios.get(`${API}/inventory/${item.id}`, {
+        headers: getAuthHeader()
+      });
+      setEditingItem(response.data);
+      setDialogOpen(true);
+    } catch (error) {
+      toast.error('Failed to load item');
+    }
   };
 
   const handleDialogClose = () => {
@@ -218,8 +263,9 @@ export default function InventoryPage() {
 
   const isLowStock = (item) => item.quantity <= item.min_stock;
 
+  // Server search results are already matched and ranked; only filter locally while typing
   const filteredItems = items.filter(item => {
-    if (!search) return true;
+    if (!search || search === searchedTerm) return true;
     const searchLower = search.toLowerCase();
     return (
       item.name.toLowerCase().includes(searchLower) ||
@@ -228,6 +274,9 @@ export default function InventoryPage() {
     );
   });
 
+  // Server total covers pages not loaded yet; client-side filters fall back to the loaded count
+  const itemCount = totalCount !== null && !search && !selectedVehicle ? totalCount : filteredItems.length;
+
   return (
     <Layout>
       <div className="space-y-6" data-testid="inventory-page">
@@ -238,7 +287,7 @@ export default function InventoryPage() {
               Inventory
             </h1>
             <p className="text-muted-foreground text-sm md:text-base mt-1">
-              {filteredItems.length} item{filteredItems.length !== 1 ? 's' : ''} in stock
+              {itemCount} item{itemCount !== 1 ? 's' : ''} in stock
             </p>
           </div>
           <div className="flex flex-wrap gap-2">
@@ -492,6 +541,18 @@ export default function InventoryPage() {
                 </TableBody>
               </Table>
           )}
+          {!loading && nextCursor && (
+            <div className="flex justify-center p-4 border-t border-border/50">
+              <Button
+                variant="outline"
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                data-testid="load-more-btn"
+              >
+                {loadingMore ? 'Loading...' : 'Load More'}
+              </Button>
+            </div>
+          )}
         </Card>
       </div>
 
@@ -507,7 +568,8 @@ export default function InventoryPage() {
       <StocktakeDialog
         open={stocktakeDialogOpen}
         onClose={() => setStocktakeDialogOpen(false)}
-        items={items}
+        filterParams={stocktakeParams()}
+        vehicleId={selectedVehicle?.id}
         onStocktakeComplete={() => {
           fetchItems();
           setStocktakeDialogOpen(false);
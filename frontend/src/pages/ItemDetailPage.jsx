@@ -36,6 +36,7 @@ import {
   X,
   Car
 } from 'lucide-react';
+import { mediaUrl } from '@/lib/utils';
 
 const API = `${import.meta.env.VITE_BACKEND_URL}/api`;
 
@@ -372,7 +373,7 @@ export default function ItemDetailPage() {
                           data-testid={`photo-thumbnail-${index}`}
                         >
                           <img 
-                            src={photo} 
+                            src={mediaUrl(photo, 'thumbnail')} 
                             alt={`${item.name} photo ${index + 1}`}
                             className="w-full h-full object-cover"
                           />
@@ -405,7 +406,7 @@ export default function ItemDetailPage() {
                           >
                             {vehicle.photo ? (
                               <img 
-                                src={vehicle.photo} 
+                                src={mediaUrl(vehicle.photo, 'thumbnail')} 
                                 alt={`${vehicle.make} ${vehicle.model}`}
                                 className="w-8 h-8 rounded-sm object-cover"
                               />
@@ -543,7 +544,7 @@ export default function ItemDetailPage() {
             {item?.photos && item.photos.length > 0 && (
               <div className="relative flex items-center justify-center min-h-[400px] p-8">
                 <img
-                  src={item.photos[currentPhotoIndex]}
+                  src={mediaUrl(item.photos[currentPhotoIndex])}
                   alt={`${item.name} photo ${currentPhotoIndex + 1}`}
                   className="max-w-full max-h-[70vh] object-contain"
                   data-testid="photo-viewer-image"
@@ -37,6 +37,7 @@ import {
   Users,
   ChevronRight
 } from 'lucide-react';
+import { mediaUrl } from '@/lib/utils';
 
 const API = `${import.meta.env.VITE_BACKEND_URL}/api`;
 
@@ -221,7 +222,7 @@ export default function VehicleDetailPage() {
             {vehicle.photo ? (
               <div className="w-24 h-24 rounded-sm overflow-hidden border border-border flex-shrink-0">
                 <img 
-                  src={vehicle.photo} 
+                  src={mediaUrl(vehicle.photo, 'card')} 
                   alt={`${vehicle.make} ${vehicle.model}`}
                   className="w-full h-full object-cover"
                 />
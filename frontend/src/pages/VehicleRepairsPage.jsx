@@ -29,6 +29,7 @@ import {
   MoreHorizontal,
   Calendar
 } from 'lucide-react';
+import { mediaUrl } from '@/lib/utils';
 
 const API = `${import.meta.env.VITE_BACKEND_URL}/api`;
 
@@ -142,7 +143,7 @@ export default function VehicleRepairsPage() {
           <div className="w-full md:w-64 h-48 bg-secondary/50 rounded-lg overflow-hidden flex-shrink-0">
             {vehicle.photo ? (
               <img 
-                src={vehicle.photo} 
+                src={mediaUrl(vehicle.photo, 'card')} 
                 alt={`${vehicle.make} ${vehicle.model}`}
                 className="w-full h-full object-cover"
               />
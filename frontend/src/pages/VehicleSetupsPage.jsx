@@ -40,6 +40,7 @@ import {
   Cloud,
   X
 } from 'lucide-react';
+import { mediaUrl } from '@/lib/utils';
 
 const API = `${import.meta.env.VITE_BACKEND_URL}/api`;
 
@@ -177,7 +178,7 @@ export default function VehicleSetupsPage() {
           <div className="w-full md:w-64 h-48 bg-secondary/50 rounded-lg overflow-hidden flex-shrink-0">
             {vehicle.photo ? (
               <img 
-                src={vehicle.photo} 
+                src={mediaUrl(vehicle.photo, 'card')} 
                 alt={`${vehicle.make} ${vehicle.model}`}
                 className="w-full h-full object-cover"
               />